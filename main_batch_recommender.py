@@ -0,0 +1,7 @@
+from recommender.batch import run_batch_recommendations
+
+def main():
+    run_batch_recommendations()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
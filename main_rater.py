@@ -1,4 +1,4 @@
-from recommender import run_rating_rater
+from recommender.rating_rater import run_rating_rater
 
 def main():
     run_rating_rater()
@@ -1,4 +1,4 @@
-from recommender.analysis import main_rating_analysis
+from recommender.analysis.rating_analysis import main as main_rating_analysis
 
 if __name__ == "__main__":
     main_rating_analysis()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from recommender import run_recommender
+from recommender.recommender import run_recommender
 
 def main():
     run_recommender()
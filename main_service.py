@@ -0,0 +1,7 @@
+from recommender.service import run_service
+
+def main():
+    run_service()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
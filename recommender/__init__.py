@@ -1,2 +1,15 @@
-from .rating_rater import RatingRater, run_rating_rater
-from .recommender import VideoGameRecommender, run_recommender
\ No newline at end of file
+from .lazy_imports import lazy_attributes
+
+# Submodules are only imported when one of their names is first used, so
+# headless callers like the analysis scripts don't load tkinter, PIL, and the
+# recommender's dependencies
+_lazy_names = {
+    "RatingRater": (".rating_rater", "RatingRater"),
+    "run_rating_rater": (".rating_rater", "run_rating_rater"),
+    "VideoGameRecommender": (".recommender", "VideoGameRecommender"),
+    "run_recommender": (".recommender", "run_recommender")
+}
+
+__all__ = list(_lazy_names.keys())
+
+__getattr__, __dir__ = lazy_attributes(globals(), _lazy_names)
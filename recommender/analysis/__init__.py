@@ -1,3 +1,15 @@
-from .models.analysis_model import AnalysisModel
-from .models.gpt_model import GptAnalyisModel
-from .rating_analysis import main as main_rating_analysis
\ No newline at end of file
+from ..lazy_imports import lazy_attributes
+
+# Models and the analysis scripts are only imported when one of their names is
+# first used, so importing one of them doesn't load openai or bs4 for the rest
+_lazy_names = {
+    "AnalysisModel": (".models.analysis_model", "AnalysisModel"),
+    "CachedAnalysisModel": (".models.cached_model", "CachedAnalysisModel"),
+    "FakeAnalysisModel": (".models.fake_model", "FakeAnalysisModel"),
+    "GptAnalyisModel": (".models.gpt_model", "GptAnalyisModel"),
+    "main_rating_analysis": (".rating_analysis", "main")
+}
+
+__all__ = list(_lazy_names.keys())
+
+__getattr__, __dir__ = lazy_attributes(globals(), _lazy_names)
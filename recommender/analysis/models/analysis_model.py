@@ -1,3 +1,5 @@
+import asyncio
+
 class AnalysisModel:
     def __init__(self):
         pass
@@ -6,4 +8,40 @@ class AnalysisModel:
         pass
 
     def send_query(self, query: str):
-        pass
\ No newline at end of file
+        pass
+
+    async def send_query_async(self, query: str) -> str:
+        """Sends a query without blocking the event loop. Models without an
+        async client run the blocking query on a worker thread
+
+        Arguments:
+            query {str} -- Query to send
+
+        Returns:
+            str -- Model response
+        """
+        return await asyncio.to_thread(self.send_query, query)
+
+    def get_cached_response(self, prompt: str, description: str) -> str:
+        """Gets a saved response to a prompt and description. Models without a
+        cache never have one
+
+        Arguments:
+            prompt {str} -- Prompt template
+            description {str} -- Description that was analyzed
+
+        Returns:
+            str -- Saved response or None if there isn't one
+        """
+        return None
+
+    def cache_response(self, prompt: str, description: str, response: str):
+        """Saves a correct response to a prompt and description. Models without
+        a cache ignore it
+
+        Arguments:
+            prompt {str} -- Prompt template
+            description {str} -- Description that was analyzed
+            response {str} -- Response to save
+        """
+        pass
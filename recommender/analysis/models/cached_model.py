@@ -0,0 +1,117 @@
+from hashlib import sha256
+from threading import Lock
+import re
+import sqlite3
+import time
+
+from .analysis_model import AnalysisModel
+
+def normalize_description(description: str) -> str:
+    """Collapses whitespace so descriptions that only differ in spacing share a
+    cache entry
+
+    Arguments:
+        description {str} -- Description
+
+    Returns:
+        str -- Normalized description
+    """
+    return re.sub(r"\s+", " ", description).strip()
+
+class CachedAnalysisModel(AnalysisModel):
+    def __init__(self, model: AnalysisModel, filename: str = "response_cache.sqlite"):
+        """Wraps a model with a persistent cache of its responses. Entries are
+        keyed by the model type, the prompt template, and the normalized
+        description, so changing any of them misses while anything else is
+        answered from the cache
+
+        Arguments:
+            model {AnalysisModel} -- Model to wrap
+
+        Keyword Arguments:
+            filename {str} -- Sqlite database to store responses in
+                (default: {"response_cache.sqlite"})
+        """
+        super().__init__()
+        self.model = model
+        self.filename = filename
+        self.num_hits = 0
+        self.num_misses = 0
+
+        # Queries finish on worker threads as well as the event loop
+        self._lock = Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+        self._connection.commit()
+
+    @property
+    def model_type(self) -> str:
+        return getattr(self.model, "model_type", type(self.model).__name__)
+
+    def setup(self):
+        self.model.setup()
+
+    def send_query(self, query: str):
+        return self.model.send_query(query)
+
+    async def send_query_async(self, query: str):
+        return await self.model.send_query_async(query)
+
+    def _get_key(self, prompt: str, description: str) -> str:
+        """Gets the cache key of a prompt and description
+
+        Arguments:
+            prompt {str} -- Prompt template
+            description {str} -- Description
+
+        Returns:
+            str -- Cache key
+        """
+        # The prompt is hashed on its own so editing it acts as a new version
+        prompt_version = sha256(prompt.encode("utf-8")).hexdigest()
+        key = "\0".join((self.model_type, prompt_version, normalize_description(description)))
+        return sha256(key.encode("utf-8")).hexdigest()
+
+    def get_cached_response(self, prompt: str, description: str) -> str:
+        with self._lock:
+            row = self._connection.execute("SELECT response FROM responses WHERE key = ?", (self._get_key(prompt, description),)).fetchone()
+            if row is None:
+                self.num_misses += 1
+                return None
+            self.num_hits += 1
+            return row[0]
+
+    def cache_response(self, prompt: str, description: str, response: str):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)", (self._get_key(prompt, description), response, time.time()))
+            self._connection.commit()
+
+    def evict_older_than(self, seconds: float) -> int:
+        """Removes entries saved more than a set time ago
+
+        Arguments:
+            seconds {float} -- Age of the oldest entries to keep
+
+        Returns:
+            int -- Number of entries removed
+        """
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - seconds,))
+            self._connection.commit()
+            return cursor.rowcount
+
+    def print_stats(self):
+        """Prints the hit rate and size of the cache
+        """
+        with self._lock:
+            num_entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        num_lookups = self.num_hits + self.num_misses
+        hit_rate = self.num_hits / num_lookups if num_lookups > 0 else 0
+        print(f"Response cache: {self.num_hits} hits, {self.num_misses} misses ({hit_rate:.1%} hit rate), {num_entries} entries")
+
+    def close(self):
+        """Closes the database
+        """
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,92 @@
+from hashlib import sha256
+from threading import Lock
+import asyncio
+import json
+import re
+import time
+
+from .analysis_model import AnalysisModel
+
+# Documents of a batched query each start with a line of the form "### <id>"
+batch_document_pattern = re.compile(r"^### (\S+)\n(.*?)(?=\n\n### |\Z)", re.MULTILINE | re.DOTALL)
+
+emotions = ["anger", "disgust", "fear", "happiness", "sadness", "surprise"]
+
+class FakeAnalysisModel(AnalysisModel):
+    def __init__(self, latency: float = 0, failure_rate: float = 0, malformed_rate: float = 0, seed: int = 0):
+        """Model that answers without calling an API, for running and timing
+        the analysis pipeline offline. Ratings are derived from a hash of the
+        query, or of each document in a batched query, so the same query always
+        gets the same rating. Failures are picked from a hash of the seed, the
+        query, and how many times it was sent, so they don't depend on the
+        order concurrent queries arrive in
+
+        Keyword Arguments:
+            latency {float} -- Seconds each query takes (default: {0})
+            failure_rate {float} -- Fraction of queries that raise
+                ConnectionError (default: {0})
+            malformed_rate {float} -- Fraction of queries answered with text
+                that isn't json (default: {0})
+            seed {int} -- Seed of the failures (default: {0})
+        """
+        super().__init__()
+        self.model_type = "fake"
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+        self.num_queries = 0
+
+        # Queries are sent from worker threads as well as the event loop
+        self._lock = Lock()
+        self._num_attempts: dict[str, int] = {}
+
+    def send_query(self, query: str):
+        time.sleep(self.latency)
+        return self._answer(query)
+
+    async def send_query_async(self, query: str):
+        await asyncio.sleep(self.latency)
+        return self._answer(query)
+
+    def _answer(self, query: str) -> str:
+        """Answers a single or batched query
+
+        Arguments:
+            query {str} -- Query to answer
+
+        Raises:
+            ConnectionError: The query was picked to fail
+
+        Returns:
+            str -- Response
+        """
+        # Keyed by hash so long runs don't keep every query in memory
+        query_hash = sha256(query.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.num_queries += 1
+            attempt = self._num_attempts.get(query_hash, 0)
+            self._num_attempts[query_hash] = attempt + 1
+        digest = sha256(f"{self.seed}\0{attempt}\0{query_hash}".encode("utf-8")).digest()
+        roll = int.from_bytes(digest[:8], "big") / 2 ** 64
+        if roll < self.failure_rate:
+            raise ConnectionError("Fake model failure")
+        if roll < self.failure_rate + self.malformed_rate:
+            return "Sorry, I can't help with that"
+
+        documents = batch_document_pattern.findall(query)
+        if len(documents) > 0:
+            return json.dumps({id: self._rate(document) for id, document in documents})
+        return json.dumps(self._rate(query))
+
+    def _rate(self, document: str) -> dict[str, int]:
+        """Gets the ratings of a document from its hash
+
+        Arguments:
+            document {str} -- Document
+
+        Returns:
+            dict[str, int] -- Emotion to rating from 1 to 10
+        """
+        digest = sha256(document.strip().encode("utf-8")).digest()
+        return {emotion: 1 + digest[i] % 10 for i, emotion in enumerate(emotions)}
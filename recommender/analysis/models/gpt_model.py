@@ -1,4 +1,3 @@
-from openai import OpenAI
 from .analysis_model import AnalysisModel
 
 class GptAnalyisModel(AnalysisModel):
@@ -7,8 +6,16 @@ class GptAnalyisModel(AnalysisModel):
         self.model_type = "gpt-5-mini"
 
     def setup(self):
+        # Imported here since openai takes a long time to import and is only
+        # needed once the model is used
+        from openai import AsyncOpenAI, OpenAI
         self.client = OpenAI()
+        self.async_client = AsyncOpenAI()
 
     def send_query(self, query: str):
         response = self.client.responses.create(model=self.model_type, input=query)
+        return response.output_text
+
+    async def send_query_async(self, query: str):
+        response = await self.async_client.responses.create(model=self.model_type, input=query)
         return response.output_text
\ No newline at end of file
@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+import os
+import re
+
+from ..data_collection import iter_ndjson, json_dumps
+
+url_pattern = re.compile(r"(?:https?://|www\.)\S+")
+whitespace_pattern = re.compile(r"\s+")
+
+# Rough number of characters in a token for English text
+chars_per_token = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens a model will see for some text
+
+    Arguments:
+        text {str} -- Text
+
+    Returns:
+        int -- Estimated tokens
+    """
+    return estimate_tokens_from_chars(len(text))
+
+def estimate_tokens_from_chars(num_chars: int) -> int:
+    """Estimates the number of tokens a model will see for text of a length,
+    for text that is no longer kept
+
+    Arguments:
+        num_chars {int} -- Characters in the text
+
+    Returns:
+        int -- Estimated tokens
+    """
+    return -(-num_chars // chars_per_token)
+
+def strip_html(description: str, separator: str = "") -> str:
+    """Gets the text of an html description
+
+    Arguments:
+        description {str} -- Html description
+
+    Keyword Arguments:
+        separator {str} -- Text put between the strings of each tag
+            (default: {""})
+
+    Returns:
+        str -- Text of the description
+    """
+    # Imported on first use so cached results are read without loading bs4.
+    # Later calls only look it up in sys.modules
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(description, "html.parser")
+    return soup.get_text(separator).strip()
+
+def clean_description(description: str, max_tokens: int = None) -> str:
+    """Strips the markup and links from a description, collapses its
+    whitespace, and cuts it down to a token budget
+
+    Arguments:
+        description {str} -- Html description
+
+    Keyword Arguments:
+        max_tokens {int} -- Most estimated tokens to keep, everything is kept
+            if None (default: {None})
+
+    Returns:
+        str -- Cleaned description
+    """
+    # Tags are replaced with spaces so words on either side of a <br> don't
+    # run together
+    text = strip_html(description, " ")
+    text = url_pattern.sub("", text)
+    text = whitespace_pattern.sub(" ", text).strip()
+
+    max_chars = max_tokens * chars_per_token if max_tokens is not None else None
+    if max_chars is not None and len(text) > max_chars:
+        # Cut at the last full word that fits
+        text = text[:max_chars + 1]
+        last_space = text.rfind(" ")
+        text = text[:last_space] if last_space > 0 else text[:max_chars]
+
+    return text
+
+def get_source_hash(description: str, max_tokens: int) -> str:
+    """Gets the hash a cleaned description is saved under, so it is cleaned
+    again when the description or budget changes
+
+    Arguments:
+        description {str} -- Html description
+        max_tokens {int} -- Token budget
+
+    Returns:
+        str -- Hash
+    """
+    return sha256(f"{max_tokens}\0{description}".encode("utf-8")).hexdigest()
+
+def _clean_record(record: tuple[str, str, int]) -> tuple[str, dict]:
+    """Cleans one description in a worker process
+
+    Arguments:
+        record {tuple[str, str, int]} -- Game ID, html description, and token
+            budget
+
+    Returns:
+        tuple[str, dict] -- Game ID and its cache entry
+    """
+    id, description, max_tokens = record
+    return id, {
+        "source_hash": get_source_hash(description, max_tokens),
+        "source_bytes": len(description.encode("utf-8")),
+        "source_chars": len(description),
+        "text": clean_description(description, max_tokens)
+    }
+
+def preprocess_descriptions(games_filename: str, cache_filename: str = "cleaned_descriptions.ndjson", max_tokens: int = 1024, num_processes: int = None, chunk_size: int = 64) -> dict[str, str]:
+    """Cleans the description of every game across a pool of processes. Cleaned
+    descriptions are saved per game ID and only games whose description or
+    budget changed are cleaned again
+
+    Arguments:
+        games_filename {str} -- Ndjson file of games
+
+    Keyword Arguments:
+        cache_filename {str} -- Ndjson file cleaned descriptions are saved to
+            (default: {"cleaned_descriptions.ndjson"})
+        max_tokens {int} -- Most estimated tokens kept per description
+            (default: {1024})
+        num_processes {int} -- Number of worker processes, the number of CPUs
+            if None (default: {None})
+        chunk_size {int} -- Descriptions sent to a worker at a time
+            (default: {64})
+
+    Returns:
+        dict[str, str] -- Game ID to cleaned description
+    """
+    # Later lines override earlier ones, so the cache only ever gets appended to
+    cached_entries = {}
+    if os.path.exists(cache_filename):
+        for entry in iter_ndjson(cache_filename):
+            cached_entries.update(entry)
+
+    entries = {}
+    pending_records = []
+    for game in iter_ndjson(games_filename):
+        id = next(iter(game.keys()))
+        description = game[id]["data"].get("detailed_description")
+        if description is None:
+            continue
+
+        cached_entry = cached_entries.get(id)
+        # Entries saved before character counts were kept are cleaned again
+        if cached_entry is not None and "source_chars" in cached_entry and cached_entry["source_hash"] == get_source_hash(description, max_tokens):
+            entries[id] = cached_entry
+        else:
+            pending_records.append((id, description, max_tokens))
+
+    print(f"Cleaning {len(pending_records)} descriptions, {len(entries)} already cleaned")
+    if len(pending_records) > 0:
+        with ProcessPoolExecutor(num_processes) as executor, open(cache_filename, "a", encoding="utf-8") as f:
+            for id, entry in executor.map(_clean_record, pending_records, chunksize=chunk_size):
+                entries[id] = entry
+                f.write(json_dumps({id: entry}))
+                f.write("\n")
+
+    print_savings(entries.values())
+
+    return {id: entry["text"] for id, entry in entries.items()}
+
+def print_savings(entries: list[dict]):
+    """Prints how many bytes and tokens cleaning saved
+
+    Arguments:
+        entries {list[dict]} -- Cache entries of the cleaned descriptions
+    """
+    source_bytes = 0
+    cleaned_bytes = 0
+    source_tokens = 0
+    cleaned_tokens = 0
+    for entry in entries:
+        source_bytes += entry["source_bytes"]
+        cleaned_bytes += len(entry["text"].encode("utf-8"))
+        # Tokens are estimated from characters on both sides, since non ascii
+        # text takes more bytes than characters
+        source_tokens += estimate_tokens_from_chars(entry["source_chars"])
+        cleaned_tokens += estimate_tokens(entry["text"])
+
+    if source_bytes == 0:
+        return
+
+    saved_bytes = source_bytes - cleaned_bytes
+    saved_tokens = source_tokens - cleaned_tokens
+    print(f"Descriptions: {source_bytes / 1024 ** 2:.1f} MB -> {cleaned_bytes / 1024 ** 2:.1f} MB ({saved_bytes / source_bytes:.1%} saved)")
+    print(f"Estimated tokens saved: {saved_tokens} ({cleaned_tokens} left)")
+
+if __name__ == "__main__":
+    preprocess_descriptions("filtered_games.ndjson")
@@ -1,95 +1,37 @@
+import numpy as np
+
 from ..data_collection import load_json_file
-from bs4 import BeautifulSoup
+from .sentiment_statistics import emotions, get_description_statistics, get_sentiment_statistics
 
 def print_game_average_scores():
-    ratings = load_json_file("rating_ratings.json")
-
-    rating_count = len(ratings.keys())
-    total_rating_score = 0
-    min_score = 1000
-    max_score = 0
-    for key in ratings.keys():
-        rating = ratings[key]
-        if rating < min_score:
-            min_score = rating
-        if rating > max_score:
-            max_score = rating
-        total_rating_score += rating
+    # Scores are whole numbers, so min and max print as they were saved
+    ratings = np.fromiter(load_json_file("rating_ratings.json").values(), dtype=np.int64)
 
-    print(f"Average score: {total_rating_score / rating_count}\nMin score: {min_score}\nMax score: {max_score}")
+    print(f"Average score: {ratings.mean()}\nMin score: {int(ratings.min())}\nMax score: {int(ratings.max())}")
 
 def print_average_game_emotional_ratings():
-    emotional_ratings = load_json_file("rated_games.json")
-
-    average_dict = {
-        "anger" : 0,
-        "disgust" : 0,
-        "fear" : 0,
-        "happiness" : 0,
-        "sadness" : 0,
-        "surprise" : 0
-    }
-    emotion_list = list(average_dict.keys())
-
-    rating_count = len(emotional_ratings.keys())
-
     happiness_threshhold = 3
-    happiness_count = 0
     anger_threshhold = 8
-    anger_count = 0
-    for key in emotional_ratings.keys():
-        for emotion in emotion_list:
-            rating = emotional_ratings[key][emotion]
-            average_dict[emotion] += rating
+    statistics = get_sentiment_statistics("rated_games.json", {"happiness": happiness_threshhold, "anger": anger_threshhold})
 
-        if emotional_ratings[key]["happiness"] >= happiness_threshhold:
-            happiness_count += 1
-        if emotional_ratings[key]["anger"] >= anger_threshhold:
-            anger_count += 1
+    for emotion in emotions:
+        print(f"{emotion}: {statistics['means'][emotion]:.2f}")
 
-    for key in average_dict.keys():
-        average_dict[key] /= rating_count
-        print(f"{key}: {average_dict[key]:.2f}")
-
-    print(f"Number of games above happiness threshhold: {happiness_count}")
-    print(f"Number of games above anger threshhold: {anger_count}")
+    print(f"Number of games above happiness threshhold: {statistics['threshold_counts']['happiness']}")
+    print(f"Number of games above anger threshhold: {statistics['threshold_counts']['anger']}")
 
 def print_description_details():
-    game_data = load_json_file("filtered_games.json")
-
-    game_count = len(game_data.keys())
-
-    largest_description_count = 0
-    largest_description_id = -1
-    largest_word_count = 0
-
-    total_word_count = 0
-    total_description_count = 0
     # 50 words or less will save the count
     small_description_threshold = 100
-    small_description_count = 0
-    for key in game_data.keys():
-        description = game_data[key]["data"]["detailed_description"]
-        soup = BeautifulSoup(description,  "html.parser")
-        raw_description = soup.get_text().strip()
-        description_length = len(raw_description)
-        word_count = len(raw_description.split(" "))
-        if word_count <= small_description_threshold:
-            small_description_count += 1
-            print(f"Game's description below threshold: {key}")
-
-        if description_length > largest_description_count:
-            largest_description_id = key
-            largest_description_count = description_length
-            largest_word_count = word_count
+    statistics = get_description_statistics("filtered_games.json", small_description_threshold)
 
-        total_word_count += word_count
-        total_description_count += description_length
+    for key in statistics["small_description_ids"]:
+        print(f"Game's description below threshold: {key}")
 
-    print(f"Number of games below description threshhold: {small_description_count}")
-    print(f"Average description length: {total_description_count / game_count}")
-    print(f"Average word count: {total_word_count / game_count}")
-    print(f"Largest Description Length/Word Count/Game ID: {largest_description_count}/{largest_word_count}/{largest_description_id}")
+    print(f"Number of games below description threshhold: {len(statistics['small_description_ids'])}")
+    print(f"Average description length: {statistics['average_length']}")
+    print(f"Average word count: {statistics['average_word_count']}")
+    print(f"Largest Description Length/Word Count/Game ID: {statistics['largest_length']}/{statistics['largest_word_count']}/{statistics['largest_id']}")
 
 def main():
     print_average_game_emotional_ratings()
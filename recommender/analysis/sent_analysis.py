@@ -1,8 +1,18 @@
+import asyncio
 import json
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Mapping
 from enum import Enum
-from models.analysis_model import AnalysisModel
-from models.gpt_model import GptAnalyisModel
-import numpy as np
+from itertools import islice
+from ..data_collection import iter_ndjson, json_dumps, read_ndjson_ids
+from .models.analysis_model import AnalysisModel
+from .models.cached_model import CachedAnalysisModel
+from .models.fake_model import FakeAnalysisModel
+from .models.gpt_model import GptAnalyisModel
+from .preprocess import preprocess_descriptions
 
 class IncorrectReturnTypes(Enum):
     """Represents the different types of errors that could come about from the
@@ -14,6 +24,7 @@ class IncorrectReturnTypes(Enum):
     IncorrectNumEmotions = 3
     IncorrectEmotions = 4
     IncorrectValueRange = 5
+    IncorrectValueType = 6
 
 class IncorrectReturnDetails:
     """The details for an incorrect return. It holds the type of error and a
@@ -52,8 +63,11 @@ def check_response_content(response_dict: dict) -> dict|IncorrectReturnDetails:
         if emotion not in response_dict:
             return IncorrectReturnDetails(IncorrectReturnTypes.IncorrectEmotions, f"The model returned incorrect emotions. Emotion was {emotion}. Correct emotions are {', '.join(expected_emotions)}")
 
-    # Makes sure values are within the expected range
-    for val in response_dict.values():
+    # Makes sure values are numbers within the expected range
+    for emotion in expected_emotions:
+        val = response_dict[emotion]
+        if isinstance(val, bool) or not isinstance(val, (int, float)):
+            return IncorrectReturnDetails(IncorrectReturnTypes.IncorrectValueType, f"The model returned an emotion value that is not a number. Value of {emotion} was {json.dumps(val)}. It must return a number between 1 and 10 inclusive")
         if not (1 <= val <= 10):
             return IncorrectReturnDetails(IncorrectReturnTypes.IncorrectValueRange, f"The model returned an emotion value outside the range of 1-10. Value was {val}. It must return a value between 1 and 10 inclusive")
 
@@ -79,6 +93,9 @@ def check_response_format(response: str) -> dict|IncorrectReturnDetails:
         print(str(e))
         return IncorrectReturnDetails(IncorrectReturnTypes.DecodeError, "Model returned an invalid formatted json response")
 
+    if not isinstance(response_dict, dict):
+        return IncorrectReturnDetails(IncorrectReturnTypes.IncorrectContent, "Model did not return a json object of emotions")
+
     # Check the content itself for correct formatting
     correct_content = check_response_content(response_dict)
 
@@ -91,18 +108,12 @@ def save_results(results: list, filename: str):
         results {list} -- Results to save
         filename {str} -- Filename to save to
     """
-    with open(filename, "a") as f:
+    with open(filename, "a", encoding="utf-8") as f:
         for game in results:
             f.write(json.dumps(game))
             f.write("\n")
 
-def perform_sentiment_analysis(model: AnalysisModel):
-    """Performs analysis with the given model
-
-    Arguments:
-        model {AnalysisModel} -- Model to use
-    """
-    prompt_format = \
+prompt_format = \
 """ You will be given a text document to perform sentiment analysis on.
 It will be 6 class analysis on the following emotions:
 anger, disgust, fear, happiness, sadness, and surprise.
@@ -116,76 +127,488 @@ Here is an example of a response:
 If the text document contains sexual content, respond with None instead of a
 sentiment analysis. Here is the text document:"""
 
-    games_details_filename = "filtered_games.ndjson"
-    games = []
-    num_to_rate = np.inf
-    with open(games_details_filename, "r") as f:
-        # games = [json.loads(line) for line in f.readlines(num_to_grab)]
-        i = 0
-        for line in f:
-            games.append(json.loads(line))
-            i += 1
-            if i >= num_to_rate:
-                break
-
-    # Number of games to be analyzed before saving them all to an ndjson file
-    save_per_num_games = 50
-    save_filename = "rated_games.ndjson"
-
-    log_per_num_games = 10
-    num_games = len(games)
-
-    results = []
-    # Go through each game and send the analysis request for it
-    for i, game in enumerate(games):
-        key_list = list(game.keys())
-        id = key_list[0]
-        game_data = game[id]["data"]
-
-        # Get the description for the game
-        if "detailed_description" not in game_data:
-            print(f"No description found for this game: {game_data}")
-            return None
-        description = game_data["detailed_description"]
-
-        # Format and send the description to the model
-        query = f"{prompt_format}\n{description}"
-        response = model.send_query(query)
-
-        # Make sure the response is formatted correctly
-        response = check_response_format(response)
-        attempt_count = 1
-        # Will allow the model to attempt analysis 3 times before failing out
-        while isinstance(response, IncorrectReturnDetails):
-            # If the model decided to not rate the mode, skip
-            if response.type == IncorrectReturnTypes.NoReturn:
-                print(f"Model decided to not rate the following game description: {description}")
-                break
-            model.send_query(f"There was something wrong with the response: {response.message}.\nPlease send the json response in the correct format.")
-            attempt_count += 1
-            if attempt_count > 3:
-                raise Exception(f"The model failed multiple times to give a correctly formatted rating. Game Description: {description}\n\nQuery: {query}\n\nResult Info: {response.type}, {response.message}")
-
-        # In the event that the model decided not to analyze the description
-        if isinstance(response, IncorrectReturnDetails) and response.type == IncorrectReturnTypes.NoReturn:
-            pass
+batch_prompt_format = \
+""" You will be given several text documents to perform sentiment analysis on,
+each one starting with a line of the form "### <id>".
+Each will be 6 class analysis on the following emotions:
+anger, disgust, fear, happiness, sadness, and surprise.
+The emotion rating can be between 1 and 10. For instance, happiness of 10 means
+that the description is very happy while 1 means there isn't much happiness at
+all Please give the result in Json format as one object keyed by the id of
+each document.
+
+Here is an example of a response for documents with ids 10 and 20:
+{"10" : {"anger" : 5, "disgust" : 1, "fear" : 8, "happiness" : 2, "sadness" : 10, "surprise" : 3}, "20" : "None"}
+
+If a text document contains sexual content, give "None" for its id instead of a
+sentiment analysis. Here are the text documents:"""
+
+class AnalysisFailedError(Exception):
+    """Raised when the model keeps giving incorrectly formatted ratings
+    """
+    pass
+
+def is_correct_result(result: dict|IncorrectReturnDetails) -> bool:
+    """Checks if a result is a rating or the model choosing not to rate
+
+    Arguments:
+        result {dict|IncorrectReturnDetails} -- Result to check
+
+    Returns:
+        bool -- Whether the result doesn't need to be asked for again
+    """
+    return isinstance(result, dict) or (isinstance(result, IncorrectReturnDetails) and result.type == IncorrectReturnTypes.NoReturn)
+
+async def analyze_description(model: AnalysisModel, description: str, max_attempts: int = 3, check_cache: bool = True) -> dict|IncorrectReturnDetails:
+    """Sends a description to the model and checks its response, asking again
+    when the response is formatted incorrectly
+
+    Arguments:
+        model {AnalysisModel} -- Model to use
+        description {str} -- Game description to analyze
+
+    Keyword Arguments:
+        max_attempts {int} -- Attempts before failing out (default: {3})
+        check_cache {bool} -- Whether to look for a saved response before
+            sending the query (default: {True})
+
+    Raises:
+        AnalysisFailedError: The model didn't give a correct rating in time
+
+    Returns:
+        dict|IncorrectReturnDetails -- Emotion ratings or NoReturn details if
+            the model decided not to rate the description
+    """
+    # Descriptions the model has already answered are never sent again
+    if check_cache:
+        cached_response = model.get_cached_response(prompt_format, description)
+        if cached_response is not None:
+            response = check_response_format(cached_response)
+            if is_correct_result(response):
+                return response
+
+    # Format and send the description to the model
+    query = f"{prompt_format}\n{description}"
+    response = check_response_format(await model.send_query_async(query))
+
+    attempt_count = 1
+    while isinstance(response, IncorrectReturnDetails):
+        # If the model decided to not rate the game, skip
+        if response.type == IncorrectReturnTypes.NoReturn:
+            break
+
+        attempt_count += 1
+        if attempt_count > max_attempts:
+            raise AnalysisFailedError(f"The model failed multiple times to give a correctly formatted rating. Game Description: {description}\n\nQuery: {query}\n\nResult Info: {response.type}, {response.message}")
+
+        # Queries are independent, so the correction is sent with the original
+        # query for context
+        retry_query = f"{query}\n\nThere was something wrong with a previous response: {response.message}.\nPlease send the json response in the correct format."
+        response = check_response_format(await model.send_query_async(retry_query))
+
+    cache_result(model, description, response)
+    return response
+
+def cache_result(model: AnalysisModel, description: str, result: dict|IncorrectReturnDetails):
+    """Saves a correct result as the response to the single description prompt,
+    so batched and single queries share cache entries
+
+    Arguments:
+        model {AnalysisModel} -- Model to save to
+        description {str} -- Description that was analyzed
+        result {dict|IncorrectReturnDetails} -- Emotion ratings or NoReturn
+            details
+    """
+    if isinstance(result, dict):
+        model.cache_response(prompt_format, description, json.dumps(result))
+    elif result.type == IncorrectReturnTypes.NoReturn:
+        model.cache_response(prompt_format, description, "None")
+
+def build_batch_query(descriptions: dict[str, str]) -> str:
+    """Formats several descriptions into a single query
+
+    Arguments:
+        descriptions {dict[str, str]} -- Game ID to description
+
+    Returns:
+        str -- Query
+    """
+    documents = "\n\n".join(f"### {id}\n{description}" for id, description in descriptions.items())
+    return f"{batch_prompt_format}\n\n{documents}"
+
+def check_batch_response(response: str, ids: list[str]) -> dict[str, dict|IncorrectReturnDetails]:
+    """Checks a batched response string, validating the rating of every ID on
+    its own
+
+    Arguments:
+        response {str} -- Response to check
+        ids {list[str]} -- IDs that were sent in the query
+
+    Returns:
+        dict[str, dict|IncorrectReturnDetails] -- ID to either its ratings or
+            details about what was wrong
+    """
+    try:
+        response_dict = json.loads(response)
+    except json.decoder.JSONDecodeError:
+        details = IncorrectReturnDetails(IncorrectReturnTypes.DecodeError, "Model returned an invalid formatted json response")
+        return {id: details for id in ids}
+
+    if not isinstance(response_dict, dict):
+        details = IncorrectReturnDetails(IncorrectReturnTypes.IncorrectContent, "Model did not return a json object keyed by id")
+        return {id: details for id in ids}
+
+    results = {}
+    for id in ids:
+        rating = response_dict.get(id)
+        if rating is None:
+            results[id] = IncorrectReturnDetails(IncorrectReturnTypes.IncorrectContent, f"Model did not return a rating for {id}")
+        elif rating == "None":
+            results[id] = IncorrectReturnDetails(IncorrectReturnTypes.NoReturn, "Model returned None")
+        elif not isinstance(rating, dict):
+            results[id] = IncorrectReturnDetails(IncorrectReturnTypes.IncorrectContent, f"Model returned a rating for {id} that is not a json object")
         else:
-            results.append({id : response})
+            results[id] = check_response_content(rating)
 
-        # Save the results every set number of requests
-        if i % save_per_num_games == save_per_num_games - 1:
-            print("Saving Games")
-            save_results(results, save_filename)
-            results.clear()
+    return results
 
-        # Log results every set number of requests
-        if i % log_per_num_games == log_per_num_games - 1:
-            print(f"Games Rated: {i}/{num_games} ({(i/num_games):.2%})", end="\r")
+async def analyze_description_batch(model: AnalysisModel, descriptions: dict[str, str]) -> dict[str, dict|IncorrectReturnDetails|Exception]:
+    """Sends several descriptions to the model in one query. Any description
+    without a correct rating is split out and sent on its own
 
-    save_results(results, save_filename)
+    Arguments:
+        model {AnalysisModel} -- Model to use
+        descriptions {dict[str, str]} -- Game ID to description
+
+    Returns:
+        dict[str, dict|IncorrectReturnDetails|Exception] -- ID to its ratings,
+            NoReturn details if the model decided not to rate it, or the error
+            if it failed
+    """
+    results = {}
+    for id, description in descriptions.items():
+        cached_response = model.get_cached_response(prompt_format, description)
+        if cached_response is not None:
+            results[id] = check_response_format(cached_response)
+
+    ids = [id for id in descriptions.keys() if not is_correct_result(results.get(id))]
+    if len(ids) > 1:
+        # A failed batch query leaves every description to be sent on its own
+        try:
+            batch_results = check_batch_response(await model.send_query_async(build_batch_query({id: descriptions[id] for id in ids})), ids)
+        except Exception as e:
+            print(f"Batched query of {len(ids)} descriptions failed, sending them one at a time: {e}")
+            batch_results = {}
+        for id, result in batch_results.items():
+            results[id] = result
+            if is_correct_result(result):
+                cache_result(model, descriptions[id], result)
+
+    for id in ids:
+        if is_correct_result(results.get(id)):
+            continue
+
+        try:
+            results[id] = await analyze_description(model, descriptions[id], check_cache=False)
+        except Exception as e:
+            results[id] = e
+
+    return results
+
+class MeteredModel(AnalysisModel):
+    def __init__(self, model: AnalysisModel):
+        """Wraps a model to count the requests and characters sent to it
+
+        Arguments:
+            model {AnalysisModel} -- Model to wrap
+        """
+        super().__init__()
+        self.model = model
+        self.num_requests = 0
+        self.num_query_chars = 0
+        self.num_response_chars = 0
+
+    def send_query(self, query: str):
+        response = self.model.send_query(query)
+        self._count(query, response)
+        return response
+
+    async def send_query_async(self, query: str):
+        response = await self.model.send_query_async(query)
+        self._count(query, response)
+        return response
+
+    def get_cached_response(self, prompt: str, description: str) -> str:
+        return self.model.get_cached_response(prompt, description)
+
+    def cache_response(self, prompt: str, description: str, response: str):
+        self.model.cache_response(prompt, description, response)
+
+    def _count(self, query: str, response: str):
+        self.num_requests += 1
+        self.num_query_chars += len(query)
+        self.num_response_chars += len(response or "")
+
+    def print_usage(self, num_games: int, input_cost_per_million: float = None, output_cost_per_million: float = None):
+        """Prints the requests, estimated tokens, and estimated cost per game
+
+        Arguments:
+            num_games {int} -- Number of games analyzed
+
+        Keyword Arguments:
+            input_cost_per_million {float} -- Price of a million input tokens,
+                cost isn't printed if not given (default: {None})
+            output_cost_per_million {float} -- Price of a million output tokens
+                (default: {None})
+        """
+        if num_games == 0:
+            return
+
+        # Roughly 4 characters per token for English text
+        input_tokens = self.num_query_chars / 4 / num_games
+        output_tokens = self.num_response_chars / 4 / num_games
+        print(f"Requests per game: {self.num_requests / num_games:.3f}")
+        print(f"Estimated input/output tokens per game: {input_tokens:.0f}/{output_tokens:.0f}")
+        if input_cost_per_million is not None and output_cost_per_million is not None:
+            cost = (input_tokens * input_cost_per_million + output_tokens * output_cost_per_million) / 1_000_000
+            print(f"Estimated cost per game: {cost:.6f}")
+
+class OrderedCheckpoint:
+    def __init__(self, filename: str, skipped_filename: str, fsync_per_num_games: int = 10):
+        """Appends finished results to an ndjson file in the order the games were
+        read, no matter what order they finish in. Every result is flushed as
+        soon as it can be written so a crash only loses the games still in
+        flight
+
+        Arguments:
+            filename {str} -- Ndjson file to append ratings to
+            skipped_filename {str} -- Ndjson file to append games the model
+                decided not to rate to
+
+        Keyword Arguments:
+            fsync_per_num_games {int} -- Games written between syncing the files
+                to disk (default: {10})
+        """
+        self.filename = filename
+        self.skipped_filename = skipped_filename
+        self.fsync_per_num_games = fsync_per_num_games
+        # Index to finished result for games waiting on an earlier game
+        self._waiting: dict[int, tuple[str, dict]] = {}
+        self._next_index = 0
+        self._num_written = 0
+        self._file = None
+        self._skipped_file = None
+
+    def get_completed_ids(self) -> set[str]:
+        """Gets the IDs of games already rated or skipped by previous runs
+
+        Returns:
+            set[str] -- Game IDs
+        """
+        return read_ndjson_ids(self.filename) | read_ndjson_ids(self.skipped_filename)
+
+    def __enter__(self):
+        self._file = open(self.filename, "a", encoding="utf-8")
+        self._skipped_file = open(self.skipped_filename, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for f in (self._file, self._skipped_file):
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+
+    def add(self, index: int, game_id: str, result: dict):
+        """Adds a finished game, writing it and any games waiting on it
+
+        Arguments:
+            index {int} -- Order the game was read in
+            game_id {str} -- ID of the game
+            result {dict} -- Emotion ratings, None if the model decided not to
+                rate the game, or an exception if the analysis failed
+        """
+        self._waiting[index] = (game_id, result)
+        while self._next_index in self._waiting:
+            game_id, result = self._waiting.pop(self._next_index)
+            self._next_index += 1
+
+            # Failed games aren't written so they are retried on the next run
+            if isinstance(result, Exception):
+                continue
+
+            f = self._file if result is not None else self._skipped_file
+            f.write(json_dumps({game_id : result if result is not None else "None"}))
+            f.write("\n")
+            f.flush()
+
+            self._num_written += 1
+            if self._num_written % self.fsync_per_num_games == 0:
+                os.fsync(self._file.fileno())
+                os.fsync(self._skipped_file.fileno())
+
+async def run_sentiment_analysis(model: AnalysisModel, games_filename: str, save_filename: str, max_concurrency: int = 8, num_to_rate: int = None, batch_size: int = 1, descriptions: Mapping[str, str] = None, log_time_in_seconds: float = 5, input_cost_per_million: float = None, output_cost_per_million: float = None) -> MeteredModel:
+    """Rates every game that doesn't have a rating yet with a bounded number of
+    queries in flight at once
+
+    Arguments:
+        model {AnalysisModel} -- Model to use
+        games_filename {str} -- Ndjson file of games to rate
+        save_filename {str} -- Ndjson file to append ratings to
+
+    Keyword Arguments:
+        max_concurrency {int} -- Most queries in flight at once, meant to be set
+            to the provider's concurrency limit (default: {8})
+        num_to_rate {int} -- Most games to rate in this run, all of them if None
+            (default: {None})
+        batch_size {int} -- Number of descriptions sent in each query
+            (default: {1})
+        descriptions {Mapping[str, str]} -- Cleaned description of each game to
+            send instead of its raw html description (default: {None})
+        log_time_in_seconds {float} -- Time between progress updates
+            (default: {5})
+        input_cost_per_million {float} -- Price of a million input tokens,
+            cost isn't printed if not given (default: {None})
+        output_cost_per_million {float} -- Price of a million output tokens
+            (default: {None})
+
+    Returns:
+        MeteredModel -- Counts of the requests sent to the model
+    """
+    model = MeteredModel(model)
+    checkpoint = OrderedCheckpoint(save_filename, f"{os.path.splitext(save_filename)[0]}_skipped.ndjson")
+    completed_ids = checkpoint.get_completed_ids()
+
+    def iter_pending_games():
+        num_pending = 0
+        for game in iter_ndjson(games_filename):
+            id = next(iter(game.keys()))
+            if id in completed_ids:
+                continue
+            if num_to_rate is not None and num_pending >= num_to_rate:
+                return
+            num_pending += 1
+            yield id, game[id]["data"]
+
+    pending_games = enumerate(iter_pending_games())
+    start_time = time.monotonic()
+    last_log_time = start_time
+    num_done = 0
+    num_failed = 0
+
+    async def worker():
+        nonlocal num_done, num_failed, last_log_time
+        while True:
+            # The generator is shared, so each game is handed to exactly one
+            # worker
+            batch = list(islice(pending_games, batch_size))
+            if len(batch) == 0:
+                return
+
+            batch_descriptions = {}
+            results = {}
+            for _, (id, game_data) in batch:
+                if descriptions is not None:
+                    description = descriptions.get(id)
+                else:
+                    description = game_data.get("detailed_description")
+
+                if not description:
+                    print(f"No description found for this game: {id}")
+                    results[id] = None
+                else:
+                    batch_descriptions[id] = description
+
+            if len(batch_descriptions) > 0:
+                results.update(await analyze_description_batch(model, batch_descriptions))
+
+            for i, (id, _) in batch:
+                result = results[id]
+                # In the event that the model decided not to analyze the description
+                if isinstance(result, IncorrectReturnDetails):
+                    print(f"Model decided to not rate the following game: {id}")
+                    result = None
+                elif isinstance(result, Exception):
+                    print(f"Failed to rate game {id}: {result}")
+                    num_failed += 1
+
+                num_done += 1
+                checkpoint.add(i, id, result)
+
+            # Log results every set amount of time
+            now = time.monotonic()
+            if now - last_log_time >= log_time_in_seconds:
+                last_log_time = now
+                print(f"Games Rated: {num_done} ({num_failed} failed, {num_done / (now - start_time):.2f} games/s)", end="\r")
+
+    with checkpoint:
+        print(f"{len(completed_ids)} games already rated")
+        await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+
+    print(f"\nRated {num_done - num_failed} games in {time.monotonic() - start_time:.1f}s ({num_failed} failed)")
+    model.print_usage(num_done, input_cost_per_million, output_cost_per_million)
+
+    return model
+
+def perform_sentiment_analysis(model: AnalysisModel, max_concurrency: int = 8, batch_size: int = 1, cache_filename: str = "response_cache.sqlite", max_description_tokens: int = 1024):
+    """Performs analysis with the given model
+
+    Arguments:
+        model {AnalysisModel} -- Model to use
+
+    Keyword Arguments:
+        max_concurrency {int} -- Most queries in flight at once (default: {8})
+        batch_size {int} -- Number of descriptions sent in each query
+            (default: {1})
+        cache_filename {str} -- Response cache to answer already analyzed
+            descriptions from, no cache is used if None
+            (default: {"response_cache.sqlite"})
+        max_description_tokens {int} -- Token budget of each cleaned
+            description, raw html descriptions are sent if None
+            (default: {1024})
+    """
+    descriptions = None
+    if max_description_tokens is not None:
+        descriptions = preprocess_descriptions("filtered_games.ndjson", max_tokens=max_description_tokens)
+
+    if cache_filename is not None:
+        model = CachedAnalysisModel(model, cache_filename)
+
+    asyncio.run(run_sentiment_analysis(model, "filtered_games.ndjson", "rated_games.ndjson", max_concurrency, batch_size=batch_size, descriptions=descriptions))
+
+    if cache_filename is not None:
+        model.print_stats()
+        model.close()
+
+def compare_batch_sizes(model: AnalysisModel, games_filename: str, batch_sizes: list[int] = [1, 5, 10], num_games: int = 50, input_cost_per_million: float = None, output_cost_per_million: float = None):
+    """Rates the same sample of games with each batch size and prints the
+    requests and cost per game of each. The ratings are saved to temporary
+    files and thrown away
+
+    Arguments:
+        model {AnalysisModel} -- Model to use
+        games_filename {str} -- Ndjson file of games to sample from
+
+    Keyword Arguments:
+        batch_sizes {list[int]} -- Batch sizes to compare (default: {[1, 5, 10]})
+        num_games {int} -- Number of games in the sample (default: {50})
+        input_cost_per_million {float} -- Price of a million input tokens
+            (default: {None})
+        output_cost_per_million {float} -- Price of a million output tokens
+            (default: {None})
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for batch_size in batch_sizes:
+            print(f"--- Batch size {batch_size} ---")
+            save_filename = os.path.join(temp_dir, f"rated_games_{batch_size}.ndjson")
+            asyncio.run(run_sentiment_analysis(model, games_filename, save_filename, num_to_rate=num_games, batch_size=batch_size, input_cost_per_million=input_cost_per_million, output_cost_per_million=output_cost_per_million))
 
 if __name__ == "__main__":
-    model = GptAnalyisModel()
-    model.setup()
-    model.model_type = "gpt-5-mini"
-    perform_sentiment_analysis(model)
\ No newline at end of file
+    if "--fake" in sys.argv:
+        # Runs the pipeline offline with slow and failing queries, without
+        # spending anything on the API
+        compare_batch_sizes(FakeAnalysisModel(latency=0.2, failure_rate=0.05, malformed_rate=0.05), "filtered_games.ndjson")
+    else:
+        model = GptAnalyisModel()
+        model.setup()
+        model.model_type = "gpt-5-mini"
+        perform_sentiment_analysis(model)
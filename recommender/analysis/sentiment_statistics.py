@@ -0,0 +1,234 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from operator import itemgetter
+import os
+import numpy as np
+
+from ..data_collection import get_file_hash, json_dumps, json_loads, load_json_file
+from .preprocess import strip_html
+
+emotions = [
+    "anger",
+    "disgust",
+    "fear",
+    "happiness",
+    "sadness",
+    "surprise"
+]
+get_emotion_values = itemgetter(*emotions)
+
+percentiles = [5, 25, 50, 75, 95]
+
+def cached_by_file_hash(name: str, filename: str, compute, *args, cache_dir: str = "analysis_cache") -> dict:
+    """Gets results computed from a file, only computing them again when the
+    contents of the file or the arguments change
+
+    Arguments:
+        name {str} -- Name of the results
+        filename {str} -- Input file the results are computed from
+        compute {Callable} -- Computes the results from the filename and args,
+            must return json serializable data
+        *args -- Extra arguments passed to compute, part of the cache key
+
+    Keyword Arguments:
+        cache_dir {str} -- Directory results are saved in
+            (default: {"analysis_cache"})
+
+    Returns:
+        dict -- Results
+    """
+    key = sha256(f"{get_file_hash(filename)}\0{json_dumps(args)}".encode("utf-8")).hexdigest()
+    cache_filename = os.path.join(cache_dir, f"{name}_{key}.json")
+    if os.path.exists(cache_filename):
+        with open(cache_filename, "rb") as f:
+            return json_loads(f.read())
+
+    results = compute(filename, *args)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_filename = f"{cache_filename}.{os.getpid()}.tmp"
+        with open(temp_filename, "w", encoding="utf-8") as f:
+            f.write(json_dumps(results))
+        os.replace(temp_filename, cache_filename)
+    except OSError as e:
+        print(f"Unable to cache {name} results: {e}")
+
+    return results
+
+def get_emotion_matrix(emotional_ratings: dict) -> np.ndarray:
+    """Converts emotional ratings into a matrix with a row per game and a column
+    per emotion
+
+    Arguments:
+        emotional_ratings {dict} -- Game ID to emotion ratings
+
+    Returns:
+        np.ndarray -- (games, emotions) matrix
+    """
+    num_games = len(emotional_ratings)
+    values = (value for rating in emotional_ratings.values() for value in get_emotion_values(rating))
+    return np.fromiter(values, dtype=np.float64, count=num_games * len(emotions)).reshape(num_games, len(emotions))
+
+def compute_sentiment_statistics(emotion_matrix: np.ndarray, thresholds: dict[str, float] = None) -> dict:
+    """Computes every sentiment statistic over the emotion matrix at once
+
+    Arguments:
+        emotion_matrix {np.ndarray} -- (games, emotions) matrix
+
+    Keyword Arguments:
+        thresholds {dict[str, float]} -- Emotion to the rating games are counted
+            at or above (default: {None})
+
+    Returns:
+        dict -- Means, standard deviations, percentiles, histograms of the
+            ratings 1 to 10, threshold counts, and correlations between emotions
+    """
+    thresholds = thresholds or {}
+    num_games = len(emotion_matrix)
+    if num_games == 0:
+        return {"num_games": 0}
+
+    means = emotion_matrix.mean(axis=0)
+    stds = emotion_matrix.std(axis=0)
+    emotion_percentiles = np.percentile(emotion_matrix, percentiles, axis=0)
+
+    # Ratings are whole numbers from 1 to 10, so each column is binned by
+    # offsetting it into its own block of 10 and counting once
+    bins = np.clip(np.rint(emotion_matrix).astype(np.int64), 1, 10) - 1
+    histograms = np.bincount((bins + np.arange(len(emotions)) * 10).ravel(), minlength=len(emotions) * 10).reshape(len(emotions), 10)
+
+    threshold_counts = {emotion: int(np.count_nonzero(emotion_matrix[:, emotions.index(emotion)] >= threshold)) for emotion, threshold in thresholds.items()}
+
+    # Emotions every game rated the same have no correlation
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlations = np.nan_to_num(np.corrcoef(emotion_matrix, rowvar=False))
+
+    return {
+        "num_games": num_games,
+        "means": dict(zip(emotions, means.tolist())),
+        "stds": dict(zip(emotions, stds.tolist())),
+        "percentiles": {emotion: dict(zip(map(str, percentiles), emotion_percentiles[:, i].tolist())) for i, emotion in enumerate(emotions)},
+        "histograms": dict(zip(emotions, histograms.tolist())),
+        "threshold_counts": threshold_counts,
+        "correlations": {emotion: dict(zip(emotions, correlations[i].tolist())) for i, emotion in enumerate(emotions)}
+    }
+
+def _compute_sentiment_statistics_file(filename: str, thresholds: dict[str, float]) -> dict:
+    return compute_sentiment_statistics(get_emotion_matrix(load_json_file(filename)), thresholds)
+
+def get_sentiment_statistics(filename: str, thresholds: dict[str, float] = None) -> dict:
+    """Gets the sentiment statistics of a rated games file, cached by the hash
+    of the file
+
+    Arguments:
+        filename {str} -- Json file of game ID to emotion ratings
+
+    Keyword Arguments:
+        thresholds {dict[str, float]} -- Emotion to the rating games are counted
+            at or above (default: {None})
+
+    Returns:
+        dict -- Statistics from compute_sentiment_statistics
+    """
+    return cached_by_file_hash("sentiment", filename, _compute_sentiment_statistics_file, thresholds or {})
+
+def _measure_descriptions(descriptions: list[str]) -> list[tuple[int, int]]:
+    """Measures a chunk of descriptions in a worker process
+
+    Arguments:
+        descriptions {list[str]} -- Html descriptions
+
+    Returns:
+        list[tuple[int, int]] -- Character and word count of each description
+    """
+    measurements = []
+    for description in descriptions:
+        raw_description = strip_html(description)
+        measurements.append((len(raw_description), len(raw_description.split(" "))))
+    return measurements
+
+def compute_description_statistics(filename: str, small_description_threshold: int = 100, num_processes: int = None, chunk_size: int = 256) -> dict:
+    """Measures the text of every description across a pool of processes
+
+    Arguments:
+        filename {str} -- Json file of game data
+
+    Keyword Arguments:
+        small_description_threshold {int} -- Word count at or below which a
+            description counts as small (default: {100})
+        num_processes {int} -- Number of worker processes, the number of CPUs
+            if None (default: {None})
+        chunk_size {int} -- Descriptions sent to a worker at a time
+            (default: {256})
+
+    Returns:
+        dict -- Description length and word count statistics
+    """
+    game_data = load_json_file(filename)
+    game_ids = list(game_data.keys())
+    descriptions = [game_data[id]["data"]["detailed_description"] for id in game_ids]
+    del game_data
+    if len(game_ids) == 0:
+        return {"num_games": 0}
+
+    chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+    with ProcessPoolExecutor(num_processes) as executor:
+        measurements = np.array([measurement for chunk in executor.map(_measure_descriptions, chunks) for measurement in chunk], dtype=np.int64)
+
+    lengths = measurements[:, 0]
+    word_counts = measurements[:, 1]
+    small_mask = word_counts <= small_description_threshold
+    largest = int(np.argmax(lengths))
+    return {
+        "num_games": len(game_ids),
+        "small_description_ids": [game_ids[i] for i in np.flatnonzero(small_mask)],
+        "average_length": float(lengths.mean()),
+        "average_word_count": float(word_counts.mean()),
+        "length_percentiles": dict(zip(map(str, percentiles), np.percentile(lengths, percentiles).tolist())),
+        "largest_length": int(lengths[largest]),
+        "largest_word_count": int(word_counts[largest]),
+        "largest_id": game_ids[largest]
+    }
+
+def get_description_statistics(filename: str, small_description_threshold: int = 100) -> dict:
+    """Gets the description statistics of a game data file, cached by the hash
+    of the file
+
+    Arguments:
+        filename {str} -- Json file of game data
+
+    Keyword Arguments:
+        small_description_threshold {int} -- Word count at or below which a
+            description counts as small (default: {100})
+
+    Returns:
+        dict -- Statistics from compute_description_statistics
+    """
+    return cached_by_file_hash("descriptions", filename, compute_description_statistics, small_description_threshold)
+
+def print_sentiment_report(statistics: dict):
+    """Prints sentiment statistics as tables
+
+    Arguments:
+        statistics {dict} -- Statistics from compute_sentiment_statistics
+    """
+    print(f"Games: {statistics['num_games']}")
+    if statistics["num_games"] == 0:
+        return
+
+    print(f"{'':<10}{'mean':>7}{'std':>7}" + "".join(f"{f'p{p}':>6}" for p in percentiles))
+    for emotion in emotions:
+        emotion_percentiles = statistics["percentiles"][emotion]
+        print(f"{emotion:<10}{statistics['means'][emotion]:>7.2f}{statistics['stds'][emotion]:>7.2f}" + "".join(f"{emotion_percentiles[str(p)]:>6.1f}" for p in percentiles))
+
+    print("\nHistograms (ratings 1-10)")
+    for emotion in emotions:
+        print(f"{emotion:<10}" + "".join(f"{count:>7}" for count in statistics["histograms"][emotion]))
+
+    print("\nCorrelations")
+    print(f"{'':<10}" + "".join(f"{emotion[:7]:>8}" for emotion in emotions))
+    for emotion in emotions:
+        print(f"{emotion:<10}" + "".join(f"{statistics['correlations'][emotion][other]:>8.2f}" for other in emotions))
+
+if __name__ == "__main__":
+    print_sentiment_report(get_sentiment_statistics("rated_games.json"))
@@ -0,0 +1,184 @@
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+import time
+import numpy as np
+
+from .data_collection import JsonDictWriter
+from .neighbours import NeighbourIndex, build_neighbour_index, load_neighbour_table
+from .rating_journal import find_profile_filenames, load_profile_ratings
+from .sentiment_cache import load_sentiment_matrix
+from .user_profile import get_rating_weight
+
+def load_rating_weights(profile_filenames: list[str], sentiment_indices: Mapping[str, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stacks the ratings of every profile into a sparse (users x catalog)
+    weight matrix in coordinate form. Ratings of games that aren't in the
+    catalog are left out
+
+    Arguments:
+        profile_filenames {list[str]} -- Profile files, a row per file
+        sentiment_indices {Mapping[str, int]} -- Lookup from game ID to
+            sentiment matrix row indice
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray] --
+            The user row of each rating,
+            the game row of each rating,
+            the weight of each rating
+    """
+    user_rows = []
+    game_rows = []
+    weights = []
+    for user_row, filename in enumerate(profile_filenames):
+        for game_id, rating in load_profile_ratings(filename).items():
+            if game_id in sentiment_indices:
+                user_rows.append(user_row)
+                game_rows.append(sentiment_indices[game_id])
+                weights.append(get_rating_weight(rating))
+
+    return np.array(user_rows, dtype=np.intp), np.array(game_rows, dtype=np.intp), np.array(weights, dtype=np.float64)
+
+def score_users(user_rows: np.ndarray, game_rows: np.ndarray, weights: np.ndarray, num_users: int, neighbour_index: NeighbourIndex, num_recommendations: int, num_similar_games: int = 100) -> tuple[np.ndarray, np.ndarray]:
+    """Gets the top recommendations of a block of users. Matches the scores of
+    UserProfile, where each rated game adds its weighted similarity to the
+    games most similar to it
+
+    Arguments:
+        user_rows {np.ndarray} -- User row of each rating, from 0 to num_users
+        game_rows {np.ndarray} -- Game row of each rating
+        weights {np.ndarray} -- Weight of each rating
+        num_users {int} -- Number of users in the block
+        neighbour_index {NeighbourIndex} -- Index to find similar games with
+        num_recommendations {int} -- Recommendations per user
+
+    Keyword Arguments:
+        num_similar_games {int} -- Number of the most similar games each rated
+            game adds a score to (default: {100})
+
+    Returns:
+        tuple[np.ndarray, np.ndarray] --
+            (users, recommendations) game rows sorted from best to worst,
+            their scores, with -inf where a user has too few recommendations
+    """
+    num_recommendations = min(num_recommendations, neighbour_index.num_games)
+    top_rows = np.zeros((num_users, num_recommendations), dtype=np.intp)
+    top_scores = np.full((num_users, num_recommendations), -np.inf)
+    if neighbour_index.num_games < 2 or len(game_rows) == 0 or num_recommendations == 0:
+        return top_rows, top_scores
+
+    # Games rated by several users are only searched for once
+    unique_game_rows, inverse = np.unique(game_rows, return_inverse=True)
+    similar_rows, similarities = neighbour_index.query(unique_game_rows, num_similar_games)
+    similar_rows = similar_rows[inverse]
+    similarities = similarities[inverse]
+    # Padding from a search that came up short isn't a similar game
+    is_found = np.isfinite(similarities)
+    weighted_similarities = similarities[is_found] * np.broadcast_to(weights[:, np.newaxis], similarities.shape)[is_found]
+
+    # Only the (user, game) pairs some rating adds to are summed, so memory
+    # grows with the ratings rather than the catalog
+    num_games = np.int64(neighbour_index.num_games)
+    pair_keys = (user_rows[:, np.newaxis].astype(np.int64) * num_games + similar_rows)[is_found]
+    pair_keys, pair_inverse = np.unique(pair_keys, return_inverse=True)
+    pair_scores = np.bincount(pair_inverse, weights=weighted_similarities, minlength=len(pair_keys))
+
+    # Games the user has seen are left out
+    is_candidate = ~np.isin(pair_keys, user_rows.astype(np.int64) * num_games + game_rows)
+    pair_keys = pair_keys[is_candidate]
+    pair_scores = pair_scores[is_candidate]
+    pair_users = pair_keys // num_games
+    pair_games = pair_keys % num_games
+
+    # Sorted by user, then from best to worst, with ties in catalog order like
+    # UserProfile
+    order = np.lexsort((pair_games, -pair_scores, pair_users))
+    pair_users = pair_users[order]
+    user_starts = np.searchsorted(pair_users, np.arange(num_users + 1))
+    for user_row in range(num_users):
+        start = user_starts[user_row]
+        end = min(user_starts[user_row + 1], start + num_recommendations)
+        top_rows[user_row, :end - start] = pair_games[order[start:end]]
+        top_scores[user_row, :end - start] = pair_scores[order[start:end]]
+
+    return top_rows, top_scores
+
+# Set once in each worker process so the index isn't sent with every task
+_worker_neighbour_index: NeighbourIndex = None
+
+def _init_worker(neighbour_table_prefix: str, fingerprint: str, neighbour_index: NeighbourIndex):
+    global _worker_neighbour_index
+    # A prebuilt table is memory-mapped, so every worker shares its pages
+    # instead of being sent a copy
+    if neighbour_index is None:
+        neighbour_index = load_neighbour_table(neighbour_table_prefix, fingerprint)
+    _worker_neighbour_index = neighbour_index
+
+def _score_user_block(task: tuple[np.ndarray, np.ndarray, np.ndarray, int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+    user_rows, game_rows, weights, num_users, num_recommendations, num_similar_games = task
+    return score_users(user_rows, game_rows, weights, num_users, _worker_neighbour_index, num_recommendations, num_similar_games)
+
+def run_batch_recommendations(rated_games_filename: str = "rated_games.json",
+                              profile_directory: str = ".",
+                              output_filename: str = "batch_recommendations.json",
+                              num_recommendations: int = 50,
+                              neighbour_table_prefix: str = "neighbour_table",
+                              num_similar_games: int = 100,
+                              num_processes: int = None,
+                              users_per_task: int = 64):
+    """Precomputes the top recommendations of every saved profile. Users are
+    scored in blocks across a pool of processes and the results are written to
+    a single json file of user name to [game ID, score] pairs
+
+    Keyword Arguments:
+        rated_games_filename {str} -- Json file of emotional ratings
+            (default: {"rated_games.json"})
+        profile_directory {str} -- Directory to find profiles in
+            (default: {"."})
+        output_filename {str} -- Json file to write recommendations to
+            (default: {"batch_recommendations.json"})
+        num_recommendations {int} -- Recommendations per user (default: {50})
+        neighbour_table_prefix {str} -- Prefix of a prebuilt neighbour table,
+            similar games are searched for if there isn't one
+            (default: {"neighbour_table"})
+        num_similar_games {int} -- Number of the most similar games each rated
+            game adds a score to (default: {100})
+        num_processes {int} -- Number of worker processes, the number of CPUs
+            if None (default: {None})
+        users_per_task {int} -- Users scored at once by a worker
+            (default: {64})
+    """
+    start_time = time.monotonic()
+    sentiment_data = load_sentiment_matrix(rated_games_filename)
+    game_ids = sentiment_data.game_ids
+
+    profile_filenames = find_profile_filenames(profile_directory)
+    user_names = list(profile_filenames.keys())
+    user_rows, game_rows, weights = load_rating_weights(list(profile_filenames.values()), sentiment_data.sentiment_indices)
+    print(f"Loaded {len(user_names)} profiles with {len(weights)} ratings in {time.monotonic() - start_time:.1f}s")
+
+    # Ratings are stacked by user, so each block of users is a contiguous
+    # slice of the coordinates
+    block_starts = list(range(0, len(user_names), users_per_task))
+    boundaries = np.searchsorted(user_rows, block_starts + [len(user_names)])
+    tasks = []
+    for i, block_start in enumerate(block_starts):
+        start, end = boundaries[i], boundaries[i + 1]
+        num_users = min(users_per_task, len(user_names) - block_start)
+        tasks.append((user_rows[start:end] - block_start, game_rows[start:end], weights[start:end], num_users, num_recommendations, num_similar_games))
+
+    # Without a table the index is built once here rather than in every worker
+    neighbour_index = None
+    if neighbour_table_prefix is None or load_neighbour_table(neighbour_table_prefix, sentiment_data.fingerprint) is None:
+        neighbour_index = build_neighbour_index(sentiment_data.normalized_matrix)
+
+    with ProcessPoolExecutor(num_processes, initializer=_init_worker, initargs=(neighbour_table_prefix, sentiment_data.fingerprint, neighbour_index)) as executor, JsonDictWriter(output_filename) as writer:
+        for block_start, (top_rows, top_scores) in zip(block_starts, executor.map(_score_user_block, tasks)):
+            for user_offset, (rows, scores) in enumerate(zip(top_rows, top_scores)):
+                is_valid = np.isfinite(scores)
+                recommendations = [[str(game_ids[row]), float(score)] for row, score in zip(rows[is_valid], scores[is_valid])]
+                writer.write(user_names[block_start + user_offset], recommendations)
+
+    elapsed = time.monotonic() - start_time
+    print(f"Wrote recommendations for {len(user_names)} users to {output_filename} in {elapsed:.1f}s ({len(user_names) / max(elapsed, 1e-9):.0f} users/s)")
+
+if __name__ == "__main__":
+    run_batch_recommendations()
@@ -0,0 +1,379 @@
+from datetime import datetime
+from itertools import cycle
+from time import perf_counter
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import numpy as np
+
+from .data_collection import create_filters, filter_games, load_json_file, load_ndjson_file
+from .data_collection.filter_games import default_filter_config
+from .neighbours import build_neighbour_index
+from .user_profile import GameRecommendationStatus, UserProfile, get_sentiment_matrix, normalize_sentiment_matrix, sentiment_order
+
+default_catalog_sizes = [1000, 10000, 100000]
+default_profile_sizes = [10, 100, 1000, 10000]
+
+# Seconds each entry point can take to import before the startup check fails
+default_startup_budgets = {
+    "main_recommender": 0.5,
+    "main_rater": 0.5,
+    "main_rating_analysis": 0.25
+}
+# Directory the entry points are in
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+genres = [
+    {"id": "1", "description": "Action"},
+    {"id": "2", "description": "Strategy"},
+    {"id": "3", "description": "Indie"},
+    {"id": "23", "description": "Adventure"},
+    {"id": "25", "description": "RPG"},
+    {"id": "71", "description": "Sexual Content"}
+]
+
+def generate_catalog(directory: str, num_games: int, seed: int = 0):
+    """Writes a synthetic catalog in the formats the project reads:
+    rated_games.json, filtered_games.json, filtered_games.ndjson, and an
+    unfiltered game_dump.ndjson where about half the games get filtered out
+
+    Arguments:
+        directory {str} -- Directory to write to
+        num_games {int} -- Number of games in the filtered catalog
+
+    Keyword Arguments:
+        seed {int} -- Seed for the generated values (default: {0})
+    """
+    rng = np.random.default_rng(seed)
+    emotions = rng.integers(1, 11, size=(num_games, len(sentiment_order)))
+    genre_picks = rng.integers(0, len(genres) - 1, size=(num_games, 2))
+    description_lengths = rng.integers(20, 200, size=num_games)
+
+    rated_games = {}
+    with open(os.path.join(directory, "filtered_games.ndjson"), "w", encoding="utf-8") as ndjson_file, open(os.path.join(directory, "game_dump.ndjson"), "w", encoding="utf-8") as dump_file:
+        filtered_games = {}
+        for i in range(num_games):
+            game_id = str(10 * i)
+            rated_games[game_id] = dict(zip(sentiment_order, emotions[i].tolist()))
+            game = {
+                "success": True,
+                "data": {
+                    "type": "game",
+                    "name": f"Game {game_id}",
+                    "header_image": f"https://example.com/{game_id}/header.jpg",
+                    "detailed_description": "<p>" + "word " * int(description_lengths[i]) + "<br><img src=\"https://example.com/image.png\"></p>",
+                    "genres": [genres[j] for j in set(genre_picks[i].tolist())],
+                    "recommendations": {"total": 10000 + i}
+                }
+            }
+            filtered_games[game_id] = game
+            line = json.dumps({game_id: game})
+            ndjson_file.write(line + "\n")
+            dump_file.write(line + "\n")
+            # A rejected entry next to every kept one
+            dump_file.write(json.dumps({str(10 * i + 1): {"success": False}}) + "\n")
+
+    with open(os.path.join(directory, "rated_games.json"), "w", encoding="utf-8") as f:
+        json.dump(rated_games, f)
+    with open(os.path.join(directory, "filtered_games.json"), "w", encoding="utf-8") as f:
+        json.dump(filtered_games, f)
+
+def generate_profile(game_ids: list[str], num_ratings: int, seed: int = 0) -> dict:
+    """Generates the ratings of a synthetic user profile
+
+    Arguments:
+        game_ids {list[str]} -- IDs of the games to rate from
+        num_ratings {int} -- Number of ratings, capped to the number of games
+
+    Keyword Arguments:
+        seed {int} -- Seed for the games and ratings picked (default: {0})
+
+    Returns:
+        dict -- Game ID to [status, rating] in the profile file format
+    """
+    rng = np.random.default_rng(seed)
+    num_ratings = min(num_ratings, len(game_ids))
+    rows = rng.choice(len(game_ids), size=num_ratings, replace=False)
+    statuses = rng.integers(0, 2, size=num_ratings)
+    ratings = rng.integers(0, 11, size=num_ratings)
+    return {game_ids[row]: [int(status), int(rating)] for row, status, rating in zip(rows, statuses, ratings)}
+
+def time_function(function, repeat: int = 5, setup = None, number: int = 1) -> dict:
+    """Times a function several times
+
+    Arguments:
+        function {Callable} -- Function to time, given the result of setup if
+            there is one
+
+    Keyword Arguments:
+        repeat {int} -- Number of timed runs (default: {5})
+        setup {Callable} -- Untimed function run before each timed run
+            (default: {None})
+        number {int} -- Calls per timed run, for functions too fast to time
+            on their own (default: {1})
+
+    Returns:
+        dict -- Median, minimum, and maximum seconds per call, and the repeat
+            count
+    """
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        start = perf_counter()
+        for _ in range(number):
+            function(argument) if setup is not None else function()
+        times.append((perf_counter() - start) / number)
+
+    return {"median": float(np.median(times)), "min": min(times), "max": max(times), "repeat": repeat}
+
+def benchmark_catalog(directory: str, num_games: int, profile_sizes: list[int], repeat: int) -> dict:
+    """Runs every benchmark on one generated catalog
+
+    Arguments:
+        directory {str} -- Directory of the generated catalog
+        num_games {int} -- Number of games in the catalog
+        profile_sizes {list[int]} -- Number of ratings of each profile
+        repeat {int} -- Number of timed runs per benchmark
+
+    Returns:
+        dict -- Benchmark name to its timings
+    """
+    results = {}
+    rated_games_filename = os.path.join(directory, "rated_games.json")
+    rated_games = load_json_file(rated_games_filename)
+
+    results[f"load_json_file/{num_games}"] = time_function(lambda: load_json_file(rated_games_filename), repeat)
+    results[f"load_ndjson_file/{num_games}"] = time_function(lambda: load_ndjson_file(os.path.join(directory, "filtered_games.ndjson")), repeat)
+    results[f"get_sentiment_matrix/{num_games}"] = time_function(lambda: get_sentiment_matrix(rated_games), repeat)
+
+    game_ids, sentiment_indices, sentiment_matrix = get_sentiment_matrix(rated_games)
+    normalized_matrix, _ = normalize_sentiment_matrix(sentiment_matrix)
+    neighbour_index = build_neighbour_index(normalized_matrix)
+
+    for num_ratings in profile_sizes:
+        if num_ratings >= num_games:
+            continue
+
+        profile = UserProfile("benchmark")
+        profile.add_ratings(generate_profile(game_ids, num_ratings))
+
+        # Cold builds the scores from every rating, warm reuses them
+        def cold_profile():
+            profile._reset_scores()
+            return profile
+        results[f"generate_recommendation_list_cold/{num_games}/{num_ratings}"] = time_function(lambda profile: profile._generate_recommendation_list(game_ids, sentiment_indices, normalized_matrix, neighbour_index), repeat, cold_profile)
+        recommendation_list = profile._generate_recommendation_list(game_ids, sentiment_indices, normalized_matrix, neighbour_index)
+        results[f"generate_recommendation_list_warm/{num_games}/{num_ratings}"] = time_function(lambda: profile._generate_recommendation_list(game_ids, sentiment_indices, normalized_matrix, neighbour_index), repeat)
+
+        # A changed rating of a rated game, which takes its old rating back out
+        # of the built scores first
+        rerated_id = next(iter(profile.rated_games))
+        rerated_ratings = cycle([3, 7])
+        results[f"add_rating_rerate/{num_games}/{num_ratings}"] = time_function(lambda: profile.add_rating(rerated_id, [GameRecommendationStatus.Played, next(rerated_ratings)]), repeat, number=100)
+
+        # One more rating applied to built scores, like each submit in the UI.
+        # Every call rates a game the profile hasn't rated yet
+        unrated_ids = [game_id for game_id in game_ids if game_id not in profile.rated_games]
+        num_new_ratings = min(100, len(unrated_ids) // repeat)
+        if num_new_ratings > 0:
+            unrated_id_iter = iter(unrated_ids)
+            results[f"add_rating_incremental/{num_games}/{num_ratings}"] = time_function(lambda: profile.add_rating(next(unrated_id_iter), [GameRecommendationStatus.Played, 7]), repeat, number=num_new_ratings)
+
+        results[f"select_from_recommendation_list/{num_games}/{num_ratings}"] = time_function(lambda: profile._select_from_recommendation_list(recommendation_list, True), repeat, number=1000)
+
+    filters = create_filters(default_filter_config)
+    filtered_filename = os.path.join(directory, "benchmark_filtered.ndjson")
+    results[f"filter_games/{num_games}"] = time_function(lambda: filter_games(os.path.join(directory, "game_dump.ndjson"), filtered_filename, filters), repeat)
+
+    return results
+
+def get_metadata() -> dict:
+    """Gets details about the machine and versions a run was made with
+
+    Returns:
+        dict -- Metadata
+    """
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def run_benchmarks(catalog_sizes: list[int] = default_catalog_sizes, profile_sizes: list[int] = default_profile_sizes, repeat: int = 5, results_dir: str = "benchmark_results") -> str:
+    """Generates a catalog of each size, benchmarks it, and saves the results
+
+    Keyword Arguments:
+        catalog_sizes {list[int]} -- Number of games of each catalog
+            (default: {default_catalog_sizes})
+        profile_sizes {list[int]} -- Number of ratings of each profile
+            (default: {default_profile_sizes})
+        repeat {int} -- Number of timed runs per benchmark (default: {5})
+        results_dir {str} -- Directory results are saved in
+            (default: {"benchmark_results"})
+
+    Returns:
+        str -- Filename the results were saved to
+    """
+    results = {}
+    for num_games in catalog_sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            print(f"Generating a catalog of {num_games} games")
+            generate_catalog(directory, num_games)
+            results.update(benchmark_catalog(directory, num_games, profile_sizes, repeat))
+
+    print_results(results)
+
+    os.makedirs(results_dir, exist_ok=True)
+    results_filename = os.path.join(results_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(results_filename, "w", encoding="utf-8") as f:
+        json.dump({"metadata": get_metadata(), "results": results}, f, indent=4)
+    print(f"Saved results to {results_filename}")
+
+    return results_filename
+
+def print_results(results: dict):
+    """Prints benchmark timings as a table
+
+    Arguments:
+        results {dict} -- Benchmark name to its timings
+    """
+    print(f"{'Benchmark':<64}{'Median ms':>12}{'Min ms':>12}")
+    for name, timing in results.items():
+        print(f"{name:<64}{timing['median'] * 1000:>12.3f}{timing['min'] * 1000:>12.3f}")
+
+def compare_results(baseline_filename: str, current_filename: str, threshold: float = 0.1, min_difference: float = 1e-4) -> list[str]:
+    """Compares two saved runs and flags benchmarks that got slower. The
+    fastest run of each benchmark is compared since it is the least affected
+    by other work on the machine
+
+    Arguments:
+        baseline_filename {str} -- Results to compare against
+        current_filename {str} -- Results to check
+
+    Keyword Arguments:
+        threshold {float} -- Fraction slower a benchmark can get before it is
+            flagged (default: {0.1})
+        min_difference {float} -- Seconds slower a benchmark has to get to be
+            flagged, so timer noise on fast benchmarks isn't (default: {1e-4})
+
+    Returns:
+        list[str] -- Names of the benchmarks that regressed
+    """
+    baseline = load_json_file(baseline_filename)["results"]
+    current = load_json_file(current_filename)["results"]
+
+    regressions = []
+    print(f"{'Benchmark':<64}{'Baseline ms':>12}{'Current ms':>12}{'Change':>10}")
+    for name in sorted(baseline.keys() & current.keys()):
+        baseline_time = baseline[name]["min"]
+        current_time = current[name]["min"]
+        change = current_time / baseline_time - 1 if baseline_time > 0 else 0
+        is_regression = change > threshold and current_time - baseline_time > min_difference
+        if is_regression:
+            regressions.append(name)
+        print(f"{name:<64}{baseline_time * 1000:>12.3f}{current_time * 1000:>12.3f}{change:>+10.1%}{'  REGRESSION' if is_regression else ''}")
+
+    print(f"{len(regressions)} regressions over {threshold:.0%}")
+    return regressions
+
+def time_import(module: str, repeat: int = 5, cwd: str = project_dir) -> float:
+    """Times importing a module in fresh interpreters, so nothing is already
+    imported or cached in memory
+
+    Arguments:
+        module {str} -- Name of the module
+
+    Keyword Arguments:
+        repeat {int} -- Number of interpreters to time (default: {5})
+        cwd {str} -- Directory the interpreters are started in
+            (default: {project_dir})
+
+    Returns:
+        float -- Fastest import in seconds
+    """
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+
+    return min(times)
+
+def get_slowest_imports(module: str, num_imports: int = 10, cwd: str = project_dir) -> list[tuple[str, float]]:
+    """Gets the imports that take the longest when a module is imported, using
+    the interpreter's -X importtime report
+
+    Arguments:
+        module {str} -- Name of the module
+
+    Keyword Arguments:
+        num_imports {int} -- Number of imports to get (default: {10})
+        cwd {str} -- Directory the interpreter is started in
+            (default: {project_dir})
+
+    Returns:
+        list[tuple[str, float]] -- Imported module and its seconds including
+            everything it imports, slowest first
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, capture_output=True, text=True, check=True)
+
+    import_times = []
+    for line in result.stderr.splitlines():
+        # Lines are "import time: <self us> | <cumulative us> | <name>" with
+        # the name indented by its depth, and each import is listed after
+        # everything it imports
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        is_top_level = not parts[2].startswith("  ")
+        if is_top_level:
+            if name == module:
+                break
+            # Imported by the interpreter before the module, like site
+            import_times = []
+        else:
+            import_times.append((name, int(parts[1]) / 1e6))
+
+    return sorted(import_times, key=lambda import_time: import_time[1], reverse=True)[:num_imports]
+
+def check_startup_budgets(budgets: dict[str, float] = default_startup_budgets, repeat: int = 5) -> list[str]:
+    """Times importing each entry point and flags the ones over budget, along
+    with the imports that slow them down the most
+
+    Keyword Arguments:
+        budgets {dict[str, float]} -- Entry point module to the seconds it can
+            take to import (default: {default_startup_budgets})
+        repeat {int} -- Number of interpreters to time per entry point
+            (default: {5})
+
+    Returns:
+        list[str] -- Entry points over budget
+    """
+    over_budget = []
+    print(f"{'Entry point':<32}{'Import ms':>12}{'Budget ms':>12}")
+    for module, budget in budgets.items():
+        import_time = time_import(module, repeat)
+        is_over_budget = import_time > budget
+        print(f"{module:<32}{import_time * 1000:>12.1f}{budget * 1000:>12.1f}{'  OVER BUDGET' if is_over_budget else ''}")
+        if is_over_budget:
+            over_budget.append(module)
+            for name, cumulative_time in get_slowest_imports(module):
+                print(f"    {name:<60}{cumulative_time * 1000:>10.1f} ms")
+
+    print(f"{len(over_budget)} entry points over budget")
+    return over_budget
+
+if __name__ == "__main__":
+    if len(sys.argv) > 3 and sys.argv[1] == "compare":
+        sys.exit(1 if compare_results(sys.argv[2], sys.argv[3]) else 0)
+    elif len(sys.argv) > 1 and sys.argv[1] == "startup":
+        sys.exit(1 if check_startup_budgets() else 0)
+    else:
+        # Catalog sizes can be given to run larger ones, like 1000000
+        run_benchmarks([int(size) for size in sys.argv[1:]] or default_catalog_sizes)
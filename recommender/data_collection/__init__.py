@@ -1 +1,14 @@
-from .json_utils import get_json_from_url, load_json_file, load_ndjson_file, write_ndjson_to_file, convert_ndjson_to_json, write_json_to_file
\ No newline at end of file
+from ..lazy_imports import lazy_attributes
+from .json_utils import get_json_from_url, load_json_file, get_file_hash, load_ndjson_file, write_ndjson_to_file, convert_ndjson_to_json, write_json_to_file, iter_ndjson, iter_ndjson_batches, iter_ndjson_line_batches, parse_ndjson_lines, read_ndjson_ids, json_loads, json_dumps, JsonDictWriter
+from .game_store import GameStore
+from .filter_games import GameFilter, TypeFilter, MinRecommendationsFilter, BannedGenresFilter, create_filters, filter_games
+
+# The catalog is only imported when one of its names is first used, so the crawl
+# and filter scripts don't load NumPy
+_lazy_names = {
+    "CompactCatalog": (".catalog", "CompactCatalog"),
+    "compile_catalog": (".catalog", "compile_catalog"),
+    "load_game_data": (".catalog", "load_game_data")
+}
+
+__getattr__, __dir__ = lazy_attributes(globals(), _lazy_names)
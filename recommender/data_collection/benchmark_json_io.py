@@ -0,0 +1,72 @@
+from multiprocessing import Process, Queue
+from time import perf_counter
+import os
+import sys
+
+from .json_utils import iter_ndjson, load_ndjson_file, orjson
+
+# Only available on Unix, peak memory isn't measured without it
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def _count_list(filename: str) -> int:
+    return len(load_ndjson_file(filename))
+
+def _count_iter(filename: str) -> int:
+    return sum(1 for _ in iter_ndjson(filename))
+
+def _count_iter_unbatched(filename: str) -> int:
+    return sum(1 for _ in iter_ndjson(filename, batch_size=1))
+
+readers = {
+    "load_ndjson_file": _count_list,
+    "iter_ndjson": _count_iter,
+    "iter_ndjson (unbatched)": _count_iter_unbatched
+}
+
+def _run_reader(name: str, filename: str, results: Queue):
+    """Times a reader in its own process so its peak memory isn't mixed with
+    the other readers
+
+    Arguments:
+        name {str} -- Name of the reader in readers
+        filename {str} -- Ndjson file to read
+        results {Queue} -- Queue to put (seconds, records, peak KB) on, peak
+            KB is None if it can't be measured
+    """
+    start = perf_counter()
+    num_records = readers[name](filename)
+    elapsed = perf_counter() - start
+    peak_memory = None
+    if resource is not None:
+        # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            peak_memory //= 1024
+    results.put((elapsed, num_records, peak_memory))
+
+def benchmark_ndjson_readers(filename: str):
+    """Prints the throughput and peak memory of every ndjson reader
+
+    Arguments:
+        filename {str} -- Ndjson file to read
+    """
+    file_size = os.path.getsize(filename)
+    print(f"File: {filename} ({file_size / 1024 ** 2:.1f} MB), json backend: {'orjson' if orjson is not None else 'json'}")
+    peak_header = f"{'Peak MB':>10}" if resource is not None else ""
+    print(f"{'Reader':<28}{'Seconds':>10}{'MB/s':>10}{'Records/s':>12}{peak_header}")
+
+    for name in readers.keys():
+        results = Queue()
+        process = Process(target=_run_reader, args=(name, filename, results))
+        process.start()
+        elapsed, num_records, peak_memory = results.get()
+        process.join()
+
+        peak_column = f"{peak_memory / 1024:>10.1f}" if peak_memory is not None else ""
+        print(f"{name:<28}{elapsed:>10.2f}{file_size / 1024 ** 2 / elapsed:>10.1f}{num_records / elapsed:>12.0f}{peak_column}")
+
+if __name__ == "__main__":
+    benchmark_ndjson_readers(sys.argv[1] if len(sys.argv) > 1 else "new_game_dump.ndjson")
@@ -0,0 +1,249 @@
+from collections.abc import Mapping
+import json
+import mmap
+import os
+import numpy as np
+
+from .game_store import GameStore
+from .json_utils import get_file_hash, load_json_file
+
+def get_catalog_filenames(prefix: str) -> dict[str, str]:
+    """Gets the filenames a compiled catalog is stored in
+
+    Arguments:
+        prefix {str} -- Prefix shared by the files
+
+    Returns:
+        dict[str, str] -- Column name to filename
+    """
+    return {
+        "ids": f"{prefix}_ids.npy",
+        "names": f"{prefix}_names.npy",
+        "header_images": f"{prefix}_header_images.npy",
+        "genres": f"{prefix}_genres.npy",
+        "genre_table": f"{prefix}_genre_table.json",
+        "description_offsets": f"{prefix}_description_offsets.npy",
+        "descriptions": f"{prefix}_descriptions.bin",
+        "meta": f"{prefix}_meta.json"
+    }
+
+def write_catalog_meta(filename: str, meta: dict):
+    """Writes the description of a catalog, replacing the old one in a single
+    step
+
+    Arguments:
+        filename {str} -- Meta file
+        meta {dict} -- Description of the catalog
+    """
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_filename, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_filename, filename)
+
+def compile_catalog(game_data: dict, prefix: str, source_filename: str = None):
+    """Compiles game data into fixed width columns with an offset indexed blob
+    for the descriptions. Only the fields shown by the UI are kept
+
+    Arguments:
+        game_data {dict} -- Game data in the filtered_games.json format
+        prefix {str} -- Prefix of the files to save to
+
+    Keyword Arguments:
+        source_filename {str} -- Json file the game data was read from. Its
+            size, modification time, and hash are saved so the catalog is
+            rebuilt once the file changes (default: {None})
+    """
+    filenames = get_catalog_filenames(prefix)
+    # Read before compiling so a file changed meanwhile doesn't match the catalog
+    source_meta = None
+    if source_filename is not None:
+        stat = os.stat(source_filename)
+        source_meta = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": get_file_hash(source_filename)}
+    # The old catalog stops matching before any of its files are replaced
+    if os.path.exists(filenames["meta"]):
+        os.remove(filenames["meta"])
+
+    # Sorted so a game can be found with a binary search over the id column
+    game_ids = sorted(game_data.keys())
+    num_games = len(game_ids)
+
+    # Genres are stored as small codes, 0 means no genre
+    genre_codes = {}
+    genre_table = [None]
+    game_genres = []
+    for game_id in game_ids:
+        codes = []
+        for genre in game_data[game_id]["data"].get("genres", []):
+            if genre["id"] not in genre_codes:
+                genre_codes[genre["id"]] = len(genre_table)
+                genre_table.append(genre)
+            codes.append(genre_codes[genre["id"]])
+        game_genres.append(codes)
+
+    genres = np.zeros((num_games, max((len(codes) for codes in game_genres), default=0)), dtype=np.uint16)
+    for i, codes in enumerate(game_genres):
+        genres[i, :len(codes)] = codes
+
+    names = [game_data[game_id]["data"]["name"].encode("utf-8") for game_id in game_ids]
+    header_images = [game_data[game_id]["data"]["header_image"].encode("utf-8") for game_id in game_ids]
+
+    np.save(filenames["ids"], np.array(game_ids, dtype=str))
+    np.save(filenames["names"], np.array(names, dtype=bytes))
+    np.save(filenames["header_images"], np.array(header_images, dtype=bytes))
+    np.save(filenames["genres"], genres)
+    with open(filenames["genre_table"], "w", encoding="utf-8") as f:
+        json.dump(genre_table, f)
+
+    # Descriptions are written one after another with the offset of each
+    description_offsets = np.zeros(num_games + 1, dtype=np.int64)
+    with open(filenames["descriptions"], "wb") as f:
+        for i, game_id in enumerate(game_ids):
+            description = game_data[game_id]["data"].get("detailed_description", "").encode("utf-8")
+            f.write(description)
+            description_offsets[i + 1] = description_offsets[i] + len(description)
+    np.save(filenames["description_offsets"], description_offsets)
+
+    # Written last since the catalog is only used once the meta file matches
+    if source_meta is not None:
+        write_catalog_meta(filenames["meta"], {**source_meta, "num_games": num_games})
+
+def is_catalog_current(prefix: str, source_filename: str) -> bool:
+    """Checks whether a compiled catalog was built from the current version of
+    its json file
+
+    Arguments:
+        prefix {str} -- Prefix of the compiled catalog files
+        source_filename {str} -- Json file of game data
+
+    Returns:
+        bool -- Whether the catalog matches the file
+    """
+    meta_filename = get_catalog_filenames(prefix)["meta"]
+    if not os.path.exists(meta_filename):
+        return False
+    with open(meta_filename, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    stat = os.stat(source_filename)
+    if meta["size"] != stat.st_size:
+        return False
+    # A file that was only touched or copied keeps its contents, so it is
+    # hashed before the catalog is thrown away
+    if meta["mtime"] != stat.st_mtime:
+        if meta["sha256"] != get_file_hash(source_filename):
+            return False
+        meta["mtime"] = stat.st_mtime
+        try:
+            write_catalog_meta(meta_filename, meta)
+        except OSError:
+            pass
+
+    return True
+
+class CompactCatalog(Mapping):
+    def __init__(self, prefix: str):
+        """Read only game data backed by a compiled catalog. Columns are
+        memory-mapped and a game's fields are only decoded when it is looked up.
+        Games are returned in the same {"data": {...}} shape as the json files
+
+        Arguments:
+            prefix {str} -- Prefix of the compiled catalog files
+        """
+        filenames = get_catalog_filenames(prefix)
+        self._ids = np.load(filenames["ids"], mmap_mode="r")
+        self._names = np.load(filenames["names"], mmap_mode="r")
+        self._header_images = np.load(filenames["header_images"], mmap_mode="r")
+        self._genres = np.load(filenames["genres"], mmap_mode="r")
+        self._description_offsets = np.load(filenames["description_offsets"], mmap_mode="r")
+        self._genre_table = load_json_file(filenames["genre_table"])
+
+        # Empty files can't be memory-mapped
+        self._descriptions = b""
+        if os.path.getsize(filenames["descriptions"]) > 0:
+            with open(filenames["descriptions"], "rb") as f:
+                self._descriptions = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _get_row(self, game_id: str) -> int:
+        """Finds the row of a game
+
+        Arguments:
+            game_id {str} -- ID of the game
+
+        Returns:
+            int -- Row of the game or -1 if it isn't in the catalog
+        """
+        row = int(np.searchsorted(self._ids, game_id))
+        if row < len(self._ids) and self._ids[row] == game_id:
+            return row
+        return -1
+
+    def __getitem__(self, game_id: str) -> dict:
+        row = self._get_row(game_id) if isinstance(game_id, str) else -1
+        if row == -1:
+            raise KeyError(game_id)
+
+        start, end = int(self._description_offsets[row]), int(self._description_offsets[row + 1])
+        genres = [self._genre_table[code] for code in self._genres[row] if code != 0]
+        return {
+            "data": {
+                "name": self._names[row].decode("utf-8"),
+                "header_image": self._header_images[row].decode("utf-8"),
+                "detailed_description": self._descriptions[start:end].decode("utf-8"),
+                "genres": genres
+            }
+        }
+
+    def __contains__(self, game_id: object) -> bool:
+        return isinstance(game_id, str) and self._get_row(game_id) != -1
+
+    def __iter__(self):
+        return (str(game_id) for game_id in self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+def load_game_data(filename: str, catalog_prefix: str = None, ndjson_filename: str = None) -> Mapping:
+    """Loads game data, preferring a compiled catalog, then an indexed ndjson
+    file, before loading the whole json file into memory. A catalog built from
+    an older version of the json file is compiled again
+
+    Arguments:
+        filename {str} -- Json file of game data
+
+    Keyword Arguments:
+        catalog_prefix {str} -- Prefix of the compiled catalog, defaults to the
+            json filename without its extension (default: {None})
+        ndjson_filename {str} -- Ndjson file of the game data, defaults to the
+            json filename with an ndjson extension (default: {None})
+
+    Returns:
+        Mapping -- Game ID to game data
+    """
+    base_filename = os.path.splitext(filename)[0]
+    if catalog_prefix is None:
+        catalog_prefix = base_filename
+    if ndjson_filename is None:
+        ndjson_filename = f"{base_filename}.ndjson"
+
+    catalog_filenames = get_catalog_filenames(catalog_prefix)
+    if all(os.path.exists(catalog_filenames[column]) for column in catalog_filenames if column != "meta"):
+        # Without the json file there is nothing to check the catalog against
+        if not os.path.exists(filename) or is_catalog_current(catalog_prefix, filename):
+            return CompactCatalog(catalog_prefix)
+
+        print(f"The compiled catalog {catalog_prefix} is out of date with {filename}, compiling it again")
+        game_data = load_json_file(filename)
+        try:
+            compile_catalog(game_data, catalog_prefix, filename)
+        except OSError as e:
+            print(f"Unable to compile the catalog {catalog_prefix}: {e}")
+            return game_data
+        return CompactCatalog(catalog_prefix)
+
+    if os.path.exists(ndjson_filename):
+        return GameStore(ndjson_filename)
+
+    return load_json_file(filename)
+
+if __name__ == "__main__":
+    compile_catalog(load_json_file("filtered_games.json"), "filtered_games", "filtered_games.json")
@@ -1,4 +1,126 @@
-import json
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import time
+
+from .json_utils import iter_ndjson_line_batches, load_json_file, parse_ndjson_lines
+
+class GameFilter:
+    """Base for a rule games have to pass to be kept. The reason is what a
+    rejected game is counted under
+    """
+    reason = "rejected"
+
+    def accepts(self, data: dict) -> bool:
+        return True
+
+class TypeFilter(GameFilter):
+    def __init__(self, allowed_types: list[str]):
+        """Keeps games whose type is one of the allowed types
+
+        Arguments:
+            allowed_types {list[str]} -- Types to keep, such as "game"
+        """
+        self.allowed_types = set(allowed_types)
+        self.reason = "type"
+
+    def accepts(self, data: dict) -> bool:
+        return data.get("type") in self.allowed_types
+
+class MinRecommendationsFilter(GameFilter):
+    def __init__(self, min_recommendations: int):
+        """Keeps games with at least a set number of recommendations
+
+        Arguments:
+            min_recommendations {int} -- Fewest recommendations to keep
+        """
+        self.min_recommendations = min_recommendations
+        self.reason = "recommendations"
+
+    def accepts(self, data: dict) -> bool:
+        return "recommendations" in data and data["recommendations"]["total"] >= self.min_recommendations
+
+class BannedGenresFilter(GameFilter):
+    def __init__(self, banned_genre_ids: list[str]):
+        """Removes games that have any of the banned genres
+
+        Arguments:
+            banned_genre_ids {list[str]} -- Genre IDs to remove
+        """
+        self.banned_genre_ids = set(banned_genre_ids)
+        self.reason = "banned_genre"
+
+    def accepts(self, data: dict) -> bool:
+        return not any(genre["id"] in self.banned_genre_ids for genre in data.get("genres", []))
+
+# Banned ids = 71 (Sexual content), 72 (Nudity)
+default_filter_config = {
+    "types": ["game"],
+    "min_recommendations": 10000,
+    "banned_genre_ids": ["71", "72"]
+}
+
+def create_filters(config: dict) -> list[GameFilter]:
+    """Creates filters from a config in the default_filter_config format. Keys
+    that are left out don't filter
+
+    Arguments:
+        config {dict} -- Filter config
+
+    Returns:
+        list[GameFilter] -- Filters in the order they are checked
+    """
+    filters = []
+    if config.get("types") is not None:
+        filters.append(TypeFilter(config["types"]))
+    if config.get("min_recommendations") is not None:
+        filters.append(MinRecommendationsFilter(config["min_recommendations"]))
+    if config.get("banned_genre_ids") is not None:
+        filters.append(BannedGenresFilter(config["banned_genre_ids"]))
+    return filters
+
+def get_rejection_reason(game: dict, filters: list[GameFilter]) -> str:
+    """Checks a game against every filter
+
+    Arguments:
+        game {dict} -- Game in the {"<id>": {...}} format
+        filters {list[GameFilter]} -- Filters to check
+
+    Returns:
+        str -- Reason of the first filter it failed or None if it is kept
+    """
+    data = next(iter(game.values()))
+    if "data" not in data:
+        return "no_data"
+
+    data = data["data"]
+    for game_filter in filters:
+        if not game_filter.accepts(data):
+            return game_filter.reason
+    return None
+
+def add_game_genres(game: dict, genres: set[str]):
+    """Adds the genres of a game to a set
+
+    Arguments:
+        game {dict} -- Game in the {"<id>": {...}} format
+        genres {set[str]} -- ~ delimited string for genre id and genre description
+    """
+    data = next(iter(game.values()))
+    if "data" in data:
+        for genre in data["data"].get("genres", []):
+            genres.add(f"{genre['id']}~{genre['description']}")
+
+def add_game_type(game: dict, types: set[str]):
+    """Adds the type of a game to a set
+
+    Arguments:
+        game {dict} -- Game in the {"<id>": {...}} format
+        types {set[str]} -- Set of types
+    """
+    data = next(iter(game.values()))
+    if "data" in data and "type" in data["data"]:
+        types.add(data["data"]["type"])
 
 def get_genres(games: list) -> set[str]:
     """Gets all genres from a games list
@@ -11,14 +133,7 @@ def get_genres(games: list) -> set[str]:
     """
     genres = set()
     for game in games:
-        key_list = list(game.keys())
-        id = key_list[0]
-        data = game[id]
-        if "data" in data:
-            data = data["data"]
-            if "genres" in data:
-                for genre in data["genres"]:
-                    genres.add(f"{genre['id']}~{genre['description']}")
+        add_game_genres(game, genres)
     return genres
 
 def get_types(games: list) -> set[str]:
@@ -32,61 +147,109 @@ def get_types(games: list) -> set[str]:
     """
     types = set()
     for game in games:
-        key_list = list(game.keys())
-        id = key_list[0]
-        data = game[id]
-        if "data" in data:
-            data = data["data"]
-            types.add(data["type"])
+        add_game_type(game, types)
     return types
 
-if __name__ == "__main__":
-    filename = "new_game_dump.ndjson"
-    games = []
-    num_to_grab = 100
-    with open(filename, "r") as f:
-        # games = [json.loads(line) for line in f.readlines(num_to_grab)]
-        for line in f:
-            games.append(json.loads(line))
-
-    # Banned ids = 71 (Sexual content), 72 (Nudity)
-    banned_genre_ids = ["71", "72"]
-    min_required_recommendations = 10000
-    # Currently bans based off number of recommendations, genre, type (is it a game), and if it actually has data
-    banned_indices = []
-    for i, game in enumerate(games):
-        key_list = list(game.keys())
-        id = key_list[0]
-        data = game[id]
-        if "data" in data:
-            data = data["data"]
-            type = data["type"]
-            if type != "game":
-                banned_indices.append(i)
-                continue
-            if "recommendations" not in data:
-                banned_indices.append(i)
-                continue
-            recommendations = data["recommendations"]["total"]
-            if recommendations < min_required_recommendations:
-                banned_indices.append(i)
-                continue
-            if "genres" in data:
-                for genre in data["genres"]:
-                    if genre["id"] in banned_genre_ids:
-                        banned_indices.append(i)
-                        break
+class FilterReport:
+    def __init__(self):
+        """Counts and sets collected while filtering
+        """
+        self.num_read = 0
+        self.num_kept = 0
+        self.rejection_counts = Counter()
+        self.genres = set()
+        self.types = set()
+
+    def print_report(self, elapsed: float):
+        """Prints the counts
+
+        Arguments:
+            elapsed {float} -- Seconds filtering took
+        """
+        print(f"Kept {self.num_kept}/{self.num_read} games in {elapsed:.1f}s ({self.num_read / max(elapsed, 1e-9):.0f} games/s)")
+        for reason, count in self.rejection_counts.most_common():
+            print(f"    {reason}: {count}")
+        print(f"Found {len(self.genres)} genres and {len(self.types)} types")
+
+def _filter_lines(lines: list[bytes], filters: list[GameFilter]) -> tuple[list[bytes], FilterReport]:
+    """Parses and filters a batch of lines in a worker process
+
+    Arguments:
+        lines {list[bytes]} -- Stripped, non empty ndjson lines
+        filters {list[GameFilter]} -- Filters to check
+
+    Returns:
+        tuple[list[bytes], FilterReport] -- Lines that were kept and the counts
+            of the batch
+    """
+    report = FilterReport()
+    kept_lines = []
+    for line, game in zip(lines, parse_ndjson_lines(lines)):
+        report.num_read += 1
+        add_game_genres(game, report.genres)
+        add_game_type(game, report.types)
+
+        reason = get_rejection_reason(game, filters)
+        if reason is None:
+            report.num_kept += 1
+            kept_lines.append(line)
         else:
-            banned_indices.append(i)
-
-    num_indices = len(banned_indices)
-    print(num_indices)
-    banned_indices.reverse()
-    for i in banned_indices:
-        games.pop(i)
-
-    new_filename = "filtered_games.ndjson"
-    with open(new_filename, "w") as f:
-        for game in games:
-            f.write(json.dumps(game))
-            f.write("\n")
\ No newline at end of file
+            report.rejection_counts[reason] += 1
+
+    return kept_lines, report
+
+def filter_games(read_filename: str, write_filename: str, filters: list[GameFilter], num_processes: int = None, batch_size: int = 1000) -> FilterReport:
+    """Filters an ndjson dump in a single pass. Batches of lines are parsed and
+    checked across a pool of processes while kept lines are written in their
+    original order, with only a few batches held in memory at once
+
+    Arguments:
+        read_filename {str} -- Ndjson dump to filter
+        write_filename {str} -- Ndjson file to write kept games to
+        filters {list[GameFilter]} -- Filters every kept game passes
+
+    Keyword Arguments:
+        num_processes {int} -- Number of worker processes, the number of CPUs
+            if None (default: {None})
+        batch_size {int} -- Lines sent to a worker at a time (default: {1000})
+
+    Returns:
+        FilterReport -- Counts, rejection reasons, genres, and types of the dump
+    """
+    num_processes = num_processes or os.cpu_count() or 1
+    report = FilterReport()
+    start_time = time.monotonic()
+
+    def add_batch(kept_lines: list[bytes], batch_report: FilterReport):
+        for line in kept_lines:
+            f.write(line)
+            f.write(b"\n")
+        report.num_read += batch_report.num_read
+        report.num_kept += batch_report.num_kept
+        report.rejection_counts.update(batch_report.rejection_counts)
+        report.genres |= batch_report.genres
+        report.types |= batch_report.types
+
+    # Written to a temporary file first so an interrupted run doesn't leave a
+    # partial filtered file behind
+    temp_filename = f"{write_filename}.tmp"
+    with ProcessPoolExecutor(num_processes) as executor, open(temp_filename, "wb") as f:
+        # Bounded so the whole dump is never queued up in memory
+        pending = deque()
+        for lines in iter_ndjson_line_batches(read_filename, batch_size):
+            pending.append(executor.submit(_filter_lines, lines, filters))
+            if len(pending) >= num_processes * 2:
+                add_batch(*pending.popleft().result())
+
+        while pending:
+            add_batch(*pending.popleft().result())
+
+    os.replace(temp_filename, write_filename)
+    report.print_report(time.monotonic() - start_time)
+
+    return report
+
+if __name__ == "__main__":
+    config_filename = "filter_config.json"
+    config = load_json_file(config_filename) if os.path.exists(config_filename) else default_filter_config
+    filter_games("new_game_dump.ndjson", "filtered_games.ndjson", create_filters(config))
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from threading import Lock
+import os
+
+from .json_utils import json_dumps, json_loads
+
+def get_ndjson_line_id(line: bytes) -> str:
+    """Gets the game ID of an ndjson line without decoding the whole record
+
+    Arguments:
+        line {bytes} -- Line in the {"<id>": {...}} format
+
+    Returns:
+        str -- Game ID
+    """
+    # Lines written by json.dumps start with the id key, so it can be sliced
+    # out directly. Anything else falls back to a full decode
+    if line.startswith(b'{"'):
+        end = line.find(b'"', 2)
+        if end != -1 and line[end + 1:end + 2] == b":":
+            return line[2:end].decode("utf-8")
+
+    return next(iter(json_loads(line)))
+
+class GameStore(Mapping):
+    def __init__(self, filename: str, cache_size: int = 256):
+        """Random access game data over an ndjson file. The byte offset of every
+        game is indexed once and records are only decoded when looked up, with
+        the most recently used ones kept in a bounded cache
+
+        Arguments:
+            filename {str} -- Ndjson file in the {"<id>": {...}} per line format
+
+        Keyword Arguments:
+            cache_size {int} -- Number of decoded records to keep (default: {256})
+        """
+        self.filename = filename
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, dict] = OrderedDict()
+        # Reads share one file handle, so seeking and reading is locked
+        self._lock = Lock()
+        self._offsets: dict[str, tuple[int, int]] = self._load_index()
+        self._file = open(filename, "rb")
+
+    def _get_index_filename(self) -> str:
+        """Gets the filename the offset index is saved to
+
+        Returns:
+            str -- Filename
+        """
+        return f"{self.filename}.index.json"
+
+    def _load_index(self) -> dict[str, tuple[int, int]]:
+        """Loads the saved offset index if it matches the ndjson file or builds
+        a new one
+
+        Returns:
+            dict[str, tuple[int, int]] -- Game ID to the offset and length of
+                its line
+        """
+        stat = os.stat(self.filename)
+        index_filename = self._get_index_filename()
+        if os.path.exists(index_filename):
+            with open(index_filename, "rb") as f:
+                saved_index = json_loads(f.read())
+            if saved_index["size"] == stat.st_size and saved_index["mtime"] == stat.st_mtime:
+                return {id: tuple(location) for id, location in saved_index["offsets"].items()}
+
+        offsets = self._build_index()
+        try:
+            with open(index_filename, "w", encoding="utf-8") as f:
+                f.write(json_dumps({"size": stat.st_size, "mtime": stat.st_mtime, "offsets": offsets}))
+        except OSError as e:
+            print(f"Unable to save game index {index_filename}: {e}")
+
+        return offsets
+
+    def _build_index(self) -> dict[str, tuple[int, int]]:
+        """Scans the ndjson file for the offset of every game
+
+        Returns:
+            dict[str, tuple[int, int]] -- Game ID to the offset and length of
+                its line
+        """
+        offsets = {}
+        offset = 0
+        with open(self.filename, "rb") as f:
+            for line in f:
+                stripped_line = line.strip()
+                if stripped_line:
+                    offsets[get_ndjson_line_id(stripped_line)] = (offset, len(line))
+                offset += len(line)
+
+        return offsets
+
+    def __getitem__(self, game_id: str) -> dict:
+        with self._lock:
+            if game_id in self._cache:
+                self._cache.move_to_end(game_id)
+                return self._cache[game_id]
+
+            offset, length = self._offsets[game_id]
+            self._file.seek(offset)
+            record = json_loads(self._file.read(length))[game_id]
+
+            self._cache[game_id] = record
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return record
+
+    def __contains__(self, game_id: object) -> bool:
+        return game_id in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def close(self):
+        """Closes the ndjson file
+        """
+        self._file.close()
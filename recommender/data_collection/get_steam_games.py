@@ -1,59 +1,218 @@
+from queue import Queue
+from threading import Lock, Thread
 import json
 import os
 import time
+import requests
+from requests.adapters import HTTPAdapter
 
-from .json_utils import load_ndjson_file, get_json_from_url, write_ndjson_to_file
+from .json_utils import json_dumps, read_ndjson_ids
+
+steam_app_details_url = "https://store.steampowered.com/api/appdetails"
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int = 1):
+        """Rate limiter shared between threads. Tokens refill at a steady rate
+        up to the capacity and every request takes one
+
+        Arguments:
+            rate {float} -- Tokens added per second
+
+        Keyword Arguments:
+            capacity {int} -- Most tokens that can be saved up for a burst
+                (default: {1})
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        # No tokens are handed out before this time while paused
+        self._resume_at = 0
+        self._lock = Lock()
+
+    def acquire(self):
+        """Waits until a token is available and takes it
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    wait_time = self._resume_at - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                    self._last_refill = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+    def pause(self, seconds: float):
+        """Stops handing out tokens for a while, used when the server asks the
+        crawler to slow down. Pauses from several threads at once overlap
+        rather than adding up
+
+        Arguments:
+            seconds {float} -- Time to pause for
+        """
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+            # Tokens only start refilling once the pause is over
+            self._tokens = min(self._tokens, 0)
+            self._last_refill = max(self._last_refill, self._resume_at)
+
+def create_session(pool_size: int) -> requests.Session:
+    """Creates an HTTP session with a connection pool shared by the crawler
+    threads
+
+    Arguments:
+        pool_size {int} -- Number of connections to keep open
+
+    Returns:
+        requests.Session -- Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def fetch_app_details(session: requests.Session, rate_limiter: TokenBucket, base_url: str, app_id: str, max_attempts: int = 5) -> dict:
+    """Fetches the details of one app, retrying on errors
+
+    Arguments:
+        session {requests.Session} -- Session to send the request with
+        rate_limiter {TokenBucket} -- Limiter every request waits on
+        base_url {str} -- URL of the appdetails endpoint
+        app_id {str} -- ID of the app
+
+    Keyword Arguments:
+        max_attempts {int} -- Attempts before giving up (default: {5})
+
+    Returns:
+        dict -- App details response or None if every attempt failed
+    """
+    for attempt in range(max_attempts):
+        rate_limiter.acquire()
+        try:
+            response = session.get(base_url, params={"appids": app_id}, timeout=30)
+            # Steam answers too many requests with 429, so everyone backs off
+            if response.status_code == 429:
+                rate_limiter.pause(60)
+                continue
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching app {app_id} (attempt {attempt + 1}/{max_attempts}): {e}")
+        except ValueError as e:
+            print(f"Error decoding JSON for app {app_id} (attempt {attempt + 1}/{max_attempts}): {e}")
+        time.sleep(5)
+
+    return None
+
+def crawl_app_details(app_ids: list[str],
+                      dump_filename: str,
+                      base_url: str = steam_app_details_url,
+                      requests_per_second: float = 1 / 1.5,
+                      num_workers: int = 4,
+                      max_apps: int = None,
+                      update_time_in_seconds: float = 10,
+                      fsync_per_num_apps: int = 100):
+    """Downloads the details of every app that isn't already in the dump. Worker
+    threads share a connection pool and a rate limit while the calling thread
+    appends each response to the dump as it arrives
+
+    Arguments:
+        app_ids {list[str]} -- IDs of the apps to download
+        dump_filename {str} -- Ndjson file to append app details to
+
+    Keyword Arguments:
+        base_url {str} -- URL of the appdetails endpoint
+            (default: {steam_app_details_url})
+        requests_per_second {float} -- Rate limit across all workers
+            (default: {1 / 1.5})
+        num_workers {int} -- Number of requests in flight at once
+            (default: {4})
+        max_apps {int} -- Most apps to download in this run, all of them if
+            None (default: {None})
+        update_time_in_seconds {float} -- Time between progress updates
+            (default: {10})
+        fsync_per_num_apps {int} -- Apps written between syncing the dump to
+            disk (default: {100})
+    """
+    fetched_ids = read_ndjson_ids(dump_filename)
+    pending_ids = [str(app_id) for app_id in app_ids if str(app_id) not in fetched_ids]
+    if max_apps is not None:
+        pending_ids = pending_ids[:max_apps]
+    amount = len(pending_ids)
+
+    print(f"Downloading {amount} entries from Steam. {len(fetched_ids)}/{len(app_ids)} downloaded already which is {(len(fetched_ids) / max(len(app_ids), 1)):.2%}")
+
+    session = create_session(num_workers)
+    rate_limiter = TokenBucket(requests_per_second)
+    pending_iter = iter(pending_ids)
+    pending_lock = Lock()
+    results = Queue()
+
+    def worker():
+        while True:
+            with pending_lock:
+                app_id = next(pending_iter, None)
+            if app_id is None:
+                results.put(None)
+                return
+            results.put((app_id, fetch_app_details(session, rate_limiter, base_url, app_id)))
+
+    workers = [Thread(target=worker, daemon=True) for _ in range(num_workers)]
+    for thread in workers:
+        thread.start()
+
+    start_time = time.monotonic()
+    last_update_time = start_time
+    num_done = 0
+    num_failed = 0
+    num_finished_workers = 0
+    with open(dump_filename, "a", encoding="utf-8") as f:
+        while num_finished_workers < num_workers:
+            result = results.get()
+            if result is None:
+                num_finished_workers += 1
+                continue
+
+            app_id, app_details = result
+            num_done += 1
+            if app_details is None:
+                # Not written, so the app is fetched again on the next run
+                num_failed += 1
+            else:
+                f.write(json_dumps(app_details))
+                f.write("\n")
+                f.flush()
+                if num_done % fsync_per_num_apps == 0:
+                    os.fsync(f.fileno())
+
+            now = time.monotonic()
+            if now - last_update_time >= update_time_in_seconds:
+                last_update_time = now
+                rate = num_done / (now - start_time)
+                eta_minutes = (amount - num_done) / rate / 60 if rate > 0 else float("inf")
+                print(f" --- {(num_done / amount):.2%} {num_done}/{amount} {rate:.2f} apps/s ETA {eta_minutes:.1f} min ({num_failed} failed) ---", end="\r")
+
+        os.fsync(f.fileno())
+
+    elapsed = time.monotonic() - start_time
+    print(f"\nDownloaded {num_done - num_failed}/{amount} apps in {elapsed:.1f}s ({num_failed} failed)")
 
 if __name__ == "__main__":
     # steam_game_data = get_json_from_url("http://api.steampowered.com/ISteamApps/GetAppList/v0002/?format=json")
-    with open("game_list.json", "r") as f:
+    with open("game_list.json", "r", encoding="utf-8") as f:
         steam_game_data = json.load(f)
 
-    apps_data = []
-    game_count = len(steam_game_data["applist"]["apps"])
-    game_dump_filename = "new_game_dump.ndjson"
-
-    apps_dump_data = []
-    # Gets the length of the previous game_dump if it exists
-    if os.path.exists(game_dump_filename):
-        apps_dump_data = load_ndjson_file(game_dump_filename)
-
-    start = len(apps_dump_data)
+    app_ids = [app["appid"] for app in steam_game_data["applist"]["apps"]]
 
     # Figures out the amount of calls we can do with our given run_time and rate_limit
     rate_limit = 1.5
     time_to_run_in_minutes = 24 * 60
-    update_time_in_seconds = 10
-    amount = int((time_to_run_in_minutes*60) // rate_limit)
-    # amount = 10
-    end = amount + start
-    end = end if end < game_count else game_count
-
-    # One hour worth of downloads will be appended to the file at a time. Set to 0 to disable
-    num_downloads_till_update = 2400
-
-    print(f"Downloading {amount} entries from Steam. {start}/{game_count} downloaded already which is {(start/game_count):.2%}")
-
-    # Goes through and requests the data and adds it to our list
-    time_elapsed_since_update = 0
-    for i in range(start, end):
-        # Number of actual downloaded in this run
-        adjusted_i = i - start
-        if time_elapsed_since_update >= update_time_in_seconds:
-            time_elapsed_since_update = 0
-            print(f" --- {(adjusted_i / amount):.2%} {adjusted_i}/{amount} ---", end="\r")
-        app_id = steam_game_data['applist']['apps'][i]['appid']
-        apps_data.append(get_json_from_url(f"https://store.steampowered.com/api/appdetails?appids={app_id}"))
-
-        if num_downloads_till_update > 0:
-            num_downloads = adjusted_i + 1
-            if num_downloads % num_downloads_till_update == 0:
-                print(f"Updating game data at {num_downloads} downloads")
-                write_ndjson_to_file(game_dump_filename, apps_data)
-                apps_data.clear()
-
-        time.sleep(rate_limit)
-        time_elapsed_since_update += rate_limit
-
-    # Get previous dump to add to it
-    write_ndjson_to_file(game_dump_filename, apps_data)
\ No newline at end of file
+    amount = int((time_to_run_in_minutes * 60) // rate_limit)
+
+    crawl_app_details(app_ids, "new_game_dump.ndjson", requests_per_second=1 / rate_limit, max_apps=amount)
@@ -1,7 +1,42 @@
-import requests
+from collections.abc import Iterable, Iterator
+from hashlib import sha256
 import json
+import os
 import time
 
+# orjson is used for decoding and encoding when it is installed since it is
+# several times faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_loads(data: str | bytes) -> object:
+    """Decodes a json string with the fastest available backend
+
+    Arguments:
+        data {str | bytes} -- Json to decode
+
+    Returns:
+        object -- Decoded object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj: object) -> str:
+    """Encodes an object as a json string with the fastest available backend
+
+    Arguments:
+        obj {object} -- Object to encode
+
+    Returns:
+        str -- Json string
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
 def get_json_from_url(url: str) -> dict:
     """Pulls a json dict from a URL
 
@@ -11,6 +46,9 @@ def get_json_from_url(url: str) -> dict:
     Returns:
         dict -- Dictionary response from the URL
     """
+    # Imported here so reading local files doesn't pay for importing requests
+    import requests
+
     success = False
     while not success:
         try:
@@ -25,16 +63,16 @@ def get_json_from_url(url: str) -> dict:
             print(f"Error decoding JSON from {url}: {e}")
         time.sleep(5)
 
-def write_ndjson_to_file(filename: str, json_list: list):
+def write_ndjson_to_file(filename: str, json_list: Iterable):
     """Writes a list to a file as a newline delimited json file
 
     Arguments:
         filename {str} -- File to write to
-        json_list {list} -- List of dictionary objects
+        json_list {Iterable} -- List or iterable of dictionary objects
     """
-    with open(filename, "a") as f:
+    with open(filename, "a", encoding="utf-8") as f:
         for item in json_list:
-            f.write(json.dumps(item))
+            f.write(json_dumps(item))
             f.write("\n")
 
 def write_json_to_file(filename: str, json_dict: dict):
@@ -44,27 +82,128 @@ def write_json_to_file(filename: str, json_dict: dict):
         filename {str} -- File to write to
         json_dict {dict} -- Dictionary to save
     """
-    with open(filename, "w") as f:
+    with open(filename, "w", encoding="utf-8") as f:
         json.dump(json_dict, f)
 
-def load_ndjson_file(filename: str) -> list:
-    """Gets a list from an ndjson file
+def iter_ndjson_line_batches(filename: str, batch_size: int = 1000) -> Iterator[list[bytes]]:
+    """Reads an ndjson file a batch of undecoded lines at a time
 
     Arguments:
         filename {str} -- File to read from
 
-    Returns:
-        list -- Json dictionary list
+    Keyword Arguments:
+        batch_size {int} -- Number of lines per batch (default: {1000})
+
+    Yields:
+        list[bytes] -- Stripped, non empty lines of the next batch
     """
-    apps_dump_data = []
-    with open(filename, "r") as f:
+    with open(filename, "rb") as f:
+        lines = []
         for line in f:
             line = line.strip()
             if not line:
                 continue
-            obj = json.loads(line)
-            apps_dump_data.append(obj)
-    return apps_dump_data
+            lines.append(line)
+            if len(lines) >= batch_size:
+                yield lines
+                lines = []
+
+        if lines:
+            yield lines
+
+def iter_ndjson_batches(filename: str, batch_size: int = 1000) -> Iterator[list]:
+    """Reads an ndjson file a batch of lines at a time. Each batch is decoded
+    with a single call to the json backend
+
+    Arguments:
+        filename {str} -- File to read from
+
+    Keyword Arguments:
+        batch_size {int} -- Number of lines per batch (default: {1000})
+
+    Yields:
+        list -- Json dictionaries of the next batch of lines
+    """
+    for lines in iter_ndjson_line_batches(filename, batch_size):
+        yield parse_ndjson_lines(lines)
+
+def parse_ndjson_lines(lines: list[bytes]) -> list:
+    """Decodes a batch of ndjson lines by joining them into one json array
+
+    Arguments:
+        lines {list[bytes]} -- Stripped, non empty lines
+
+    Returns:
+        list -- Decoded objects
+    """
+    # orjson is fast enough per line that joining only adds copying
+    if orjson is not None:
+        return [orjson.loads(line) for line in lines]
+
+    try:
+        return json_loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        # Decodes line by line so the error points at the bad line
+        return [json_loads(line) for line in lines]
+
+def iter_ndjson(filename: str, batch_size: int = 1000) -> Iterator:
+    """Reads an ndjson file one object at a time without holding the whole file
+    in memory
+
+    Arguments:
+        filename {str} -- File to read from
+
+    Keyword Arguments:
+        batch_size {int} -- Number of lines decoded at once (default: {1000})
+
+    Yields:
+        object -- Json dictionary of each line
+    """
+    for batch in iter_ndjson_batches(filename, batch_size):
+        yield from batch
+
+def read_ndjson_ids(filename: str) -> set[str]:
+    """Gets the top level keys of every line in an ndjson file that is appended
+    to as a checkpoint. A partially written last line from an interrupted run is
+    removed so that entry is redone
+
+    Arguments:
+        filename {str} -- Ndjson file in the {"<id>": {...}} per line format
+
+    Returns:
+        set[str] -- IDs in the file
+    """
+    ids = set()
+    if not os.path.exists(filename):
+        return ids
+
+    complete_size = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete_size += len(line)
+            line = line.strip()
+            if line:
+                ids.update(json_loads(line).keys())
+
+    if complete_size != os.path.getsize(filename):
+        print(f"Removing a partially written entry from the end of {filename}")
+        with open(filename, "r+b") as f:
+            f.truncate(complete_size)
+
+    return ids
+
+def load_ndjson_file(filename: str) -> list:
+    """Gets a list from an ndjson file
+
+    Arguments:
+        filename {str} -- File to read from
+
+    Returns:
+        list -- Json dictionary list
+    """
+    return list(iter_ndjson(filename))
 
 def load_json_file(filename: str) -> dict:
     """Loads a json dict from a file
@@ -75,11 +214,76 @@ def load_json_file(filename: str) -> dict:
     Returns:
         dict -- Dictionary from file
     """
-    with open(filename, "r") as f:
+    with open(filename, "r", encoding="utf-8") as f:
         json_dict = json.load(f)
 
     return json_dict
 
+def get_file_hash(filename: str, chunk_size: int = 1024 ** 2) -> str:
+    """Hashes the contents of a file
+
+    Arguments:
+        filename {str} -- File to hash
+
+    Keyword Arguments:
+        chunk_size {int} -- Bytes read at a time (default: {1 MB})
+
+    Returns:
+        str -- Hash
+    """
+    file_hash = sha256()
+    with open(filename, "rb") as f:
+        while chunk := f.read(chunk_size):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+class JsonDictWriter:
+    def __init__(self, filename: str):
+        """Writes a json dictionary to a file one item at a time so the whole
+        dictionary never has to be in memory. Meant to be used as a context
+        manager. Items are written to a temporary file that only replaces the
+        target once the block exits cleanly, so an error partway through
+        leaves the old file as it was
+
+        Arguments:
+            filename {str} -- File to write to
+        """
+        self.filename = filename
+        self.temp_filename = f"{filename}.{os.getpid()}.tmp"
+        self._file = None
+        self._is_first_item = True
+
+    def __enter__(self):
+        self._file = open(self.temp_filename, "w", encoding="utf-8")
+        self._file.write("{")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._file.close()
+            os.remove(self.temp_filename)
+            return False
+
+        self._file.write("}")
+        self._file.close()
+        os.replace(self.temp_filename, self.filename)
+        return False
+
+    def write(self, key: str, value: object):
+        """Writes a single item of the dictionary
+
+        Arguments:
+            key {str} -- Dictionary key
+            value {object} -- Json serializable value
+        """
+        if not self._is_first_item:
+            self._file.write(", ")
+        self._is_first_item = False
+
+        self._file.write(json_dumps(key))
+        self._file.write(": ")
+        self._file.write(json_dumps(value))
+
 def convert_ndjson_to_json(read_filename: str, write_filename: str):
     """Converts an ndjson file into a json file. This assumes all dictionary keys
     are unique in the first dictionary layer of the ndjson file
@@ -88,14 +292,10 @@ def convert_ndjson_to_json(read_filename: str, write_filename: str):
         read_filename {str} -- Ndjson file to read from
         write_filename {str} -- Json file to save to
     """
-    lines: list[dict] = load_ndjson_file(read_filename)
-    json_dict = {}
-    for line in lines:
-        id = list(line.keys())[0]
-        json_dict[id] = line[id]
-
-    with open(write_filename, "w") as f:
-        json.dump(json_dict, f)
+    with JsonDictWriter(write_filename) as writer:
+        for line in iter_ndjson(read_filename):
+            for id, value in line.items():
+                writer.write(id, value)
 
 if __name__ == "__main__":
     # convert_ndjson_to_json("filtered_games.ndjson", "filtered_games.json")
@@ -0,0 +1,242 @@
+from collections.abc import Iterator, Mapping
+from threading import Lock
+import os
+import sqlite3
+import sys
+
+from .data_collection import iter_ndjson_batches, json_dumps, json_loads, load_json_file
+from .rating_journal import find_profile_filenames, load_profile_ratings
+
+# Tables keyed by game ID that hold a json value per game
+json_tables = ["games", "sentiments"]
+
+class DatabaseTable(Mapping):
+    def __init__(self, database: "RecommenderDatabase", table: str):
+        """Read only view of a table of json values keyed by game ID. Values are
+        looked up and decoded one at a time, so the table is never loaded into
+        memory as a whole
+
+        Arguments:
+            database {RecommenderDatabase} -- Database the table is in
+            table {str} -- Name of the table
+        """
+        if table not in json_tables:
+            raise ValueError(f"Unknown table {table}")
+        self.database = database
+        self.table = table
+
+    def __getitem__(self, game_id: str) -> dict:
+        row = self.database.fetch_one(f"SELECT value FROM {self.table} WHERE id = ?", (game_id,))
+        if row is None:
+            raise KeyError(game_id)
+        return json_loads(row[0])
+
+    def __contains__(self, game_id: object) -> bool:
+        return self.database.fetch_one(f"SELECT 1 FROM {self.table} WHERE id = ?", (game_id,)) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        # Rows come back in the order they were written, like the json files
+        return iter([row[0] for row in self.database.fetch_all(f"SELECT id FROM {self.table} ORDER BY rowid")])
+
+    def __len__(self) -> int:
+        return self.database.fetch_one(f"SELECT COUNT(*) FROM {self.table}")[0]
+
+    def values(self) -> list[dict]:
+        # Read with a single query instead of a lookup per game since the
+        # sentiment matrix is built from every value
+        return [json_loads(row[0]) for row in self.database.fetch_all(f"SELECT value FROM {self.table} ORDER BY rowid")]
+
+    def items(self) -> list[tuple[str, dict]]:
+        return [(row[0], json_loads(row[1])) for row in self.database.fetch_all(f"SELECT id, value FROM {self.table} ORDER BY rowid")]
+
+class RecommenderDatabase:
+    def __init__(self, filename: str = "recommender.sqlite"):
+        """Single file sqlite store for the game data, emotional ratings,
+        profile ratings, and rater scores that are otherwise kept in flat json
+        files. Every table is indexed by game ID, so lookups and saves only
+        touch the rows involved
+
+        Keyword Arguments:
+            filename {str} -- Sqlite database file
+                (default: {"recommender.sqlite"})
+        """
+        self.filename = filename
+
+        # The connection is shared by the Tk, prefetch, and service threads
+        self._lock = Lock()
+        self._connection = sqlite3.connect(filename, check_same_thread=False, timeout=30)
+        # Write ahead logging lets other processes read while one writes
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        for table in json_tables:
+            self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS profile_ratings (profile TEXT NOT NULL, game_id TEXT NOT NULL, status INTEGER NOT NULL, rating INTEGER NOT NULL, PRIMARY KEY (profile, game_id))")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS rater_scores (game_id TEXT PRIMARY KEY, score INTEGER NOT NULL)")
+        self._connection.commit()
+
+        self.games = DatabaseTable(self, "games")
+        self.sentiments = DatabaseTable(self, "sentiments")
+
+    def fetch_one(self, query: str, parameters: tuple = ()) -> tuple:
+        """Runs a query and gets its first row
+
+        Arguments:
+            query {str} -- Sql query
+
+        Keyword Arguments:
+            parameters {tuple} -- Query parameters (default: {()})
+
+        Returns:
+            tuple -- First row, None if there aren't any
+        """
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchone()
+
+    def fetch_all(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        """Runs a query and gets every row
+
+        Arguments:
+            query {str} -- Sql query
+
+        Keyword Arguments:
+            parameters {tuple} -- Query parameters (default: {()})
+
+        Returns:
+            list[tuple] -- Rows
+        """
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def write_json_values(self, table: str, values: Mapping):
+        """Inserts or replaces the json values of games in a table
+
+        Arguments:
+            table {str} -- Name of the table
+            values {Mapping} -- Game ID to value
+        """
+        if table not in json_tables:
+            raise ValueError(f"Unknown table {table}")
+        with self._lock, self._connection:
+            self._connection.executemany(f"INSERT OR REPLACE INTO {table} (id, value) VALUES (?, ?)", ((game_id, json_dumps(value)) for game_id, value in values.items()))
+
+    def load_profile_ratings(self, profile: str) -> dict:
+        """Loads the ratings of a profile
+
+        Arguments:
+            profile {str} -- Name of the profile
+
+        Returns:
+            dict -- Game ID to [status, rating]
+        """
+        rows = self.fetch_all("SELECT game_id, status, rating FROM profile_ratings WHERE profile = ? ORDER BY rowid", (profile,))
+        return {game_id: [status, rating] for game_id, status, rating in rows}
+
+    def save_profile_ratings(self, profile: str, ratings: dict):
+        """Inserts or replaces ratings of a profile, leaving its other ratings
+        as they are
+
+        Arguments:
+            profile {str} -- Name of the profile
+            ratings {dict} -- Game ID to [status, rating]
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO profile_ratings (profile, game_id, status, rating) VALUES (?, ?, ?, ?)", ((profile, game_id, int(status), int(rating)) for game_id, (status, rating) in ratings.items()))
+
+    def load_rater_scores(self) -> dict:
+        """Loads the human scores given to the emotional ratings
+
+        Returns:
+            dict -- Game ID to score
+        """
+        return dict(self.fetch_all("SELECT game_id, score FROM rater_scores"))
+
+    def save_rater_scores(self, scores: dict):
+        """Inserts or replaces human scores given to the emotional ratings
+
+        Arguments:
+            scores {dict} -- Game ID to score
+        """
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO rater_scores (game_id, score) VALUES (?, ?)", scores.items())
+
+    def close(self):
+        """Closes the database
+        """
+        with self._lock:
+            self._connection.close()
+
+def import_json_files(database: RecommenderDatabase,
+                      game_data_filename: str = "filtered_games.json",
+                      ratings_filename: str = "rated_games.json",
+                      profile_directory: str = ".",
+                      rater_scores_filename: str = "rating_ratings.json",
+                      batch_size: int = 1000):
+    """Copies the flat json files into a database. Files that don't exist are
+    skipped and rows that already exist are replaced
+
+    Arguments:
+        database {RecommenderDatabase} -- Database to write to
+
+    Keyword Arguments:
+        game_data_filename {str} -- Json file of game data, its ndjson
+            version is streamed instead if there is one
+            (default: {"filtered_games.json"})
+        ratings_filename {str} -- Json file of emotional ratings
+            (default: {"rated_games.json"})
+        profile_directory {str} -- Directory to find profiles in
+            (default: {"."})
+        rater_scores_filename {str} -- Json file of rater scores
+            (default: {"rating_ratings.json"})
+        batch_size {int} -- Games written per transaction (default: {1000})
+    """
+    ndjson_filename = f"{os.path.splitext(game_data_filename)[0]}.ndjson"
+    if os.path.exists(ndjson_filename):
+        num_games = 0
+        for batch in iter_ndjson_batches(ndjson_filename, batch_size):
+            games = {}
+            for record in batch:
+                games.update(record)
+            database.write_json_values("games", games)
+            num_games += len(games)
+        print(f"Imported {num_games} games from {ndjson_filename}")
+    elif os.path.exists(game_data_filename):
+        games = load_json_file(game_data_filename)
+        database.write_json_values("games", games)
+        print(f"Imported {len(games)} games from {game_data_filename}")
+
+    if os.path.exists(ratings_filename):
+        sentiments = load_json_file(ratings_filename)
+        database.write_json_values("sentiments", sentiments)
+        print(f"Imported {len(sentiments)} emotional ratings from {ratings_filename}")
+
+    for name, filename in find_profile_filenames(profile_directory).items():
+        ratings = load_profile_ratings(filename)
+        database.save_profile_ratings(name, ratings)
+        print(f"Imported {len(ratings)} ratings of profile {name}")
+
+    if os.path.exists(rater_scores_filename):
+        scores = load_json_file(rater_scores_filename)
+        database.save_rater_scores(scores)
+        print(f"Imported {len(scores)} rater scores from {rater_scores_filename}")
+
+def load_database(filename: str = "recommender.sqlite") -> RecommenderDatabase:
+    """Opens the database if one has been created, so callers can fall back
+    to the json files otherwise
+
+    Keyword Arguments:
+        filename {str} -- Sqlite database file
+            (default: {"recommender.sqlite"})
+
+    Returns:
+        RecommenderDatabase -- Database, None if the file doesn't exist
+    """
+    if not os.path.exists(filename):
+        return None
+    return RecommenderDatabase(filename)
+
+if __name__ == "__main__":
+    # Creates the database from the json files, after which the recommender,
+    # rater, and service use it instead
+    database = RecommenderDatabase(sys.argv[1] if len(sys.argv) > 1 else "recommender.sqlite")
+    import_json_files(database)
+    database.close()
@@ -0,0 +1,278 @@
+from collections import OrderedDict
+from hashlib import sha256
+from io import BytesIO
+from threading import Lock
+from PIL import Image
+import os
+
+from . import instrumentation
+
+# Size of the Steam header images, used for the placeholder
+header_image_size = (460, 215)
+
+class ImageCache:
+    def __init__(self, cache_dir: str = "image_cache", memory_size: int = 64, max_disk_bytes: int = 256 * 1024 ** 2, pool_size: int = 4):
+        """Two tier cache for images loaded from URLs. Decoded images are kept in
+        memory and the downloaded files are kept on disk under the hash of their
+        content, so repeat views and restarts don't download them again
+
+        Keyword Arguments:
+            cache_dir {str} -- Directory for the disk cache
+                (default: {"image_cache"})
+            memory_size {int} -- Number of decoded images kept in memory
+                (default: {64})
+            max_disk_bytes {int} -- Size of the disk cache before the least
+                recently used files are removed (default: {256 MB})
+            pool_size {int} -- Number of HTTP connections to keep open
+                (default: {4})
+        """
+        self.cache_dir = cache_dir
+        self.memory_size = memory_size
+        self.max_disk_bytes = max_disk_bytes
+        self.pool_size = pool_size
+        self._memory_cache: OrderedDict[str, Image.Image] = OrderedDict()
+        self._lock = Lock()
+
+        # Index of the disk cache, so eviction doesn't scan the directory on
+        # every download. Objects are kept from least to most recently used
+        self._disk_lock = Lock()
+        self._object_sizes: OrderedDict[str, int] = OrderedDict()
+        self._object_refs: dict[str, set[str]] = {}
+        self._ref_objects: dict[str, str] = {}
+        self._disk_bytes = 0
+        self._scan_disk()
+
+        # Created on the first download, so images read from the disk cache
+        # never import requests
+        self._session = None
+        self._session_lock = Lock()
+
+    def _get_session(self):
+        """Gets the HTTP session downloads share, creating it the first time
+
+        Returns:
+            requests.Session -- Session
+        """
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+
+        return self._session
+
+    def get_image(self, url: str) -> Image.Image:
+        """Gets the decoded image for a URL, falling back to a placeholder if it
+        can't be loaded
+
+        Arguments:
+            url {str} -- URL of the image
+
+        Returns:
+            Image.Image -- Decoded image
+        """
+        with self._lock:
+            if url in self._memory_cache:
+                self._memory_cache.move_to_end(url)
+                instrumentation.increment("image.memory_hits")
+                return self._memory_cache[url]
+
+        try:
+            with instrumentation.timer("image.fetch"):
+                raw_data = self._read_disk(url)
+                if raw_data is None:
+                    instrumentation.increment("image.downloads")
+                    response = self._get_session().get(url, timeout=10)
+                    response.raise_for_status()
+                    raw_data = response.content
+                    self._write_disk(url, raw_data)
+                else:
+                    instrumentation.increment("image.disk_hits")
+
+            with instrumentation.timer("image.decode"):
+                image = Image.open(BytesIO(raw_data))
+                image.load()
+        except Exception as e:
+            print(f"Error fetching image: {e}")
+            # Placeholders aren't cached so the image is tried again next time
+            return Image.new("RGB", header_image_size, "gray")
+
+        with self._lock:
+            self._memory_cache[url] = image
+            if len(self._memory_cache) > self.memory_size:
+                self._memory_cache.popitem(last=False)
+
+        return image
+
+    def _get_ref_filename(self, url: str) -> str:
+        """Gets the file that records which content a URL points to
+
+        Arguments:
+            url {str} -- URL of the image
+
+        Returns:
+            str -- Filename
+        """
+        return os.path.join(self.cache_dir, "refs", sha256(url.encode("utf-8")).hexdigest())
+
+    def _get_object_filename(self, content_hash: str) -> str:
+        """Gets the file that holds downloaded content
+
+        Arguments:
+            content_hash {str} -- Hash of the content
+
+        Returns:
+            str -- Filename
+        """
+        return os.path.join(self.cache_dir, "objects", content_hash)
+
+    def _read_disk(self, url: str) -> bytes:
+        """Reads an image from the disk cache
+
+        Arguments:
+            url {str} -- URL of the image
+
+        Returns:
+            bytes -- Image file or None if it isn't cached
+        """
+        try:
+            with open(self._get_ref_filename(url), "r", encoding="utf-8") as f:
+                content_hash = f.read().strip()
+            with open(self._get_object_filename(content_hash), "rb") as f:
+                raw_data = f.read()
+        except OSError:
+            return None
+
+        # Marks the file as recently used for eviction, on disk as well so the
+        # order survives restarts
+        with self._disk_lock:
+            if content_hash in self._object_sizes:
+                self._object_sizes.move_to_end(content_hash)
+        try:
+            os.utime(self._get_object_filename(content_hash))
+        except OSError:
+            pass
+        return raw_data
+
+    def _write_disk(self, url: str, raw_data: bytes):
+        """Writes an image to the disk cache and evicts old images if the cache
+        is too large
+
+        Arguments:
+            url {str} -- URL of the image
+            raw_data {bytes} -- Image file
+        """
+        content_hash = sha256(raw_data).hexdigest()
+        object_filename = self._get_object_filename(content_hash)
+        ref_filename = self._get_ref_filename(url)
+        try:
+            os.makedirs(os.path.dirname(object_filename), exist_ok=True)
+            os.makedirs(os.path.dirname(ref_filename), exist_ok=True)
+
+            with self._disk_lock:
+                # Written to a temporary file first so a crash never leaves a
+                # partial image behind
+                if not os.path.exists(object_filename):
+                    temp_filename = f"{object_filename}.{os.getpid()}.tmp"
+                    with open(temp_filename, "wb") as f:
+                        f.write(raw_data)
+                    os.replace(temp_filename, object_filename)
+
+                temp_filename = f"{ref_filename}.{os.getpid()}.tmp"
+                with open(temp_filename, "w", encoding="utf-8") as f:
+                    f.write(content_hash)
+                os.replace(temp_filename, ref_filename)
+
+                self._add_disk_entry(content_hash, len(raw_data), ref_filename)
+                self._evict_disk()
+        except OSError as e:
+            print(f"Unable to cache image {url}: {e}")
+
+    def _scan_disk(self):
+        """Indexes the images already in the disk cache, removing refs to images
+        that no longer exist
+        """
+        objects_dir = os.path.join(self.cache_dir, "objects")
+        refs_dir = os.path.join(self.cache_dir, "refs")
+        try:
+            entries = [entry for entry in os.scandir(objects_dir) if entry.is_file() and not entry.name.endswith(".tmp")]
+        except OSError:
+            entries = []
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            self._add_disk_entry(entry.name, entry.stat().st_size)
+
+        try:
+            ref_entries = [entry for entry in os.scandir(refs_dir) if entry.is_file() and not entry.name.endswith(".tmp")]
+        except OSError:
+            ref_entries = []
+        for entry in ref_entries:
+            try:
+                with open(entry.path, "r", encoding="utf-8") as f:
+                    content_hash = f.read().strip()
+                if content_hash in self._object_sizes:
+                    self._add_disk_entry(content_hash, self._object_sizes[content_hash], entry.path)
+                else:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _add_disk_entry(self, content_hash: str, size: int, ref_filename: str = None):
+        """Adds an image to the index of the disk cache as the most recently
+        used one
+
+        Arguments:
+            content_hash {str} -- Hash of the image file
+            size {int} -- Size of the image file in bytes
+
+        Keyword Arguments:
+            ref_filename {str} -- Ref that points to the image (default: {None})
+        """
+        if content_hash not in self._object_sizes:
+            self._disk_bytes += size
+            self._object_sizes[content_hash] = size
+            self._object_refs[content_hash] = set()
+        self._object_sizes.move_to_end(content_hash)
+
+        if ref_filename is not None:
+            previous_hash = self._ref_objects.get(ref_filename)
+            if previous_hash is not None and previous_hash != content_hash:
+                self._object_refs[previous_hash].discard(ref_filename)
+            self._ref_objects[ref_filename] = content_hash
+            self._object_refs[content_hash].add(ref_filename)
+
+    def _evict_disk(self):
+        """Removes the least recently used images and the refs to them until the
+        disk cache fits in its size limit. Must be called with the disk lock held
+        """
+        while self._disk_bytes > self.max_disk_bytes and len(self._object_sizes) > 0:
+            content_hash, size = self._object_sizes.popitem(last=False)
+            self._disk_bytes -= size
+            for ref_filename in self._object_refs.pop(content_hash):
+                del self._ref_objects[ref_filename]
+                try:
+                    os.remove(ref_filename)
+                except OSError:
+                    pass
+            try:
+                os.remove(self._get_object_filename(content_hash))
+            except OSError:
+                pass
+
+default_image_cache: ImageCache = None
+
+def get_default_image_cache() -> ImageCache:
+    """Gets the image cache shared by the UI
+
+    Returns:
+        ImageCache -- Image cache
+    """
+    global default_image_cache
+    if default_image_cache is None:
+        default_image_cache = ImageCache()
+    return default_image_cache
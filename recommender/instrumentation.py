@@ -0,0 +1,173 @@
+"""Named timers and counters for the hot paths. Turned on with the
+RECOMMENDER_INSTRUMENT environment variable, otherwise every function here is
+a no-op and timed functions aren't wrapped at all.
+
+Environment variables:
+    RECOMMENDER_INSTRUMENT -- Set to 1 to record timers and counters
+    RECOMMENDER_INSTRUMENT_FILE -- Json file the summary is written to at exit,
+        printed instead if not set
+    RECOMMENDER_PROFILE -- File a cProfile capture of the session is written to
+"""
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+import atexit
+import cProfile
+import json
+import os
+import numpy as np
+
+enabled = os.getenv("RECOMMENDER_INSTRUMENT", "0") not in ("", "0")
+summary_filename = os.getenv("RECOMMENDER_INSTRUMENT_FILE")
+profile_filename = os.getenv("RECOMMENDER_PROFILE")
+
+# Number of the latest durations of each timer the percentiles are taken over
+window_size = 1000
+
+_durations: dict[str, deque[float]] = {}
+_totals: dict[str, tuple[int, float]] = {}
+_counters: dict[str, int] = {}
+# Timers are recorded from the prefetch threads as well as the Tk thread
+_lock = Lock()
+_profiler: cProfile.Profile = None
+
+def record(name: str, seconds: float):
+    """Records a duration for a timer
+
+    Arguments:
+        name {str} -- Name of the timer
+        seconds {float} -- Duration
+    """
+    with _lock:
+        if name not in _durations:
+            _durations[name] = deque(maxlen=window_size)
+            _totals[name] = (0, 0.0)
+        _durations[name].append(seconds)
+        count, total = _totals[name]
+        _totals[name] = (count + 1, total + seconds)
+
+@contextmanager
+def _timer(name: str):
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record(name, perf_counter() - start)
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null_timer = _NullTimer()
+
+def timer(name: str):
+    """Times the block of a with statement
+
+    Arguments:
+        name {str} -- Name of the timer
+
+    Returns:
+        ContextManager -- Timer, or a shared no-op if instrumentation is off
+    """
+    return _timer(name) if enabled else _null_timer
+
+def timed(name: str):
+    """Decorator that times every call of a function. The function is returned
+    unchanged if instrumentation is off
+
+    Arguments:
+        name {str} -- Name of the timer
+    """
+    def decorator(function):
+        if not enabled:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+        return wrapper
+    return decorator
+
+def increment(name: str, amount: int = 1):
+    """Adds to a counter
+
+    Arguments:
+        name {str} -- Name of the counter
+
+    Keyword Arguments:
+        amount {int} -- Amount to add (default: {1})
+    """
+    if enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+def get_summary() -> dict:
+    """Gets the count, total, and rolling percentiles of every timer along with
+    every counter
+
+    Returns:
+        dict -- Summary
+    """
+    with _lock:
+        durations = {name: np.array(window) for name, window in _durations.items()}
+        totals = dict(_totals)
+        counters = dict(_counters)
+
+    timers = {}
+    for name in sorted(durations.keys()):
+        p50, p95, p99 = np.percentile(durations[name], [50, 95, 99]) * 1000
+        count, total = totals[name]
+        timers[name] = {"count": count, "total_ms": total * 1000, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+    return {"timers": timers, "counters": dict(sorted(counters.items()))}
+
+def print_summary():
+    """Prints the summary as a table
+    """
+    summary = get_summary()
+    print(f"{'Timer':<36}{'Count':>8}{'Total ms':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary["timers"].items():
+        print(f"{name:<36}{stats['count']:>8}{stats['total_ms']:>12.1f}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    for name, count in summary["counters"].items():
+        print(f"{name:<36}{count:>8}")
+
+def dump_summary(filename: str = None):
+    """Writes the summary to a json file, or prints it if there isn't one
+
+    Keyword Arguments:
+        filename {str} -- File to write to (default: {None})
+    """
+    if filename is None:
+        print_summary()
+        return
+
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(get_summary(), f, indent=4)
+
+def start_session():
+    """Starts recording a session. Called by the entry points, it starts the
+    cProfile capture of the calling thread if one was asked for and writes
+    everything out when the program exits
+    """
+    global _profiler
+    if profile_filename is not None and _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+        atexit.register(_stop_profile)
+
+    if enabled:
+        atexit.register(dump_summary, summary_filename)
+
+def _stop_profile():
+    _profiler.disable()
+    _profiler.dump_stats(profile_filename)
+    print(f"Saved profile to {profile_filename}")
@@ -0,0 +1,30 @@
+from importlib import import_module
+from typing import Callable
+
+def lazy_attributes(package_globals: dict, lazy_names: dict[str, tuple[str, str]]) -> tuple[Callable, Callable]:
+    """Creates the module __getattr__ and __dir__ for a package that only
+    imports its submodules when one of their names is first used
+
+    Arguments:
+        package_globals {dict} -- Globals of the package
+        lazy_names {dict[str, tuple[str, str]]} -- Name to the relative module
+            it comes from and its name in that module
+
+    Returns:
+        tuple[Callable, Callable] -- __getattr__ and __dir__ of the package
+    """
+    package_name = package_globals["__name__"]
+
+    def __getattr__(name: str):
+        if name not in lazy_names:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        module_name, attribute = lazy_names[name]
+        value = getattr(import_module(module_name, package_name), attribute)
+        # Cached on the package so later lookups don't come back through here
+        package_globals[name] = value
+        return value
+
+    def __dir__() -> list[str]:
+        return sorted(set(package_globals.keys()) | set(lazy_names.keys()))
+
+    return __getattr__, __dir__
@@ -0,0 +1,463 @@
+from hashlib import sha256
+from time import perf_counter
+import json
+import os
+import numpy as np
+
+class NeighbourIndex:
+    def __init__(self, sentiment_matrix: np.ndarray):
+        """Finds the most similar games to a game in the sentiment space
+
+        Arguments:
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+                where each row is a game
+        """
+        self.sentiment_matrix = sentiment_matrix
+
+    def query(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the most similar games for each of the given games. A game is
+        never returned as similar to itself
+
+        Arguments:
+            rows {np.ndarray} -- Sentiment matrix rows of the games to match
+            k {int} -- Number of similar games to find for each game
+
+        Returns:
+            tuple[np.ndarray, np.ndarray] --
+                The (rows x k) rows of the most similar games in no particular
+                order,
+                their (rows x k) similarities, -inf where fewer than k similar
+                games were found
+        """
+        raise NotImplementedError
+
+    @property
+    def num_games(self) -> int:
+        return self.sentiment_matrix.shape[0]
+
+class BruteForceIndex(NeighbourIndex):
+    def query(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the most similar games by comparing against the whole catalog
+
+        Arguments:
+            rows {np.ndarray} -- Sentiment matrix rows of the games to match
+            k {int} -- Number of similar games to find for each game
+
+        Returns:
+            tuple[np.ndarray, np.ndarray] -- Rows and similarities of the most
+                similar games
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        k = min(k, self.num_games - 1)
+
+        similarities = self.sentiment_matrix[rows] @ self.sentiment_matrix.T
+        # A game is not similar to itself for the purposes of recommending
+        similarities[np.arange(len(rows)), rows] = -np.inf
+
+        # Gets the most similar games without sorting the whole catalog
+        top_rows = np.argpartition(similarities, self.num_games - k, axis=1)[:, self.num_games - k:]
+        top_similarities = np.take_along_axis(similarities, top_rows, axis=1)
+
+        return top_rows, top_similarities
+
+class BucketIndex(NeighbourIndex):
+    def __init__(self, sentiment_matrix: np.ndarray, num_buckets: int = None, exact: bool = True, num_probes: int = 8, num_iterations: int = 10, seed: int = 0):
+        """Cosine bucket index that groups games around centroid directions so
+        a query only compares against the games in the nearest buckets
+
+        Arguments:
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+                where each row is a game
+
+        Keyword Arguments:
+            num_buckets {int} -- Number of buckets, defaults to the square root
+                of the number of games (default: {None})
+            exact {bool} -- Whether buckets are searched until the result is
+                guaranteed to match a brute force search or only the closest
+                num_probes buckets are searched (default: {True})
+            num_probes {int} -- Buckets searched in approximate mode
+                (default: {8})
+            num_iterations {int} -- Clustering iterations used to place the
+                bucket centroids (default: {10})
+            seed {int} -- Seed for picking the starting centroids (default: {0})
+        """
+        super().__init__(sentiment_matrix)
+        self.exact = exact
+        self.num_probes = num_probes
+
+        if num_buckets is None:
+            num_buckets = int(np.sqrt(self.num_games))
+        num_buckets = max(1, min(num_buckets, self.num_games))
+
+        # Spherical k-means so each centroid is the mean direction of its bucket
+        rng = np.random.default_rng(seed)
+        centroids = sentiment_matrix[rng.choice(self.num_games, num_buckets, replace=False)]
+        for _ in range(num_iterations):
+            assignments = np.argmax(sentiment_matrix @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sentiment_matrix)
+            lengths = np.linalg.norm(sums, axis=1)
+            # Empty buckets keep their previous centroid
+            is_filled = lengths > 0
+            centroids[is_filled] = sums[is_filled] / lengths[is_filled, np.newaxis]
+        assignments = np.argmax(sentiment_matrix @ centroids.T, axis=1)
+
+        # Stores the rows of each bucket contiguously
+        self._bucket_rows = np.argsort(assignments, kind="stable")
+        self._bucket_matrix = np.ascontiguousarray(sentiment_matrix[self._bucket_rows])
+        counts = np.bincount(assignments, minlength=num_buckets)
+        self._bucket_offsets = np.concatenate(([0], np.cumsum(counts)))
+        self._centroids = centroids
+
+        # Widest angle between a centroid and the games in its bucket, used to
+        # bound the best similarity any game in the bucket could have
+        member_angles = np.arccos(np.clip(np.einsum("ij,ij->i", self._bucket_matrix, centroids[assignments[self._bucket_rows]]), -1, 1))
+        self._bucket_radii = np.zeros(num_buckets)
+        np.maximum.at(self._bucket_radii, assignments[self._bucket_rows], member_angles)
+
+    def query(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the most similar games by searching the closest buckets
+
+        Arguments:
+            rows {np.ndarray} -- Sentiment matrix rows of the games to match
+            k {int} -- Number of similar games to find for each game
+
+        Returns:
+            tuple[np.ndarray, np.ndarray] -- Rows and similarities of the most
+                similar games
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        k = min(k, self.num_games - 1)
+
+        top_rows = np.empty((len(rows), k), dtype=np.intp)
+        top_similarities = np.empty((len(rows), k))
+        for i, row in enumerate(rows):
+            top_rows[i], top_similarities[i] = self._query_row(row, k)
+
+        return top_rows, top_similarities
+
+    def _query_row(self, row: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Finds the most similar games for a single game
+
+        Arguments:
+            row {int} -- Sentiment matrix row of the game to match
+            k {int} -- Number of similar games to find
+
+        Returns:
+            tuple[np.ndarray, np.ndarray] -- Rows and similarities of the most
+                similar games
+        """
+        query_vector = self.sentiment_matrix[row]
+
+        # Upper bound on the similarity of any game in each bucket
+        centroid_angles = np.arccos(np.clip(self._centroids @ query_vector, -1, 1))
+        bounds = np.cos(np.clip(centroid_angles - self._bucket_radii, 0, np.pi))
+        bucket_order = np.argsort(-bounds)
+        if not self.exact:
+            bucket_order = bucket_order[:self.num_probes]
+
+        best_rows = np.empty(0, dtype=np.intp)
+        best_similarities = np.empty(0)
+        for bucket in bucket_order:
+            # Every remaining bucket is too far away to beat the current results
+            if self.exact and len(best_rows) >= k and best_similarities.min() >= bounds[bucket]:
+                break
+
+            start, end = self._bucket_offsets[bucket], self._bucket_offsets[bucket + 1]
+            if start == end:
+                continue
+            bucket_rows = self._bucket_rows[start:end]
+            bucket_similarities = self._bucket_matrix[start:end] @ query_vector
+            is_other_game = bucket_rows != row
+
+            best_rows = np.concatenate((best_rows, bucket_rows[is_other_game]))
+            best_similarities = np.concatenate((best_similarities, bucket_similarities[is_other_game]))
+            if len(best_rows) > k:
+                keep = np.argpartition(best_similarities, len(best_rows) - k)[len(best_rows) - k:]
+                best_rows = best_rows[keep]
+                best_similarities = best_similarities[keep]
+
+        # Approximate searches can come up short, so the results are padded
+        # with the game itself at -inf, which callers leave out of the scores
+        if len(best_rows) < k:
+            missing = k - len(best_rows)
+            best_rows = np.concatenate((best_rows, np.full(missing, row, dtype=np.intp)))
+            best_similarities = np.concatenate((best_similarities, np.full(missing, -np.inf)))
+
+        return best_rows, best_similarities
+
+class NeighbourTable(NeighbourIndex):
+    def __init__(self, neighbour_rows: np.ndarray, neighbour_similarities: np.ndarray):
+        """Precomputed table of the most similar games for every game. Queries
+        gather rows of the table instead of comparing sentiment vectors
+
+        Arguments:
+            neighbour_rows {np.ndarray} -- (games x k) rows of the most similar
+                games sorted from most to least similar
+            neighbour_similarities {np.ndarray} -- (games x k) similarities of
+                the most similar games
+        """
+        super().__init__(None)
+        self.neighbour_rows = neighbour_rows
+        self.neighbour_similarities = neighbour_similarities
+
+    def query(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Looks up the most similar games in the table
+
+        Arguments:
+            rows {np.ndarray} -- Sentiment matrix rows of the games to match
+            k {int} -- Number of similar games to find for each game
+
+        Raises:
+            ValueError: More similar games were asked for than the table has
+
+        Returns:
+            tuple[np.ndarray, np.ndarray] -- Rows and similarities of the most
+                similar games
+        """
+        if k > self.neighbour_rows.shape[1] and self.neighbour_rows.shape[1] < self.num_games - 1:
+            raise ValueError(f"Neighbour table only holds {self.neighbour_rows.shape[1]} similar games per game, {k} were requested")
+
+        rows = np.asarray(rows, dtype=np.intp)
+        top_rows = self.neighbour_rows[rows, :k].astype(np.intp)
+        top_similarities = self.neighbour_similarities[rows, :k].astype(np.float64)
+
+        return top_rows, top_similarities
+
+    @property
+    def num_games(self) -> int:
+        return self.neighbour_rows.shape[0]
+
+def get_neighbour_table_filenames(prefix: str) -> tuple[str, str, str, str]:
+    """Gets the filenames the neighbour table is stored in
+
+    Arguments:
+        prefix {str} -- Prefix shared by the files
+
+    Returns:
+        tuple[str, str, str, str] --
+            The file of game IDs in row order,
+            the file of similar game rows,
+            the file of similarities,
+            the file describing the matrix the table was built from
+    """
+    return f"{prefix}_ids.npy", f"{prefix}_rows.npy", f"{prefix}_similarities.npy", f"{prefix}_meta.json"
+
+def get_sentiment_fingerprint(game_ids: list[str], sentiment_matrix: np.ndarray) -> str:
+    """Hashes the game IDs and values of a sentiment matrix, so a table built
+    for other games or from other values isn't used
+
+    Arguments:
+        game_ids {list[str]} -- Game ID of each sentiment matrix row
+        sentiment_matrix {np.ndarray} -- Sentiment matrix
+
+    Returns:
+        str -- Hash
+    """
+    fingerprint = sha256(str(sentiment_matrix.shape).encode("utf-8"))
+    fingerprint.update(np.ascontiguousarray(np.asarray(game_ids, dtype=str)))
+    fingerprint.update(np.ascontiguousarray(sentiment_matrix, dtype=np.float64))
+    return fingerprint.hexdigest()
+
+def find_top_neighbours(sentiment_matrix: np.ndarray, rows: np.ndarray, k: int, column_block_size: int = 8192) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the most similar games for a block of games, comparing against the
+    catalog a tile of games at a time and keeping a running top k, so memory
+    doesn't grow with the size of the catalog
+
+    Arguments:
+        sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+        rows {np.ndarray} -- Sentiment matrix rows of the games to match
+        k {int} -- Number of similar games to find for each game
+
+    Keyword Arguments:
+        column_block_size {int} -- Games of the catalog compared at once
+            (default: {8192})
+
+    Returns:
+        tuple[np.ndarray, np.ndarray] -- (rows x k) rows and similarities of
+            the most similar games in no particular order
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    num_games = sentiment_matrix.shape[0]
+    query_matrix = sentiment_matrix[rows]
+
+    best_rows = np.empty((len(rows), 0), dtype=np.intp)
+    best_similarities = np.empty((len(rows), 0))
+    for column_start in range(0, num_games, column_block_size):
+        column_end = min(column_start + column_block_size, num_games)
+        tile_similarities = query_matrix @ sentiment_matrix[column_start:column_end].T
+        # A game is not similar to itself for the purposes of recommending
+        is_in_tile = (rows >= column_start) & (rows < column_end)
+        tile_similarities[is_in_tile, rows[is_in_tile] - column_start] = -np.inf
+
+        # Only the top k of a tile can make it into the running top k
+        tile_rows = np.broadcast_to(np.arange(column_start, column_end), tile_similarities.shape)
+        if tile_similarities.shape[1] > k:
+            keep = np.argpartition(tile_similarities, tile_similarities.shape[1] - k, axis=1)[:, tile_similarities.shape[1] - k:]
+            tile_rows = keep + column_start
+            tile_similarities = np.take_along_axis(tile_similarities, keep, axis=1)
+        best_rows = np.concatenate((best_rows, tile_rows), axis=1)
+        best_similarities = np.concatenate((best_similarities, tile_similarities), axis=1)
+        if best_rows.shape[1] > k:
+            keep = np.argpartition(best_similarities, best_rows.shape[1] - k, axis=1)[:, best_rows.shape[1] - k:]
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+            best_similarities = np.take_along_axis(best_similarities, keep, axis=1)
+
+    return best_rows, best_similarities
+
+def build_neighbour_table(sentiment_matrix: np.ndarray, game_ids: list[str], prefix: str, k: int = 100, block_size: int = 1024, column_block_size: int = 8192, fingerprint: str = None):
+    """Finds the most similar games for every game and saves them as fixed
+    width arrays. The similarities are computed a tile of games at a time in
+    both directions so memory stays fixed for large catalogs
+
+    Arguments:
+        sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+        game_ids {list[str]} -- Game ID of each sentiment matrix row
+        prefix {str} -- Prefix of the files to save to
+
+    Keyword Arguments:
+        k {int} -- Number of similar games to save per game (default: {100})
+        block_size {int} -- Games whose neighbours are found at once
+            (default: {1024})
+        column_block_size {int} -- Games of the catalog each block is compared
+            against at once (default: {8192})
+        fingerprint {str} -- Fingerprint of the game IDs and matrix, hashed
+            from them if None (default: {None})
+    """
+    ids_filename, rows_filename, similarities_filename, meta_filename = get_neighbour_table_filenames(prefix)
+    num_games = sentiment_matrix.shape[0]
+    k = min(k, num_games - 1)
+    if fingerprint is None:
+        fingerprint = get_sentiment_fingerprint(game_ids, sentiment_matrix)
+
+    # The old table stops matching before any of its files are replaced
+    if os.path.exists(meta_filename):
+        os.remove(meta_filename)
+
+    np.save(ids_filename, np.array(game_ids, dtype=str))
+    # Written straight to disk so the whole table never has to be in memory
+    neighbour_rows = np.lib.format.open_memmap(rows_filename, mode="w+", dtype=np.int32, shape=(num_games, k))
+    neighbour_similarities = np.lib.format.open_memmap(similarities_filename, mode="w+", dtype=np.float32, shape=(num_games, k))
+
+    for block_start in range(0, num_games, block_size):
+        block_rows = np.arange(block_start, min(block_start + block_size, num_games))
+        top_rows, top_similarities = find_top_neighbours(sentiment_matrix, block_rows, k, column_block_size)
+
+        # Sorted so a smaller k can be read from the front of each row
+        order = np.argsort(-top_similarities, axis=1, kind="stable")
+        neighbour_rows[block_rows] = np.take_along_axis(top_rows, order, axis=1)
+        neighbour_similarities[block_rows] = np.take_along_axis(top_similarities, order, axis=1)
+
+    neighbour_rows.flush()
+    neighbour_similarities.flush()
+
+    # Written last since the table is only used once the meta file matches
+    with open(meta_filename, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "num_games": num_games, "k": k}, f)
+
+def load_neighbour_table(prefix: str, fingerprint: str) -> NeighbourTable:
+    """Memory-maps a saved neighbour table. The table is shared with any other
+    process that maps the same files
+
+    Arguments:
+        prefix {str} -- Prefix of the files to load from
+        fingerprint {str} -- Fingerprint of the game IDs and row-normalized
+            sentiment matrix, used to check the table was built for the same
+            catalog and emotional ratings
+
+    Returns:
+        NeighbourTable -- Table or None if there isn't one for the catalog
+    """
+    filenames = get_neighbour_table_filenames(prefix)
+    if not all(os.path.exists(filename) for filename in filenames[:3]):
+        return None
+    _, rows_filename, similarities_filename, meta_filename = filenames
+
+    if not os.path.exists(meta_filename):
+        print(f"Neighbour table {prefix} has no record of the ratings it was built from and will not be used")
+        return None
+
+    with open(meta_filename, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("fingerprint") != fingerprint:
+        print(f"Neighbour table {prefix} was built for different games or emotional ratings and will not be used")
+        return None
+
+    neighbour_rows = np.load(rows_filename, mmap_mode="r")
+    neighbour_similarities = np.load(similarities_filename, mmap_mode="r")
+    return NeighbourTable(neighbour_rows, neighbour_similarities)
+
+def build_neighbour_index(sentiment_matrix: np.ndarray, exact: bool = True, min_bucket_games: int = 10000) -> NeighbourIndex:
+    """Picks the neighbour index to use for a sentiment matrix
+
+    Arguments:
+        sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+
+    Keyword Arguments:
+        exact {bool} -- Whether results must match a brute force search
+            (default: {True})
+        min_bucket_games {int} -- Catalogs smaller than this are searched with
+            brute force since bucketing doesn't pay off (default: {10000})
+
+    Returns:
+        NeighbourIndex -- Index to search for similar games
+    """
+    if sentiment_matrix.shape[0] < min_bucket_games:
+        return BruteForceIndex(sentiment_matrix)
+
+    return BucketIndex(sentiment_matrix, exact=exact)
+
+def print_recall_report(sentiment_matrix: np.ndarray, k: int = 100, num_queries: int = 200, probe_counts: list[int] = [1, 2, 4, 8, 16], seed: int = 0):
+    """Prints the recall and speed of the bucket index against a brute force
+    search
+
+    Arguments:
+        sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+
+    Keyword Arguments:
+        k {int} -- Number of similar games to find (default: {100})
+        num_queries {int} -- Number of games to query (default: {200})
+        probe_counts {list[int]} -- Bucket counts to try in approximate mode
+            (default: {[1, 2, 4, 8, 16]})
+        seed {int} -- Seed for picking the games to query (default: {0})
+    """
+    rng = np.random.default_rng(seed)
+    num_games = sentiment_matrix.shape[0]
+    rows = rng.choice(num_games, min(num_queries, num_games), replace=False)
+
+    def time_query(index: NeighbourIndex) -> tuple[np.ndarray, float]:
+        start = perf_counter()
+        _, top_similarities = index.query(rows, k)
+        return top_similarities, (perf_counter() - start) / len(rows)
+
+    expected_similarities, brute_force_time = time_query(BruteForceIndex(sentiment_matrix))
+    # Games tied with the least similar true result count as correct matches
+    thresholds = expected_similarities.min(axis=1, keepdims=True) - 1e-9
+    print(f"Games: {num_games}, k: {k}, queries: {len(rows)}")
+    print(f"{'Search':<20}{'Recall':>10}{'ms/query':>12}{'Speedup':>10}")
+    print(f"{'brute force':<20}{1:>10.4f}{brute_force_time * 1000:>12.3f}{1:>10.2f}")
+
+    build_start = perf_counter()
+    index = BucketIndex(sentiment_matrix)
+    print(f"Bucket index built in {perf_counter() - build_start:.3f}s")
+
+    searches = [("exact", True, index.num_probes)] + [(f"{num_probes} probes", False, num_probes) for num_probes in probe_counts]
+    for name, exact, num_probes in searches:
+        index.exact = exact
+        index.num_probes = num_probes
+        found_similarities, search_time = time_query(index)
+
+        # Recall is the share of the true most similar games that were found
+        recall = np.count_nonzero(found_similarities >= thresholds) / expected_similarities.size
+        print(f"{name:<20}{recall:>10.4f}{search_time * 1000:>12.3f}{brute_force_time / search_time:>10.2f}")
+
+if __name__ == "__main__":
+    import sys
+    from .sentiment_cache import load_sentiment_matrix
+
+    # Built from the cached matrix so the table is keyed to its fingerprint
+    sentiment_data = load_sentiment_matrix("rated_games.json")
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_neighbour_table(sentiment_data.normalized_matrix, sentiment_data.game_ids, "neighbour_table", fingerprint=sentiment_data.fingerprint)
+    else:
+        print_recall_report(sentiment_data.normalized_matrix)
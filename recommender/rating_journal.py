@@ -0,0 +1,228 @@
+from threading import Lock, Thread
+import glob
+import os
+
+from .data_collection import json_dumps, json_loads
+
+def get_journal_filenames(filename: str) -> tuple[str, str]:
+    """Gets the files the journal of a profile is kept in
+
+    Arguments:
+        filename {str} -- Profile snapshot file
+
+    Returns:
+        tuple[str, str] -- Journal file being appended to and the journal
+            being compacted into the snapshot
+    """
+    return f"{filename}.journal", f"{filename}.journal.compacting"
+
+def find_profile_filenames(directory: str = ".") -> dict[str, str]:
+    """Finds every saved user profile in a directory, including profiles that
+    so far only have a journal
+
+    Keyword Arguments:
+        directory {str} -- Directory to search (default: {"."})
+
+    Returns:
+        dict[str, str] -- User name to profile snapshot filename
+    """
+    filenames = set()
+    for suffix in ("", ".journal", ".journal.compacting"):
+        for filename in glob.glob(os.path.join(directory, f"profile_*.json{suffix}")):
+            filenames.add(filename[:len(filename) - len(suffix)])
+
+    return {os.path.basename(filename)[len("profile_"):-len(".json")]: filename for filename in sorted(filenames)}
+
+def read_journal(filename: str, ratings: dict, repair: bool = False) -> int:
+    """Replays the rating events of a journal onto a ratings dictionary. A
+    partially written last event from a crash is ignored
+
+    Arguments:
+        filename {str} -- Journal file
+        ratings {dict} -- Game ID to rating, updated in place
+
+    Keyword Arguments:
+        repair {bool} -- Whether to cut a partially written last event off the
+            file so new events start on a fresh line (default: {False})
+
+    Returns:
+        int -- Number of events replayed
+    """
+    if not os.path.exists(filename):
+        return 0
+
+    num_events = 0
+    complete_size = 0
+    with open(filename, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete_size += len(line)
+            line = line.strip()
+            if line:
+                ratings.update(json_loads(line))
+                num_events += 1
+
+    if repair and complete_size != os.path.getsize(filename):
+        print(f"Removing a partially written rating from the end of {filename}")
+        with open(filename, "r+b") as f:
+            f.truncate(complete_size)
+
+    return num_events
+
+def load_profile_ratings(filename: str) -> dict:
+    """Loads the ratings of a profile by replaying its journals over its last
+    snapshot
+
+    Arguments:
+        filename {str} -- Profile snapshot file
+
+    Returns:
+        dict -- Game ID to rating
+    """
+    ratings = {}
+    if os.path.exists(filename):
+        with open(filename, "rb") as f:
+            ratings.update(json_loads(f.read()))
+
+    # A journal left over from an interrupted compaction is older than the
+    # current one. Replaying it again is harmless since later ratings win
+    journal_filename, compacting_filename = get_journal_filenames(filename)
+    read_journal(compacting_filename, ratings)
+    read_journal(journal_filename, ratings)
+
+    return ratings
+
+def write_snapshot(filename: str, ratings: dict):
+    """Writes a profile snapshot so a crash leaves either the old or the new
+    file, never a partial one
+
+    Arguments:
+        filename {str} -- Profile snapshot file
+        ratings {dict} -- Game ID to rating
+    """
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_filename, "w", encoding="utf-8") as f:
+        f.write(json_dumps(ratings))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+
+class RatingJournal:
+    def __init__(self, filename: str, fsync_per_num_events: int = 10, compact_after_num_events: int = 1000):
+        """Append-only log of rating changes for a profile. Each save appends
+        only the changed ratings, and the journal is folded into the snapshot on
+        a background thread once it gets long
+
+        Arguments:
+            filename {str} -- Profile snapshot file
+
+        Keyword Arguments:
+            fsync_per_num_events {int} -- Events appended between syncing the
+                journal to disk. Events are flushed on every append, so only an
+                OS crash can lose the unsynced ones (default: {10})
+            compact_after_num_events {int} -- Journal length that starts a
+                compaction (default: {1000})
+        """
+        self.filename = filename
+        self.journal_filename, self.compacting_filename = get_journal_filenames(filename)
+        self.fsync_per_num_events = fsync_per_num_events
+        self.compact_after_num_events = compact_after_num_events
+        self._num_unsynced_events = 0
+        self._num_journal_events = None
+        self._compaction_thread: Thread = None
+        # Appends and the journal rotation at the start of a compaction
+        # can't overlap
+        self._lock = Lock()
+
+    def append(self, ratings: dict):
+        """Appends rating events to the journal
+
+        Arguments:
+            ratings {dict} -- Game ID to its new rating
+        """
+        if len(ratings) == 0:
+            return
+
+        with self._lock:
+            if self._num_journal_events is None:
+                self._num_journal_events = read_journal(self.journal_filename, {}, repair=True)
+
+            # Files are opened per append so many cached profiles don't hold
+            # file handles open
+            with open(self.journal_filename, "a", encoding="utf-8") as f:
+                for game_id, rating in ratings.items():
+                    f.write(json_dumps({game_id: rating}))
+                    f.write("\n")
+                f.flush()
+
+                self._num_unsynced_events += len(ratings)
+                if self._num_unsynced_events >= self.fsync_per_num_events:
+                    os.fsync(f.fileno())
+                    self._num_unsynced_events = 0
+
+            self._num_journal_events += len(ratings)
+            if self._num_journal_events >= self.compact_after_num_events:
+                self._start_compaction()
+
+    def write_snapshot(self, ratings: dict):
+        """Replaces the snapshot with every rating and clears the journals, used
+        when a profile is saved to a new file
+
+        Arguments:
+            ratings {dict} -- Game ID to rating
+        """
+        self.wait_for_compaction()
+        with self._lock:
+            write_snapshot(self.filename, ratings)
+            for filename in (self.compacting_filename, self.journal_filename):
+                if os.path.exists(filename):
+                    os.remove(filename)
+            self._num_journal_events = 0
+            self._num_unsynced_events = 0
+
+    def compact(self):
+        """Moves the journal aside and folds it into the snapshot on a
+        background thread. Does nothing if a compaction is already running
+        """
+        with self._lock:
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """Starts a compaction, called with the lock held
+        """
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+
+        # A leftover from an interrupted compaction is folded in first, since
+        # the journal can't be moved on top of it
+        if not os.path.exists(self.compacting_filename):
+            if not os.path.exists(self.journal_filename):
+                return
+            with open(self.journal_filename, "a", encoding="utf-8") as f:
+                os.fsync(f.fileno())
+            os.replace(self.journal_filename, self.compacting_filename)
+            self._num_journal_events = 0
+            self._num_unsynced_events = 0
+
+        self._compaction_thread = Thread(target=self._compact, daemon=True)
+        self._compaction_thread.start()
+
+    def _compact(self):
+        """Folds the moved journal into the snapshot. A crash at any point
+        leaves files that load_profile_ratings still reads correctly
+        """
+        ratings = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, "rb") as f:
+                ratings.update(json_loads(f.read()))
+        read_journal(self.compacting_filename, ratings)
+
+        write_snapshot(self.filename, ratings)
+        os.remove(self.compacting_filename)
+
+    def wait_for_compaction(self):
+        """Waits for a running compaction to finish
+        """
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
@@ -4,7 +4,9 @@ from random import choice
 from tkhtmlview import HTMLScrolledText, HTMLLabel
 import os
 
-from .data_collection import load_json_file, write_json_to_file
+from . import instrumentation
+from .data_collection import load_game_data, load_json_file, write_json_to_file
+from .database import RecommenderDatabase, load_database
 from .recommender import load_image_from_url
 
 class RatingRater:
@@ -14,7 +16,8 @@ class RatingRater:
                  game_data: dict,
                  image_label: tk.Label,
                  description_label: HTMLScrolledText,
-                 rating_label: HTMLLabel):
+                 rating_label: HTMLLabel,
+                 database: RecommenderDatabase = None):
         """Rating rater for use in getting human ratings for the model emotional
         analysis ratings
 
@@ -26,8 +29,16 @@ class RatingRater:
             image_label {tk.Label} -- Image label to update
             description_label {HTMLScrolledText} -- Description label to update
             rating_label {HTMLLabel} -- Rating label to update
+
+        Keyword Arguments:
+            database {RecommenderDatabase} -- Database to load and save ratings
+                with instead of a file (default: {None})
         """
         self.game_dict = {}
+        self.database = database
+        # Ratings given since the last load or save, the only ones a database
+        # save has to write
+        self._unsaved_ids: set[str] = set()
         self.current_game_id = None
         self.analyzed_game_data = analyzed_game_data
         self.game_data = game_data
@@ -37,6 +48,7 @@ class RatingRater:
         self.description_label = description_label
         self.rating_label = rating_label
 
+    @instrumentation.timed("rater.get_new_game")
     def get_new_game(self):
         """Gets a new game from the available list and updates the UI for it
         """
@@ -45,15 +57,17 @@ class RatingRater:
         current_game_data = self.game_data[self.current_game_id]["data"]
         image_url = current_game_data["header_image"]
 
-        photo = load_image_from_url(image_url)
-        self.image_label.configure(image=photo)
-        self.image_label.image = photo
+        with instrumentation.timer("rater.load_image"):
+            photo = load_image_from_url(self.root, image_url)
+            self.image_label.configure(image=photo)
+            self.image_label.image = photo
 
-        description = current_game_data["detailed_description"]
-        self.description_label.set_html(description)
+        with instrumentation.timer("rater.render_html"):
+            description = current_game_data["detailed_description"]
+            self.description_label.set_html(description)
 
-        rating_str = str(self.analyzed_game_data[self.current_game_id])
-        self.rating_label.set_html(rating_str)
+            rating_str = str(self.analyzed_game_data[self.current_game_id])
+            self.rating_label.set_html(rating_str)
 
     def submit(self, slider: tk.Scale, num_games_rated_label: tk.Label):
         """Submits the human rating for the model given rating
@@ -64,34 +78,56 @@ class RatingRater:
                 games rated
         """
         self.game_dict[self.current_game_id] = slider.get()
+        self._unsaved_ids.add(self.current_game_id)
         num_games_rated_label.configure(text=len(self.game_dict.keys()))
         self.get_new_game()
 
     def load(self, filename: str):
-        """Loads a saved file of ratings to the game dictionary
+        """Loads a saved file of ratings to the game dictionary, or the ratings
+        in the database if there is one
 
         Arguments:
             filename {str} -- File to load
         """
-        if os.path.exists(filename):
+        if self.database is not None:
+            self.game_dict = self.database.load_rater_scores()
+        elif os.path.exists(filename):
             self.game_dict = load_json_file(filename)
+        self._unsaved_ids.clear()
 
+    @instrumentation.timed("rater.save")
     def save(self, filename: str):
-        """Saves current human ratings to a file
+        """Saves current human ratings to a file, or the ones given since the
+        last save to the database if there is one
 
         Arguments:
             filename {str} -- File to save to
         """
-        write_json_to_file(filename, self.game_dict)
+        if self.database is not None:
+            self.database.save_rater_scores({game_id: self.game_dict[game_id] for game_id in self._unsaved_ids})
+        else:
+            write_json_to_file(filename, self.game_dict)
+        self._unsaved_ids.clear()
 
 def run_rating_rater():
-    # Get the data for emotional ratings
-    ratings_filename = "rated_games.json"
-    rating_data = load_json_file(ratings_filename)
-
-    # Get the game data
-    game_data_filename = "filtered_games.json"
-    game_data = load_json_file(game_data_filename)
+    instrumentation.start_session()
+
+    # Everything is read from the database if one has been created from the
+    # json files
+    database = load_database()
+    if database is not None:
+        rating_data = database.sentiments
+        game_data = database.games
+    else:
+        # Get the data for emotional ratings
+        ratings_filename = "rated_games.json"
+        rating_data = load_json_file(ratings_filename)
+
+        # Get the game data
+        # Uses the compiled catalog or indexed ndjson file of the game data if
+        # there is one so the whole file doesn't need to be loaded
+        game_data_filename = "filtered_games.json"
+        game_data = load_game_data(game_data_filename)
 
     root = tk.Tk()
 
@@ -126,7 +162,7 @@ def run_rating_rater():
 
     ratings_filename = "rating_ratings.json"
     # Initialize the recommender and get a new recommendation
-    rater = RatingRater(root, rating_data, game_data, image_label, description_label, rating_label)
+    rater = RatingRater(root, rating_data, game_data, image_label, description_label, rating_label, database)
     rater.load(ratings_filename)
     rater.get_new_game()
 
@@ -1,304 +1,56 @@
-from enum import Enum
-from io import BytesIO
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, ImageTk
-from random import choice, randint
+from threading import Lock
 from tkhtmlview import HTMLScrolledText, HTMLLabel
-import os
 import tkinter as tk
-import urllib.request
-import numpy as np
 
-from .data_collection import load_json_file, write_json_to_file
+from . import instrumentation
+from .data_collection import load_game_data
+from .database import load_database
+from .image_cache import get_default_image_cache
+from .neighbours import build_neighbour_index, load_neighbour_table
+from .sentiment_cache import SentimentData, load_sentiment_matrix
+from .user_profile import GameRecommendationStatus, UserProfile, choose_random_game, get_sentiment_matrix, sentiment_order
 
 def load_image_from_url(root: tk.Tk, url: str) -> ImageTk.PhotoImage:
-    """Loads an image from the given URL
+    """Loads an image from the given URL through the image cache. A placeholder
+    is shown if the image can't be loaded
 
     Arguments:
-        root {tk.Tk} -- Root to destroy in the case of an error
+        root {tk.Tk} -- Root the image is displayed in
         url {str} -- URL to get image from
 
     Returns:
         ImageTk.PhotoImage -- Image
     """
-    try:
-        with urllib.request.urlopen(url) as u:
-            raw_data = u.read()
-    except Exception as e:
-        print(f"Error fetching image: {e}")
-        root.destroy()
-        exit()
+    im = get_default_image_cache().get_image(url)
 
-    im = Image.open(BytesIO(raw_data))
-
-    photo = ImageTk.PhotoImage(im)
+    photo = ImageTk.PhotoImage(im, master=root)
     return photo
 
-sentiment_order = ["anger", "disgust", "fear", "happiness", "sadness", "surprise"]
-def get_sentiment_vector(sentiment_dict: dict) -> np.ndarray:
-    """Converts a sentiment dictionary into a numpy array
-
-    Arguments:
-        sentiment_dict {dict} -- Dictionary to convert
-
-    Returns:
-        np.ndarray -- Sentiment array
-    """
-    vec = np.zeros(shape=(1, len(sentiment_order)))
-    for i in range(len(sentiment_order)):
-        vec[i] = sentiment_dict[sentiment_order[i]]
-
-    return vec
-
-def get_sentiment_matrix(analyzed_game_data: dict) -> tuple[list[str], dict[str, int], np.ndarray]:
-    """Converts the analyzed game data dictionary into a sentiment matrix where
-    each row is a game
-
-    Arguments:
-        analyzed_game_data {dict} -- Game data to convert
-
-    Returns:
-        tuple[list[str], dict[str, int], np.ndarray] --
-            The list of game ids,
-            lookup dictionary of ID to indice for the array,
-            the array itself
-    """
-    game_id_list = list(analyzed_game_data.keys())
-    # Lookup dict for id to index in the matrix
-    sentiment_ids = {}
-    num_games = len(game_id_list)
-
-    # Generates the empty matrix
-    sentiment_matrix = np.zeros(shape=(num_games, len(sentiment_order)))
-
-    # Fills in the matrix with the values
-    for y in range(num_games):
-        sentiment_ids[game_id_list[y]] = y
-        for x in range(len(sentiment_order)):
-            sentiment_matrix[y][x] = analyzed_game_data[game_id_list[y]][sentiment_order[x]]
-
-    return game_id_list, sentiment_ids, sentiment_matrix
-class GameRecommendationStatus(int, Enum):
-    Played = 0
-    NotPlayed = 1
-
-class UserProfile:
-    def __init__(self, name: str):
-        """The user profile is used for storing a users preferred games
-
-        Arguments:
-            name {str} -- Name of the user
-        """
-        self._name: str = name
-        # There could be setters added for game ratings such that it automatically
-        # updates rated games and performs verification on attempts to add ratings
-        # to the dict
-        self._game_ratings: dict = {}
-        self.default_filename: str = self._get_default_filename()
-        self.rated_games = set()
-
-    def _verify_game_rating(self, id: str, rating: list[GameRecommendationStatus, int]) -> bool:
-        """Checks that a given game rating is valid
-
-        Arguments:
-            id {str} -- Game ID
-            rating {list[GameRecommendationStatus, int]} -- Rating for the game
-
-        Returns:
-            bool -- Is valid
-        """
-        if not (isinstance(id, str) and isinstance(rating, list)):
-            return False
-
-        if len(rating) != 2:
-            return False
-
-        if not (0 <= rating[0] <= 1 and 0 <= rating[1] <= 10):
-            return False
-
-        return True
-
-    def _verify_game_ratings(self, game_ratings: dict) -> bool:
-        """Verifies a dictionary of game ratings to make sure they are valid
-
-        Arguments:
-            game_ratings {dict} -- Game ratings to validate
-
-        Returns:
-            bool -- Whether or not they are valid
-        """
-        for key in game_ratings.keys():
-            value = game_ratings[key]
-
-            if not self._verify_game_rating(key, value):
-                return False
-
-        return True
-
-    def _get_default_filename(self) -> str:
-        """Gets the default filename for saving/loading
-
-        Returns:
-            str -- Filename
-        """
-        return f"profile_{self.name}.json"
-
-    def add_rating(self, id: str, rating: tuple[GameRecommendationStatus, int]):
-        """Adds a rating to the rated games
-
-        Arguments:
-            id {str} -- ID of the game
-            rating {tuple[GameRecommendationStatus, int]} -- Rating to add
-        """
-        if self._verify_game_rating(id, rating):
-            self._game_ratings[id] = rating
-            self.rated_games.add(id)
-        else:
-            print("Invalid id : rating pair was attempted to be added to rated games")
-
-    def add_ratings(self, ratings: dict[str, tuple[GameRecommendationStatus, int]]):
-        """Adds multiple user ratings from a dictionary
-
-        Arguments:
-            ratings {dict[str, tuple[GameRecommendationStatus, int]]} -- Ratings to add
-        """
-        for key in ratings.keys():
-            value = ratings[key]
-            self.add_rating(key, value)
-
-    def load(self, filename: str = None):
-        """Loads user ratings from a file
-
-        Keyword Arguments:
-            filename {str} -- File to load from (default: {None})
-        """
-        if filename is None:
-            filename = self.default_filename
-
-        if os.path.exists(filename):
-            game_ratings = load_json_file(filename)
-            self.add_ratings(game_ratings)
-
-    def save(self, filename: str = None):
-        """Saves user ratings to a file
-
-        Keyword Arguments:
-            filename {str} -- File to save to (default: {None})
-        """
-        if filename is None:
-            filename = self.default_filename
-
-        write_json_to_file(filename, self._game_ratings)
-
-    def get_recommendation(self, game_ids: list[str], sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray) -> str:
-        """Gets a recommendation ID to display on the UI
-
-        Arguments:
-            game_ids {list[str]} -- List of possible game IDs
-            sentiment_indices {dict[str, int]} -- Lookup dictionary for game ID
-                to indice in the sentiment matrix
-            sentiment_matrix {np.ndarray} -- Sentiment matrix to perform
-                calculations on
-
-        Raises:
-            Exception: No recommendation was found
-
-        Returns:
-            str -- ID of game recommendation
-        """
-        recommendation_list = self._generate_recommendation_list(game_ids, sentiment_indices, sentiment_matrix)
-        id = self._select_from_recommendation_list(recommendation_list, True)
-        if id == -1:
-            raise Exception("No valid game recommendation found")
-        return id
-
-    def _select_from_recommendation_list(self, recommendation_list: list[tuple[str, float]], is_exploratory: bool) -> str:
-        """Selects an ID from the given recommendation list
-
-        Arguments:
-            recommendation_list {list[tuple[str, float]]} -- Sorted list of
-                recommendations
-            is_exploratory {bool} -- Whether or not it should randomly choose
-                from a top percentage of recommendations instead of the very top
-
-        Returns:
-            str -- Game ID
-        """
-        num_recommendations = len(recommendation_list)
-        indice = 0 if not is_exploratory else randint(0, num_recommendations // 30)
-
-        return recommendation_list[indice][0]
-
-    def _generate_recommendation_list(self, game_ids: list[str], sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray) -> list[tuple[str, float]]:
-        """Generates a sorted recommendation list with game IDs and scores
+class PreparedGame:
+    def __init__(self, game_id: str, name: str, image: Image.Image, description: str, genre_html: str, rating_html: str, generation: int):
+        """A recommendation with everything needed to display it, prepared off
+        of the Tk thread
 
         Arguments:
-            game_ids {list[str]} -- List of available game IDs
-            sentiment_indices {dict[str, int]} -- Lookup dictionary from game ID
-                to sentiment matrix row indice
-            sentiment_matrix {np.ndarray} -- Sentiment matrix where each row is
-                a game and columns are emotional ratings
-
-        Returns:
-            list[tuple[str, float]] -- Sorted list of Game IDs and Scores
+            game_id {str} -- ID of the game
+            name {str} -- Name of the game
+            image {Image.Image} -- Decoded header image
+            description {str} -- Description HTML
+            genre_html {str} -- Genre HTML
+            rating_html {str} -- Emotional rating HTML or None if not displayed
+            generation {int} -- Ratings generation the recommendation was made
+                for, used to throw it out if the ratings change
         """
-        recommendation_pool = {}
-        for rated_id in self._game_ratings.keys():
-            if rated_id not in self.rated_games:
-                recommendation_pool[rated_id] = 0
-
-        for rated_id in self._game_ratings.keys():
-            rec_status, rating = self._game_ratings[rated_id]
-            # Sets the multiplier for if the user played the game or not
-            #   (playing the game is worth 10 times the weight)
-            has_played_modifier = 10 if rec_status == GameRecommendationStatus.Played else 1
-
-            # Gets the row for the given vector
-            rated_vector = sentiment_matrix[sentiment_indices[rated_id]]
-            similarities_vector = sentiment_matrix.dot(rated_vector) / (np.linalg.norm(sentiment_matrix, axis=1) * np.linalg.norm(rated_vector))
-
-            # Sort them based on most similar
-            top_similarities = np.argsort(similarities_vector)[::-1]
-            sorted_ids = np.array(game_ids)[top_similarities]
-            sorted_sims = similarities_vector[top_similarities]
-
-            # Remove the existing game and get top 5 entries
-            mask = (sorted_ids != rated_id) & (~np.isin(sorted_ids, list(self.rated_games)))
-            filtered_ids = sorted_ids[mask]
-            filtered_sims = sorted_sims[mask]
-
-            # Add scores for all the games
-            # num_games_to_add = len(filtered_ids)
-            # Add scores for just the top # of similar games
-            temp_num_games_to_add = 100
-            num_games_to_add = temp_num_games_to_add if len(filtered_ids) >= temp_num_games_to_add else len(filtered_ids)
-            for i in range(num_games_to_add):
-                game_id = filtered_ids[i]
-                # Sets a score for the game based on how similar it it, how much
-                # the user liked it, and if they played it or not. The rating is
-                # adjusted such that 4 or below becomes negative and detracts
-                # from the overall score
-                score = filtered_sims[i] * (rating - 5) * has_played_modifier
-                if game_id in recommendation_pool:
-                    recommendation_pool[game_id] += score
-                else:
-                    recommendation_pool[game_id] = score
-
-        # Converts the dictionary to a sorted list
-        recommendation_list = []
-        for key in recommendation_pool.keys():
-            recommendation_list.append((key, recommendation_pool[key]))
-        recommendation_list.sort(key=lambda val: val[1], reverse=True)
-
-        return recommendation_list
-
-    @property
-    def name(self):
-        return self._name
-
-    @name.setter
-    def name(self, value: str):
-        self._name = value
-        self.default_filename = self._get_default_filename()
+        self.game_id = game_id
+        self.name = name
+        self.image = image
+        self.description = description
+        self.genre_html = genre_html
+        self.rating_html = rating_html
+        self.generation = generation
 
 # Optimally, the UI elements would be separated into a different class like
 # VideoGameRecommenderUI and that would handle all tk calls and formatting
@@ -312,13 +64,18 @@ class VideoGameRecommender:
                  description_label: HTMLScrolledText,
                  genre_label: HTMLLabel,
                  users: dict[str, UserProfile] = {},
-                 display_ratings: bool = False):
+                 display_ratings: bool = False,
+                 approximate_neighbours: bool = False,
+                 neighbour_table_prefix: str = "neighbour_table",
+                 num_prefetch: int = 2,
+                 sentiment_data: SentimentData = None):
         """Videogame recommender that handles UI changes and getting game
         recommendations based on user preferences
 
         Arguments:
             root {tk.Tk} -- Tkinter root
-            analyzed_game_data {dict} -- Game data with emotional ratings
+            analyzed_game_data {dict} -- Game data with emotional ratings, can
+                be None if sentiment_data is given
             game_data {dict} -- Original game data
             game_label {tk.Label} -- Game name label to update
             image_label {tk.Label} -- Image label to update
@@ -331,10 +88,36 @@ class VideoGameRecommender:
                 profiles (default: {{}})
             display_ratings {bool} -- Whether or not emotional ratings should be
                 displayed (meant for debugging) (default: {False})
+            approximate_neighbours {bool} -- Whether similar games can be found
+                with a faster approximate search on large catalogs
+                (default: {False})
+            neighbour_table_prefix {str} -- Prefix of a prebuilt neighbour
+                table to score with instead of searching for similar games
+                (default: {"neighbour_table"})
+            num_prefetch {int} -- Number of upcoming recommendations prepared
+                in the background while the user rates the current one
+                (default: {2})
+            sentiment_data {SentimentData} -- Game IDs, ID lookup, and
+                sentiment matrices already built from the emotional ratings,
+                like the ones load_sentiment_matrix gets from its cache
+                (default: {None})
         """
         self.root = root
         self.analyzed_game_data = analyzed_game_data
-        self.game_id_list, self.sentiment_indices, self.sentiment_matrix = get_sentiment_matrix(self.analyzed_game_data)
+        if sentiment_data is None:
+            sentiment_data = SentimentData(*get_sentiment_matrix(self.analyzed_game_data))
+        self.game_id_list = sentiment_data.game_ids
+        self.sentiment_indices = sentiment_data.sentiment_indices
+        self.sentiment_matrix = sentiment_data.sentiment_matrix
+        # Normalized once so every similarity query is a single matrix product.
+        # A cached one is memory-mapped instead of copied
+        self.normalized_sentiment_matrix = sentiment_data.normalized_matrix
+        self.sentiment_norms = sentiment_data.norms
+        # A prebuilt table is memory-mapped and shared between processes, so
+        # it is only searched for if there isn't one
+        self.neighbour_index = load_neighbour_table(neighbour_table_prefix, sentiment_data.fingerprint)
+        if self.neighbour_index is None:
+            self.neighbour_index = build_neighbour_index(self.normalized_sentiment_matrix, exact=not approximate_neighbours)
         self.game_data = game_data
         self.game_label = game_label
         self.image_label = image_label
@@ -342,7 +125,6 @@ class VideoGameRecommender:
         self.description_label = description_label
         self.genre_label = genre_label
         self.current_game_id = None
-        self.game_ids: set = set(analyzed_game_data.keys())
         self.users: dict[str, UserProfile] = users
         self.display_ratings = display_ratings
 
@@ -361,43 +143,208 @@ class VideoGameRecommender:
 
         self.current_user = self.users[self.current_user_name]
 
-    def get_new_game(self):
-        """Gets a new game recommendation and updates the UI for that
-        recommendation
+        # Upcoming recommendations are prepared on worker threads and handed
+        # back to the Tk thread through root.after
+        self.num_prefetch = num_prefetch
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=max(1, num_prefetch), thread_name_prefix="prefetch")
+        self._prefetched_games: deque[PreparedGame] = deque()
+        self._num_prefetching = 0
+        # Games that are prefetched or being prefetched, so they aren't picked
+        # twice
+        self._reserved_ids: set[str] = set()
+        # Bumped whenever a rating changes the ranking, which makes any
+        # recommendation prepared before it out of date unless it is still one
+        # of the valid candidates
+        self._generation = 0
+        self._candidate_ids: set[str] = None
+        # Guards the user profile and reserved games between threads
+        self._lock = Lock()
+        self.root.bind("<Destroy>", self._on_destroy, add="+")
+
+    @instrumentation.timed("recommender.choose_game")
+    def _choose_game_id(self) -> str:
+        """Picks the next game to recommend and reserves it
+
+        Returns:
+            str -- Game ID
         """
-        # In the event the game was skipped, still add it to the rated games so
-        # it doesn't show up again. (It will still show up in future reloads of
-        # the recommender)
-        if self.current_game_id is not None and self.current_game_id not in self.current_user.rated_games:
-            self.current_user.rated_games.add(self.current_game_id)
+        with self._lock:
+            game_id = None
+            if len(self.current_user.rated_games) >= 1:
+            # if len(self.current_user.rated_games) >= 5:
+                try:
+                    game_id = self.current_user.get_recommendation(self.game_id_list, self.sentiment_indices, self.normalized_sentiment_matrix, self.neighbour_index, self._reserved_ids)
+                except Exception:
+                    # Skipped games without any ratings give nothing to score
+                    # from, so a random game is picked instead
+                    pass
+
+            if game_id is None:
+                game_id = choose_random_game(self.game_id_list, self.current_user.rated_games | self._reserved_ids)
+            self._reserved_ids.add(game_id)
+
+        return game_id
+
+    @instrumentation.timed("recommender.prepare_game")
+    def _prepare_game(self, game_id: str, generation: int) -> PreparedGame:
+        """Loads everything needed to display a game. Safe to call off of the Tk
+        thread
+
+        Arguments:
+            game_id {str} -- ID of the game
+            generation {int} -- Ratings generation the game was picked for
+
+        Returns:
+            PreparedGame -- Prepared game
+        """
+        current_game_data = self.game_data[game_id]["data"]
+        image = get_default_image_cache().get_image(current_game_data["header_image"])
+
+        rating_html = None
+        if self.display_ratings:
+            if self.analyzed_game_data is not None:
+                rating_html = str(self.analyzed_game_data[game_id])
+            else:
+                sentiment_values = self.sentiment_matrix[self.sentiment_indices[game_id]].tolist()
+                rating_html = str({emotion: int(value) if value.is_integer() else value for emotion, value in zip(sentiment_order, sentiment_values)})
+
+        genres = [genre["description"] for genre in current_game_data.get("genres", [])]
+        genre_str = "/".join(genres)
+
+        return PreparedGame(game_id, current_game_data["name"], image, current_game_data["detailed_description"], f"<u>{genre_str}</u>", rating_html, generation)
+
+    def _prefetch_game(self, generation: int):
+        """Picks and prepares a game on a worker thread, then hands it to the
+        Tk thread
+
+        Arguments:
+            generation {int} -- Ratings generation when the prefetch started
+        """
+        prepared_game = None
+        try:
+            prepared_game = self._prepare_game(self._choose_game_id(), generation)
+        except Exception as e:
+            print(f"Error prefetching a game: {e}")
+
+        try:
+            self.root.after(0, self._on_game_prefetched, prepared_game)
+        except (RuntimeError, tk.TclError):
+            # The window was closed while the game was being prepared
+            pass
+
+    def _on_game_prefetched(self, prepared_game: PreparedGame):
+        """Receives a prefetched game on the Tk thread
 
-        if len(self.current_user.rated_games) < 1:
-        # if len(self.current_user.rated_games) < 5:
-            available_ids = list(self.game_ids.difference(self.current_user.rated_games))
-            self.current_game_id = choice(available_ids)
+        Arguments:
+            prepared_game {PreparedGame} -- Prepared game or None if it failed
+        """
+        self._num_prefetching -= 1
+        if prepared_game is None:
+            return
+
+        if prepared_game.generation != self._generation and not self._is_candidate(prepared_game.game_id):
+            with self._lock:
+                self._reserved_ids.discard(prepared_game.game_id)
+            self._schedule_prefetch()
         else:
-            self.current_game_id = self.current_user.get_recommendation(self.game_id_list, self.sentiment_indices, self.sentiment_matrix)
-        # self.current_game_id = "48000"
+            prepared_game.generation = self._generation
+            self._prefetched_games.append(prepared_game)
 
-        current_game_data = self.game_data[self.current_game_id]["data"]
-        image_url = current_game_data["header_image"]
+    def _on_destroy(self, event: tk.Event):
+        """Stops prefetching once the window is closed
 
-        self.game_label.configure(text=current_game_data["name"])
+        Arguments:
+            event {tk.Event} -- Destroy event of the root or one of its widgets
+        """
+        if event.widget is self.root:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
 
-        photo = load_image_from_url(self.root, image_url)
-        self.image_label.configure(image=photo)
-        self.image_label.image = photo
+    def _schedule_prefetch(self):
+        """Starts preparing games until enough are ready or on the way
+        """
+        while len(self._prefetched_games) + self._num_prefetching < self.num_prefetch:
+            self._num_prefetching += 1
+            self._prefetch_executor.submit(self._prefetch_game, self._generation)
 
-        if self.display_ratings:
-            rating_str = str(self.analyzed_game_data[self.current_game_id])
-            self.rating_label.set_html(rating_str)
+    def _is_candidate(self, game_id: str) -> bool:
+        """Checks if a game could still be recommended after the latest rating
 
-        description = current_game_data["detailed_description"]
-        self.description_label.set_html(description)
+        Arguments:
+            game_id {str} -- ID of the game
 
-        genres = [genre["description"] for genre in current_game_data["genres"]]
-        genre_str = "/".join(genres)
-        self.genre_label.set_html(f"<u>{genre_str}</u>")
+        Returns:
+            bool -- Whether the game is still a candidate
+        """
+        return self._candidate_ids is None or game_id in self._candidate_ids
+
+    @instrumentation.timed("recommender.invalidate_prefetched")
+    def _invalidate_prefetched_games(self):
+        """Throws out prefetched games that the new ranking would no longer
+        pick from
+        """
+        self._generation += 1
+        with self._lock:
+            self._candidate_ids = None
+            if len(self.current_user.rated_games) >= 1:
+                # Without any candidates games are picked at random, so any
+                # prefetched game is still valid
+                self._candidate_ids = self.current_user.get_recommendation_candidates(self.game_id_list, self.sentiment_indices, self.normalized_sentiment_matrix, self.neighbour_index) or None
+
+            valid_games = deque()
+            for prepared_game in self._prefetched_games:
+                if self._is_candidate(prepared_game.game_id):
+                    prepared_game.generation = self._generation
+                    valid_games.append(prepared_game)
+                else:
+                    self._reserved_ids.discard(prepared_game.game_id)
+        self._prefetched_games = valid_games
+
+    def _display_game(self, prepared_game: PreparedGame):
+        """Updates the UI for a prepared game
+
+        Arguments:
+            prepared_game {PreparedGame} -- Game to display
+        """
+        self.current_game_id = prepared_game.game_id
+
+        self.game_label.configure(text=prepared_game.name)
+
+        # PhotoImages belong to the Tk thread so they are only created here
+        with instrumentation.timer("recommender.photo_image"):
+            photo = ImageTk.PhotoImage(prepared_game.image, master=self.root)
+            self.image_label.configure(image=photo)
+            self.image_label.image = photo
+
+        with instrumentation.timer("recommender.render_html"):
+            if prepared_game.rating_html is not None:
+                self.rating_label.set_html(prepared_game.rating_html)
+
+            self.description_label.set_html(prepared_game.description)
+            self.genre_label.set_html(prepared_game.genre_html)
+
+    @instrumentation.timed("recommender.get_new_game")
+    def get_new_game(self):
+        """Gets a new game recommendation and updates the UI for that
+        recommendation
+        """
+        # In the event the game was skipped, still add it to the rated games so
+        # it doesn't show up again. (It will still show up in future reloads of
+        # the recommender)
+        with self._lock:
+            if self.current_game_id is not None and self.current_game_id not in self.current_user.rated_games:
+                self.current_user.rated_games.add(self.current_game_id)
+            self._reserved_ids.discard(self.current_game_id)
+
+        # Uses a prefetched game when one is ready, otherwise prepares one now
+        if len(self._prefetched_games) > 0:
+            instrumentation.increment("recommender.prefetch_hits")
+            prepared_game = self._prefetched_games.popleft()
+        else:
+            instrumentation.increment("recommender.prefetch_misses")
+            prepared_game = self._prepare_game(self._choose_game_id(), self._generation)
+
+        self._display_game(prepared_game)
+        self._schedule_prefetch()
 
     def toggle(self, button: tk.Button):
         """Toggles the given button to be raised of sunken
@@ -407,6 +354,7 @@ class VideoGameRecommender:
         """
         button.config(relief="raised" if button.config("relief")[-1]=="sunken" else "sunken")
 
+    @instrumentation.timed("recommender.submit")
     def submit(self, slider: tk.Scale, played_button: tk.Button):
         """Submits a rating and saves the user profile
 
@@ -416,19 +364,41 @@ class VideoGameRecommender:
                 the game
         """
         status = GameRecommendationStatus.Played if played_button.config("relief")[-1] == "sunken" else GameRecommendationStatus.NotPlayed
-        self.current_user._game_ratings[self.current_game_id] = (status, slider.get())
+        # Adding the rating also updates the user's recommendation scores
+        with self._lock:
+            self.current_user.add_rating(self.current_game_id, [status, slider.get()])
+        self._invalidate_prefetched_games()
         self.current_user.save()
         self.get_new_game()
 
 def run_recommender():
-    # Get the data for emotional ratings
-    # ratings_filename = "temp_rated_games.json"
-    ratings_filename = "rated_games.json"
-    rating_data = load_json_file(ratings_filename)
-
-    # Get the game data
-    game_data_filename = "filtered_games.json"
-    game_data = load_json_file(game_data_filename)
+    instrumentation.start_session()
+
+    # Everything is read from the database if one has been created from the
+    # json files, with the default profile's ratings saved to it as well
+    users = {}
+    sentiment_data = None
+    database = load_database()
+    if database is not None:
+        rating_data = database.sentiments
+        game_data = database.games
+        default_user = UserProfile("default", database)
+        default_user.load()
+        users[default_user.name] = default_user
+    else:
+        # Get the data for emotional ratings
+        # The sentiment matrix is memory-mapped from its cache next to the
+        # ratings file, which is only parsed again when it changes
+        # ratings_filename = "temp_rated_games.json"
+        ratings_filename = "rated_games.json"
+        rating_data = None
+        sentiment_data = load_sentiment_matrix(ratings_filename)
+
+        # Get the game data
+        # Uses the compiled catalog or indexed ndjson file of the game data if
+        # there is one so the whole file doesn't need to be loaded
+        game_data_filename = "filtered_games.json"
+        game_data = load_game_data(game_data_filename)
 
     root = tk.Tk()
 
@@ -470,7 +440,7 @@ def run_recommender():
     description_label.grid(row=4, column=0, columnspan=4, padx=5, pady=5, sticky="nsew")
 
     # Initialize the recommender and get a new recommendation
-    recommender = VideoGameRecommender(root, rating_data, game_data, game_label, image_label, rating_label, description_label, genre_label, display_ratings=False)
+    recommender = VideoGameRecommender(root, rating_data, game_data, game_label, image_label, rating_label, description_label, genre_label, users, display_ratings=False, sentiment_data=sentiment_data)
     recommender.get_new_game()
 
     button_row = 5
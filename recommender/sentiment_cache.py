@@ -0,0 +1,231 @@
+from collections.abc import Iterator, Mapping
+import os
+import sys
+import time
+import numpy as np
+
+from .data_collection import get_file_hash, json_dumps, json_loads, load_json_file
+from .neighbours import get_sentiment_fingerprint
+from .user_profile import get_sentiment_matrix, normalize_sentiment_matrix, sentiment_order
+
+class GameRowLookup(Mapping):
+    def __init__(self, game_ids: np.ndarray, sorted_rows: np.ndarray):
+        """Game ID to sentiment matrix row lookup that binary searches the
+        saved game IDs, so a dictionary of the whole catalog doesn't have to be
+        built at startup
+
+        Arguments:
+            game_ids {np.ndarray} -- Game ID of each sentiment matrix row
+            sorted_rows {np.ndarray} -- Rows in the order that sorts the IDs
+        """
+        self.game_ids = game_ids
+        self.sorted_rows = sorted_rows
+
+    def _find_row(self, game_id: object) -> int:
+        """Finds the row of a game
+
+        Arguments:
+            game_id {object} -- Game ID
+
+        Returns:
+            int -- Row or None if the game isn't in the matrix
+        """
+        if not isinstance(game_id, str) or len(self.game_ids) == 0:
+            return None
+        position = np.searchsorted(self.game_ids, game_id, sorter=self.sorted_rows)
+        if position == len(self.game_ids):
+            return None
+        row = int(self.sorted_rows[position])
+        return row if self.game_ids[row] == game_id else None
+
+    def __getitem__(self, game_id: str) -> int:
+        row = self._find_row(game_id)
+        if row is None:
+            raise KeyError(game_id)
+        return row
+
+    def __contains__(self, game_id: object) -> bool:
+        return self._find_row(game_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.game_ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.game_ids)
+
+class SentimentData:
+    def __init__(self, game_ids: list[str], sentiment_indices: Mapping[str, int], sentiment_matrix: np.ndarray, normalized_matrix: np.ndarray = None, norms: np.ndarray = None, fingerprint: str = None):
+        """Sentiment matrix of the emotional ratings along with everything
+        derived from it at startup. Anything not given is computed from the
+        matrix, while a cache hands over its memory-mapped copies
+
+        Arguments:
+            game_ids {list[str]} -- Game ID of each sentiment matrix row
+            sentiment_indices {Mapping[str, int]} -- Lookup of game ID to row
+            sentiment_matrix {np.ndarray} -- Sentiment matrix
+
+        Keyword Arguments:
+            normalized_matrix {np.ndarray} -- Row-normalized sentiment matrix
+                (default: {None})
+            norms {np.ndarray} -- Original norm of each row (default: {None})
+            fingerprint {str} -- Fingerprint of the game IDs and
+                row-normalized matrix that neighbour tables are keyed to
+                (default: {None})
+        """
+        if normalized_matrix is None:
+            normalized_matrix, norms = normalize_sentiment_matrix(sentiment_matrix)
+        if fingerprint is None:
+            fingerprint = get_sentiment_fingerprint(game_ids, normalized_matrix)
+        self.game_ids = game_ids
+        self.sentiment_indices = sentiment_indices
+        self.sentiment_matrix = sentiment_matrix
+        self.normalized_matrix = normalized_matrix
+        self.norms = norms
+        self.fingerprint = fingerprint
+
+def get_sentiment_cache_filenames(filename: str) -> tuple[str, str, str, str, str, str]:
+    """Gets the filenames the sentiment matrix of a ratings file is cached in
+
+    Arguments:
+        filename {str} -- Json file of emotional ratings
+
+    Returns:
+        tuple[str, str, str, str, str, str] --
+            The file of the sentiment matrix,
+            the file of the row-normalized sentiment matrix,
+            the file of the norm of each row,
+            the file of game IDs in row order,
+            the file of rows in game ID order,
+            the file describing the ratings file the cache was built from
+    """
+    prefix = os.path.splitext(filename)[0]
+    return f"{prefix}_sentiment_matrix.npy", f"{prefix}_sentiment_normalized.npy", f"{prefix}_sentiment_norms.npy", f"{prefix}_sentiment_ids.npy", f"{prefix}_sentiment_sorted_rows.npy", f"{prefix}_sentiment_meta.json"
+
+def write_sentiment_meta(filename: str, meta: dict):
+    """Writes the description of a cache, replacing the old one in a single step
+
+    Arguments:
+        filename {str} -- Meta file
+        meta {dict} -- Description of the cache
+    """
+    temp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(temp_filename, "w", encoding="utf-8") as f:
+        f.write(json_dumps(meta))
+    os.replace(temp_filename, filename)
+
+def save_sentiment_cache(filename: str, sentiment_data: SentimentData):
+    """Saves the sentiment matrix of a ratings file next to it, along with its
+    row-normalized form so loading it doesn't copy or hash the matrix
+
+    Arguments:
+        filename {str} -- Json file of emotional ratings the matrix was built
+            from
+        sentiment_data {SentimentData} -- Sentiment matrix and what was derived
+            from it
+    """
+    matrix_filename, normalized_filename, norms_filename, ids_filename, sorted_rows_filename, meta_filename = get_sentiment_cache_filenames(filename)
+    # Read before building the cache so a ratings file changed meanwhile
+    # doesn't match it
+    stat = os.stat(filename)
+    source_hash = get_file_hash(filename)
+    # The old cache stops matching before any of its files are replaced
+    if os.path.exists(meta_filename):
+        os.remove(meta_filename)
+
+    np.save(matrix_filename, np.ascontiguousarray(sentiment_data.sentiment_matrix, dtype=np.float64))
+    np.save(normalized_filename, np.ascontiguousarray(sentiment_data.normalized_matrix, dtype=np.float64))
+    np.save(norms_filename, np.asarray(sentiment_data.norms, dtype=np.float64))
+    ids = np.array(sentiment_data.game_ids, dtype=str)
+    np.save(ids_filename, ids)
+    np.save(sorted_rows_filename, np.argsort(ids, kind="stable"))
+    # Written last since the cache is only used once the meta file matches
+    write_sentiment_meta(meta_filename, {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": source_hash,
+        "num_games": len(ids),
+        "sentiment_order": sentiment_order,
+        "fingerprint": sentiment_data.fingerprint
+    })
+
+def load_sentiment_cache(filename: str) -> SentimentData:
+    """Loads the cached sentiment matrix of a ratings file if it was built from
+    the current version of the file. The matrices, game IDs, and ID lookup are
+    memory-mapped rather than read, so loading doesn't grow with the catalog
+
+    Arguments:
+        filename {str} -- Json file of emotional ratings
+
+    Returns:
+        SentimentData -- Read only game IDs, lookup, and matrices, or None if
+            there isn't a matching cache
+    """
+    cache_filenames = get_sentiment_cache_filenames(filename)
+    if not all(os.path.exists(cache_filename) for cache_filename in cache_filenames):
+        return None
+    matrix_filename, normalized_filename, norms_filename, ids_filename, sorted_rows_filename, meta_filename = cache_filenames
+
+    with open(meta_filename, "rb") as f:
+        meta = json_loads(f.read())
+    if meta.get("sentiment_order") != sentiment_order or "fingerprint" not in meta:
+        return None
+
+    stat = os.stat(filename)
+    if meta["size"] != stat.st_size:
+        return None
+    # A file that was only touched or copied keeps its contents, so it is
+    # hashed before the cache is thrown away
+    if meta["mtime"] != stat.st_mtime:
+        if meta["sha256"] != get_file_hash(filename):
+            return None
+        meta["mtime"] = stat.st_mtime
+        try:
+            write_sentiment_meta(meta_filename, meta)
+        except OSError:
+            pass
+
+    sentiment_matrix = np.load(matrix_filename, mmap_mode="r")
+    normalized_matrix = np.load(normalized_filename, mmap_mode="r")
+    norms = np.load(norms_filename, mmap_mode="r")
+    ids = np.load(ids_filename, mmap_mode="r")
+    sorted_rows = np.load(sorted_rows_filename, mmap_mode="r")
+    num_games = meta["num_games"]
+    if sentiment_matrix.shape != (num_games, len(sentiment_order)) or normalized_matrix.shape != sentiment_matrix.shape or len(norms) != num_games or len(ids) != num_games or len(sorted_rows) != num_games:
+        return None
+
+    # The saved fingerprint stands in for hashing the matrix on every start
+    return SentimentData(ids, GameRowLookup(ids, sorted_rows), sentiment_matrix, normalized_matrix, norms, meta["fingerprint"])
+
+def load_sentiment_matrix(filename: str = "rated_games.json") -> SentimentData:
+    """Gets the sentiment matrix of a ratings file from its cache, building
+    and caching it from the json file when the file has changed
+
+    Keyword Arguments:
+        filename {str} -- Json file of emotional ratings
+            (default: {"rated_games.json"})
+
+    Returns:
+        SentimentData -- Game IDs, lookup of ID to row, and matrices
+    """
+    sentiment_data = load_sentiment_cache(filename)
+    if sentiment_data is not None:
+        return sentiment_data
+
+    sentiment_data = SentimentData(*get_sentiment_matrix(load_json_file(filename)))
+    try:
+        save_sentiment_cache(filename, sentiment_data)
+    except OSError as e:
+        print(f"Unable to save the sentiment matrix cache of {filename}: {e}")
+
+    return sentiment_data
+
+if __name__ == "__main__":
+    filename = sys.argv[1] if len(sys.argv) > 1 else "rated_games.json"
+    start_time = time.perf_counter()
+    sentiment_data = SentimentData(*get_sentiment_matrix(load_json_file(filename)))
+    print(f"Parsed {len(sentiment_data.game_ids)} games from {filename} in {time.perf_counter() - start_time:.3f}s")
+    save_sentiment_cache(filename, sentiment_data)
+
+    start_time = time.perf_counter()
+    load_sentiment_matrix(filename)
+    print(f"Loaded the cached sentiment matrix in {time.perf_counter() - start_time:.3f}s")
@@ -0,0 +1,426 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import os
+import re
+import sys
+import numpy as np
+
+from .data_collection import json_dumps, json_loads, load_game_data
+from .database import RecommenderDatabase, load_database
+from .neighbours import build_neighbour_index, load_neighbour_table
+from .sentiment_cache import SentimentData, load_sentiment_matrix
+from .user_profile import GameRecommendationStatus, UserProfile, choose_random_game, get_sentiment_matrix
+
+# Names end up in profile filenames, so anything that could leave the
+# directory is refused
+user_name_pattern = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Requests only carry a user, game, and rating, so anything larger is refused
+# before it is read into memory
+max_body_size = 64 * 1024
+
+status_messages = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    500: "Internal Server Error"
+}
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        """Raised while handling a request to send an error response
+
+        Arguments:
+            status {int} -- HTTP status code
+            message {str} -- Message sent to the client
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class UserSession:
+    def __init__(self, profile: UserProfile):
+        """A profile kept in memory along with the games skipped since it was
+        loaded
+
+        Arguments:
+            profile {UserProfile} -- Loaded profile
+        """
+        self.profile = profile
+        self.skipped_ids: set[str] = set()
+        # Scoring mutates the profile, so one request at a time works on it
+        self.lock = Lock()
+
+class ProfileCache:
+    def __init__(self, capacity: int = 1024, profile_directory: str = ".", database: RecommenderDatabase = None):
+        """Least recently used cache of user sessions. Profiles are saved on
+        every rating, so evicted sessions only lose their skipped games
+
+        Keyword Arguments:
+            capacity {int} -- Most sessions kept in memory (default: {1024})
+            profile_directory {str} -- Directory profiles are saved in
+                (default: {"."})
+            database {RecommenderDatabase} -- Database profiles are saved in
+                instead of the directory (default: {None})
+        """
+        self.capacity = capacity
+        self.profile_directory = profile_directory
+        self.database = database
+        self._sessions: OrderedDict[str, UserSession] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, name: str) -> UserSession:
+        """Gets the session of a user, loading their profile if it isn't cached
+
+        Arguments:
+            name {str} -- Name of the user
+
+        Returns:
+            UserSession -- Session
+        """
+        with self._lock:
+            if name in self._sessions:
+                self._sessions.move_to_end(name)
+                return self._sessions[name]
+
+        profile = UserProfile(name, self.database)
+        profile.default_filename = os.path.join(self.profile_directory, profile.default_filename)
+        profile.load()
+
+        with self._lock:
+            # Another request may have loaded the same profile meanwhile
+            session = self._sessions.setdefault(name, UserSession(profile))
+            self._sessions.move_to_end(name)
+            if len(self._sessions) > self.capacity:
+                self._sessions.popitem(last=False)
+
+        return session
+
+class RecommendationService:
+    def __init__(self, analyzed_game_data: dict, game_data: dict = None, profile_directory: str = ".", neighbour_table_prefix: str = "neighbour_table", num_cached_profiles: int = 1024, num_workers: int = 4, database: RecommenderDatabase = None, sentiment_data: SentimentData = None):
+        """Recommendation logic shared by every client of the HTTP service. The
+        sentiment matrix and catalog are loaded once and only read afterwards
+
+        Arguments:
+            analyzed_game_data {dict} -- Game data with emotional ratings, can
+                be None if sentiment_data is given
+
+        Keyword Arguments:
+            game_data {dict} -- Original game data, used to send game names
+                (default: {None})
+            profile_directory {str} -- Directory profiles are saved in
+                (default: {"."})
+            neighbour_table_prefix {str} -- Prefix of a prebuilt neighbour
+                table (default: {"neighbour_table"})
+            num_cached_profiles {int} -- Most profiles kept in memory
+                (default: {1024})
+            num_workers {int} -- Threads that scoring runs on so the event
+                loop never waits on it (default: {4})
+            database {RecommenderDatabase} -- Database profiles are saved in
+                instead of the profile directory (default: {None})
+            sentiment_data {SentimentData} -- Game IDs, ID lookup, and sentiment
+                matrices already built from the emotional ratings
+                (default: {None})
+        """
+        if sentiment_data is None:
+            sentiment_data = SentimentData(*get_sentiment_matrix(analyzed_game_data))
+        # Cached matrices stay memory-mapped and the ID lookup binary searches
+        # them, so startup doesn't grow with the catalog
+        self.game_id_list = sentiment_data.game_ids
+        self.sentiment_indices = sentiment_data.sentiment_indices
+        self.normalized_sentiment_matrix = sentiment_data.normalized_matrix
+        self.neighbour_index = load_neighbour_table(neighbour_table_prefix, sentiment_data.fingerprint)
+        if self.neighbour_index is None:
+            self.neighbour_index = build_neighbour_index(self.normalized_sentiment_matrix)
+        self.game_data = game_data
+        self.profiles = ProfileCache(num_cached_profiles, profile_directory, database)
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="scoring")
+
+    def recommend(self, name: str) -> dict:
+        """Picks the next game for a user, falling back to a random game when
+        there is nothing to score from
+
+        Arguments:
+            name {str} -- Name of the user
+
+        Returns:
+            dict -- Game ID and name of the recommendation
+        """
+        session = self.profiles.get(name)
+        with session.lock:
+            game_id = None
+            if len(session.profile.rated_games) >= 1:
+                try:
+                    game_id = session.profile.get_recommendation(self.game_id_list, self.sentiment_indices, self.normalized_sentiment_matrix, self.neighbour_index, session.skipped_ids)
+                except Exception:
+                    pass
+
+            if game_id is None:
+                game_id = choose_random_game(self.game_id_list, session.profile.rated_games | session.skipped_ids)
+                if game_id is None:
+                    raise RequestError(404, "No games left to recommend")
+
+        recommendation = {"game_id": game_id}
+        if self.game_data is not None and game_id in self.game_data:
+            recommendation["name"] = self.game_data[game_id]["data"]["name"]
+        return recommendation
+
+    def rate(self, name: str, game_id: str, rating: int, played: bool) -> dict:
+        """Adds a rating to a user's profile and saves it
+
+        Arguments:
+            name {str} -- Name of the user
+            game_id {str} -- ID of the rated game
+            rating {int} -- Rating from 0 to 10
+            played {bool} -- Whether the user played the game
+
+        Returns:
+            dict -- Number of games the user has rated
+        """
+        if game_id not in self.sentiment_indices:
+            raise RequestError(404, f"Unknown game {game_id}")
+        if not isinstance(rating, int) or not 0 <= rating <= 10:
+            raise RequestError(400, "Rating must be a whole number from 0 to 10")
+        if not isinstance(played, bool):
+            raise RequestError(400, "played must be true or false")
+
+        session = self.profiles.get(name)
+        status = GameRecommendationStatus.Played if played else GameRecommendationStatus.NotPlayed
+        with session.lock:
+            session.profile.add_rating(game_id, [status, rating])
+            session.profile.save()
+            return {"num_rated": len(session.profile.rated_games)}
+
+    def skip(self, name: str, game_id: str) -> dict:
+        """Leaves a game out of a user's recommendations without rating it
+
+        Arguments:
+            name {str} -- Name of the user
+            game_id {str} -- ID of the skipped game
+
+        Returns:
+            dict -- Number of games the user has skipped
+        """
+        if game_id not in self.sentiment_indices:
+            raise RequestError(404, f"Unknown game {game_id}")
+
+        session = self.profiles.get(name)
+        with session.lock:
+            session.skipped_ids.add(game_id)
+            return {"num_skipped": len(session.skipped_ids)}
+
+    async def handle_request(self, method: str, target: str, body: bytes) -> dict:
+        """Routes a request to the service and runs it on the worker pool
+
+        Arguments:
+            method {str} -- HTTP method
+            target {str} -- Request path and query
+            body {bytes} -- Request body
+
+        Raises:
+            RequestError: The request was invalid
+
+        Returns:
+            dict -- Json response
+        """
+        url = urlsplit(target)
+        if method == "GET":
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        elif method == "POST":
+            try:
+                params = json_loads(body) if body else {}
+            except ValueError:
+                raise RequestError(400, "Body must be json")
+            if not isinstance(params, dict):
+                raise RequestError(400, "Body must be a json object")
+        else:
+            raise RequestError(405, f"Method {method} is not allowed")
+
+        if url.path == "/health":
+            return {"status": "ok", "num_games": len(self.game_id_list)}
+
+        name = params.get("user")
+        if not isinstance(name, str) or not user_name_pattern.match(name):
+            raise RequestError(400, "user must be 1 to 64 letters, numbers, dashes, or underscores")
+
+        loop = asyncio.get_running_loop()
+        if url.path == "/recommend" and method == "GET":
+            return await loop.run_in_executor(self.executor, self.recommend, name)
+        if url.path in ("/rate", "/skip") and method == "POST":
+            game_id = params.get("game_id")
+            if not isinstance(game_id, (str, int)) or isinstance(game_id, bool):
+                raise RequestError(400, "game_id must be given")
+            if url.path == "/rate":
+                return await loop.run_in_executor(self.executor, self.rate, name, str(game_id), params.get("rating"), params.get("played", False))
+            return await loop.run_in_executor(self.executor, self.skip, name, str(game_id))
+
+        raise RequestError(404, f"No endpoint {method} {url.path}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answers requests on a connection until the client closes it
+
+        Arguments:
+            reader {asyncio.StreamReader} -- Connection reader
+            writer {asyncio.StreamWriter} -- Connection writer
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while (header_line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = header_line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                body = None
+                try:
+                    content_length = int(headers.get("content-length", 0))
+                    if content_length < 0:
+                        raise ValueError(content_length)
+                    if content_length > max_body_size:
+                        raise RequestError(413, f"Body must be at most {max_body_size} bytes")
+                    body = await reader.readexactly(content_length)
+
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    status, response = 200, await self.handle_request(method, target, body)
+                except RequestError as e:
+                    status, response = e.status, {"error": e.message}
+                except ValueError:
+                    status, response = 400, {"error": "Malformed request"}
+                except asyncio.IncompleteReadError:
+                    raise
+                except Exception as e:
+                    print(f"Error handling {request_line!r}: {e}")
+                    status, response = 500, {"error": "Internal server error"}
+
+                # The end of a body that wasn't read can't be found, so the
+                # connection is closed instead of reading it as the next request
+                if body is None:
+                    keep_alive = False
+                response_body = json_dumps(response).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {status_messages[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(response_body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + response_body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            # Request or header lines longer than the reader's limit
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080):
+        """Serves requests until cancelled
+
+        Keyword Arguments:
+            host {str} -- Address to listen on (default: {"127.0.0.1"})
+            port {int} -- Port to listen on (default: {8080})
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving {len(self.game_id_list)} games on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+async def send_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, target: str, body: dict = None) -> tuple[int, dict]:
+    """Sends a request on a kept alive connection and reads the response
+
+    Arguments:
+        reader {asyncio.StreamReader} -- Connection reader
+        writer {asyncio.StreamWriter} -- Connection writer
+        method {str} -- HTTP method
+        target {str} -- Request path and query
+
+    Keyword Arguments:
+        body {dict} -- Json body (default: {None})
+
+    Returns:
+        tuple[int, dict] -- Status code and json response
+    """
+    encoded_body = json_dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(encoded_body)}\r\n\r\n".encode("latin-1") + encoded_body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split(b" ")[1])
+    headers = {}
+    while (header_line := await reader.readline()) not in (b"\r\n", b""):
+        key, _, value = header_line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return status, json_loads(await reader.readexactly(int(headers["content-length"])))
+
+async def run_load_test(host: str = "127.0.0.1", port: int = 8080, num_clients: int = 32, num_requests_per_client: int = 100, num_users: int = 256, seed: int = 0):
+    """Sends recommend, rate, and skip requests from many clients at once and
+    prints the latency percentiles of each endpoint
+
+    Keyword Arguments:
+        host {str} -- Address of the service (default: {"127.0.0.1"})
+        port {int} -- Port of the service (default: {8080})
+        num_clients {int} -- Connections sending requests at once
+            (default: {32})
+        num_requests_per_client {int} -- Recommend requests per client, each
+            followed by a rate or skip (default: {100})
+        num_users {int} -- Number of different users requests are spread over
+            (default: {256})
+        seed {int} -- Seed for the users and ratings picked (default: {0})
+    """
+    latencies: dict[str, list[float]] = {"recommend": [], "rate": [], "skip": []}
+    num_errors = 0
+
+    async def client(client_id: int):
+        nonlocal num_errors
+        rng = np.random.default_rng(seed + client_id)
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(num_requests_per_client):
+                user = f"loadtest_{rng.integers(num_users)}"
+                start = perf_counter()
+                status, response = await send_request(reader, writer, "GET", f"/recommend?user={user}")
+                latencies["recommend"].append(perf_counter() - start)
+                if status != 200:
+                    num_errors += 1
+                    continue
+
+                endpoint = "skip" if rng.random() < 0.2 else "rate"
+                body = {"user": user, "game_id": response["game_id"], "rating": int(rng.integers(11)), "played": bool(rng.random() < 0.5)}
+                start = perf_counter()
+                status, _ = await send_request(reader, writer, "POST", f"/{endpoint}", body)
+                latencies[endpoint].append(perf_counter() - start)
+                if status != 200:
+                    num_errors += 1
+        finally:
+            writer.close()
+
+    start_time = perf_counter()
+    await asyncio.gather(*(client(i) for i in range(num_clients)))
+    elapsed = perf_counter() - start_time
+
+    num_requests = sum(len(endpoint_latencies) for endpoint_latencies in latencies.values())
+    print(f"{num_requests} requests from {num_clients} clients in {elapsed:.1f}s ({num_requests / elapsed:.0f} requests/s, {num_errors} errors)")
+    print(f"{'Endpoint':<12}{'Count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for endpoint, endpoint_latencies in latencies.items():
+        if endpoint_latencies:
+            p50, p99 = np.percentile(endpoint_latencies, [50, 99]) * 1000
+            print(f"{endpoint:<12}{len(endpoint_latencies):>8}{p50:>10.2f}{p99:>10.2f}")
+
+def run_service(host: str = "127.0.0.1", port: int = 8080):
+    database = load_database()
+    if database is not None:
+        service = RecommendationService(database.sentiments, database.games, database=database)
+    else:
+        service = RecommendationService(None, load_game_data("filtered_games.json"), sentiment_data=load_sentiment_matrix("rated_games.json"))
+    asyncio.run(service.serve(host, port))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "loadtest":
+        asyncio.run(run_load_test())
+    else:
+        run_service()
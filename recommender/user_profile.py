@@ -0,0 +1,478 @@
+from enum import Enum
+from itertools import chain
+from operator import itemgetter
+from random import randint, randrange
+import os
+import numpy as np
+
+from . import instrumentation
+from .database import RecommenderDatabase
+from .neighbours import BruteForceIndex, NeighbourIndex
+from .rating_journal import RatingJournal, load_profile_ratings
+
+sentiment_order = ["anger", "disgust", "fear", "happiness", "sadness", "surprise"]
+# Pulls every emotion out of a sentiment dictionary in matrix column order
+get_sentiment_values = itemgetter(*sentiment_order)
+
+def get_sentiment_vector(sentiment_dict: dict) -> np.ndarray:
+    """Converts a sentiment dictionary into a numpy array
+
+    Arguments:
+        sentiment_dict {dict} -- Dictionary to convert
+
+    Returns:
+        np.ndarray -- Sentiment array
+    """
+    return np.array(get_sentiment_values(sentiment_dict), dtype=np.float64)
+
+def get_sentiment_matrix(analyzed_game_data: dict) -> tuple[list[str], dict[str, int], np.ndarray]:
+    """Converts the analyzed game data dictionary into a sentiment matrix where
+    each row is a game
+
+    Arguments:
+        analyzed_game_data {dict} -- Game data to convert
+
+    Returns:
+        tuple[list[str], dict[str, int], np.ndarray] --
+            The list of game ids,
+            lookup dictionary of ID to indice for the array,
+            the array itself
+    """
+    game_id_list = list(analyzed_game_data.keys())
+    # Lookup dict for id to index in the matrix
+    sentiment_ids = {game_id: i for i, game_id in enumerate(game_id_list)}
+    num_games = len(game_id_list)
+    num_emotions = len(sentiment_order)
+
+    # Fills in the matrix in one pass over the emotion values of every game
+    values = chain.from_iterable(map(get_sentiment_values, analyzed_game_data.values()))
+    sentiment_matrix = np.fromiter(values, dtype=np.float64, count=num_games * num_emotions)
+    sentiment_matrix = sentiment_matrix.reshape(num_games, num_emotions)
+
+    return game_id_list, sentiment_ids, sentiment_matrix
+
+def normalize_sentiment_matrix(sentiment_matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Scales every row of the sentiment matrix to unit length so the cosine
+    similarity between games is a plain dot product
+
+    Arguments:
+        sentiment_matrix {np.ndarray} -- Sentiment matrix where each row is a
+            game
+
+    Returns:
+        tuple[np.ndarray, np.ndarray] --
+            The contiguous row-normalized matrix,
+            the original norm of each row
+    """
+    norms = np.linalg.norm(sentiment_matrix, axis=1)
+    # Rows without any emotion are left as zeros instead of dividing by zero
+    safe_norms = np.where(norms == 0, 1, norms)
+    normalized_matrix = np.ascontiguousarray(sentiment_matrix / safe_norms[:, np.newaxis])
+
+    return normalized_matrix, norms
+
+def choose_random_game(game_ids: list[str], excluded_ids: set[str]) -> str:
+    """Picks a random game that isn't excluded. Random rows are tried first, so
+    the catalog is only scanned when most of it is excluded
+
+    Arguments:
+        game_ids {list[str]} -- Game ID of each sentiment matrix row
+        excluded_ids {set[str]} -- Games that can't be picked
+
+    Returns:
+        str -- Game ID or None if every game is excluded
+    """
+    if len(game_ids) == 0:
+        return None
+    for _ in range(32):
+        game_id = str(game_ids[randrange(len(game_ids))])
+        if game_id not in excluded_ids:
+            return game_id
+
+    available_rows = np.flatnonzero(~np.isin(np.asarray(game_ids, dtype=str), np.array(list(excluded_ids), dtype=str)))
+    if len(available_rows) == 0:
+        return None
+    return str(game_ids[available_rows[randrange(len(available_rows))]])
+
+class GameRecommendationStatus(int, Enum):
+    Played = 0
+    NotPlayed = 1
+
+def get_rating_weight(rating: list[GameRecommendationStatus, int]) -> float:
+    """Gets how much a rated game adds to the scores of games similar to it
+
+    Arguments:
+        rating {list[GameRecommendationStatus, int]} -- Rating for the game
+
+    Returns:
+        float -- Weight of the rating
+    """
+    rec_status, rating_value = rating
+    # Sets the multiplier for if the user played the game or not
+    #   (playing the game is worth 10 times the weight)
+    has_played_modifier = 10 if rec_status == GameRecommendationStatus.Played else 1
+    # The rating is adjusted such that 4 or below becomes negative and
+    # detracts from the overall score
+    return (rating_value - 5) * has_played_modifier
+
+class UserProfile:
+    def __init__(self, name: str, database: RecommenderDatabase = None):
+        """The user profile is used for storing a users preferred games
+
+        Arguments:
+            name {str} -- Name of the user
+
+        Keyword Arguments:
+            database {RecommenderDatabase} -- Database to load and save ratings
+                with instead of a profile file (default: {None})
+        """
+        self._name: str = name
+        self.database = database
+        # There could be setters added for game ratings such that it automatically
+        # updates rated games and performs verification on attempts to add ratings
+        # to the dict
+        self._game_ratings: dict = {}
+        self.default_filename: str = self._get_default_filename()
+        self.rated_games = set()
+        # Number of the most similar games each rated game adds a score to
+        self.num_similar_games: int = 100
+        # Number of rated games scored against the catalog at once
+        self.scoring_block_size: int = 256
+        # Journal of the file the profile was last loaded from or saved to and
+        # the ratings changed since
+        self._journal: RatingJournal = None
+        self._unsaved_ids: set[str] = set()
+        self._reset_scores()
+
+    def _verify_game_rating(self, id: str, rating: list[GameRecommendationStatus, int]) -> bool:
+        """Checks that a given game rating is valid
+
+        Arguments:
+            id {str} -- Game ID
+            rating {list[GameRecommendationStatus, int]} -- Rating for the game
+
+        Returns:
+            bool -- Is valid
+        """
+        if not (isinstance(id, str) and isinstance(rating, list)):
+            return False
+
+        if len(rating) != 2:
+            return False
+
+        if not (0 <= rating[0] <= 1 and 0 <= rating[1] <= 10):
+            return False
+
+        return True
+
+    def _verify_game_ratings(self, game_ratings: dict) -> bool:
+        """Verifies a dictionary of game ratings to make sure they are valid
+
+        Arguments:
+            game_ratings {dict} -- Game ratings to validate
+
+        Returns:
+            bool -- Whether or not they are valid
+        """
+        for key in game_ratings.keys():
+            value = game_ratings[key]
+
+            if not self._verify_game_rating(key, value):
+                return False
+
+        return True
+
+    def _get_default_filename(self) -> str:
+        """Gets the default filename for saving/loading
+
+        Returns:
+            str -- Filename
+        """
+        return f"profile_{self.name}.json"
+
+    def add_rating(self, id: str, rating: tuple[GameRecommendationStatus, int]):
+        """Adds a rating to the rated games
+
+        Arguments:
+            id {str} -- ID of the game
+            rating {tuple[GameRecommendationStatus, int]} -- Rating to add
+        """
+        if self._verify_game_rating(id, rating):
+            previous_rating = self._game_ratings.get(id)
+            self._game_ratings[id] = rating
+            self.rated_games.add(id)
+            self._unsaved_ids.add(id)
+            self._update_scores(id, previous_rating, rating)
+        else:
+            print("Invalid id : rating pair was attempted to be added to rated games")
+
+    def add_ratings(self, ratings: dict[str, tuple[GameRecommendationStatus, int]]):
+        """Adds multiple user ratings from a dictionary
+
+        Arguments:
+            ratings {dict[str, tuple[GameRecommendationStatus, int]]} -- Ratings to add
+        """
+        for key in ratings.keys():
+            value = ratings[key]
+            self.add_rating(key, value)
+
+    def load(self, filename: str = None):
+        """Loads user ratings from a file, or from the database if the profile
+        has one
+
+        Keyword Arguments:
+            filename {str} -- File to load from (default: {None})
+        """
+        if self.database is not None:
+            game_ratings = self.database.load_profile_ratings(self.name)
+        else:
+            if filename is None:
+                filename = self.default_filename
+
+            # Saves to the same file only need to append what changed after
+            # this
+            self._journal = RatingJournal(filename)
+            game_ratings = load_profile_ratings(filename)
+        if len(game_ratings) > 0:
+            self.add_ratings(game_ratings)
+            # The scores are rebuilt from all ratings on the next recommendation
+            self._reset_scores()
+        self._unsaved_ids.clear()
+
+    @instrumentation.timed("profile.save")
+    def save(self, filename: str = None):
+        """Saves user ratings to a file. Ratings changed since the profile was
+        loaded from or saved to the same file are appended to its journal, so
+        the cost doesn't grow with the size of the profile. Profiles with a
+        database only write the changed ratings to it
+
+        Keyword Arguments:
+            filename {str} -- File to save to (default: {None})
+        """
+        if self.database is not None:
+            self.database.save_profile_ratings(self.name, {id: self._game_ratings[id] for id in self._unsaved_ids})
+            self._unsaved_ids.clear()
+            return
+
+        if filename is None:
+            filename = self.default_filename
+
+        # A profile's first save writes a snapshot so it can be found by
+        # its file before the journal is ever compacted
+        if self._journal is not None and self._journal.filename == filename and os.path.exists(filename):
+            self._journal.append({id: self._game_ratings[id] for id in self._unsaved_ids})
+        else:
+            self._journal = RatingJournal(filename)
+            self._journal.write_snapshot(self._game_ratings)
+        self._unsaved_ids.clear()
+
+    def get_recommendation(self, game_ids: list[str], sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray, neighbour_index: NeighbourIndex = None, excluded_ids: set[str] = None) -> str:
+        """Gets a recommendation ID to display on the UI
+
+        Arguments:
+            game_ids {list[str]} -- List of possible game IDs
+            sentiment_indices {dict[str, int]} -- Lookup dictionary for game ID
+                to indice in the sentiment matrix
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix to
+                perform calculations on
+
+        Keyword Arguments:
+            neighbour_index {NeighbourIndex} -- Index to find similar games
+                with (default: {None})
+            excluded_ids {set[str]} -- Games to leave out on top of the ones
+                already seen (default: {None})
+
+        Raises:
+            Exception: No recommendation was found
+
+        Returns:
+            str -- ID of game recommendation
+        """
+        recommendation_list = self._generate_recommendation_list(game_ids, sentiment_indices, sentiment_matrix, neighbour_index, excluded_ids)
+        id = self._select_from_recommendation_list(recommendation_list, True)
+        if id == -1:
+            raise Exception("No valid game recommendation found")
+        return id
+
+    def get_recommendation_candidates(self, game_ids: list[str], sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray, neighbour_index: NeighbourIndex = None) -> set[str]:
+        """Gets every game an exploratory get_recommendation could pick
+
+        Arguments:
+            game_ids {list[str]} -- List of possible game IDs
+            sentiment_indices {dict[str, int]} -- Lookup dictionary for game ID
+                to indice in the sentiment matrix
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix to
+                perform calculations on
+
+        Keyword Arguments:
+            neighbour_index {NeighbourIndex} -- Index to find similar games
+                with (default: {None})
+
+        Returns:
+            set[str] -- Game IDs
+        """
+        recommendation_list = self._generate_recommendation_list(game_ids, sentiment_indices, sentiment_matrix, neighbour_index)
+        num_candidates = len(recommendation_list) // 30 + 1
+        return {id for id, _ in recommendation_list[:num_candidates]}
+
+    def _select_from_recommendation_list(self, recommendation_list: list[tuple[str, float]], is_exploratory: bool) -> str:
+        """Selects an ID from the given recommendation list
+
+        Arguments:
+            recommendation_list {list[tuple[str, float]]} -- Sorted list of
+                recommendations
+            is_exploratory {bool} -- Whether or not it should randomly choose
+                from a top percentage of recommendations instead of the very top
+
+        Returns:
+            str -- Game ID or -1 if there are no recommendations
+        """
+        num_recommendations = len(recommendation_list)
+        if num_recommendations == 0:
+            return -1
+        indice = 0 if not is_exploratory else randint(0, num_recommendations // 30)
+
+        return recommendation_list[indice][0]
+
+    @instrumentation.timed("profile.generate_recommendation_list")
+    def _generate_recommendation_list(self, game_ids: list[str], sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray, neighbour_index: NeighbourIndex = None, excluded_ids: set[str] = None) -> list[tuple[str, float]]:
+        """Generates a sorted recommendation list with game IDs and scores
+
+        Arguments:
+            game_ids {list[str]} -- List of available game IDs
+            sentiment_indices {dict[str, int]} -- Lookup dictionary from game ID
+                to sentiment matrix row indice
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+                where each row is a game and columns are emotional ratings
+
+        Keyword Arguments:
+            neighbour_index {NeighbourIndex} -- Index to find the games similar
+                to each rated game with. Compares against the whole catalog if
+                not given (default: {None})
+            excluded_ids {set[str]} -- Games to leave out on top of the ones
+                already seen (default: {None})
+
+        Returns:
+            list[tuple[str, float]] -- Sorted list of Game IDs and Scores
+        """
+        if self._scored_matrix is not sentiment_matrix or (neighbour_index is not None and neighbour_index is not self._neighbour_index):
+            self._rebuild_scores(sentiment_indices, sentiment_matrix, neighbour_index)
+
+        # Games the user has already seen are never recommended
+        is_candidate = self._score_counts > 0
+        excluded_ids = self.rated_games.union(self._game_ratings.keys(), excluded_ids or ())
+        excluded_rows = np.fromiter((sentiment_indices[game_id] for game_id in excluded_ids if game_id in sentiment_indices), dtype=np.intp)
+        is_candidate[excluded_rows] = False
+
+        # Converts the scores to a list sorted from highest to lowest
+        scored_rows = np.flatnonzero(is_candidate)
+        scored_rows = scored_rows[np.argsort(-self._scores[scored_rows], kind="stable")]
+        recommendation_list = [(str(game_ids[row]), float(self._scores[row])) for row in scored_rows]
+
+        return recommendation_list
+
+    def _get_rating_weight(self, rating: list[GameRecommendationStatus, int]) -> float:
+        """Gets how much a rated game adds to the scores of games similar to it
+
+        Arguments:
+            rating {list[GameRecommendationStatus, int]} -- Rating for the game
+
+        Returns:
+            float -- Weight of the rating
+        """
+        return get_rating_weight(rating)
+
+    def _reset_scores(self):
+        """Clears the score state so it is rebuilt on the next recommendation
+        """
+        # Matrix, lookup, and neighbour index the scores were built for
+        self._scored_matrix: np.ndarray = None
+        self._scored_indices: dict[str, int] = None
+        self._neighbour_index: NeighbourIndex = None
+        # Dense score of every game and how many rated games contribute to it
+        self._scores: np.ndarray = None
+        self._score_counts: np.ndarray = None
+        # Rated game ID to the rows and similarities it adds scores to
+        self._similar_rows: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+
+    @instrumentation.timed("profile.rebuild_scores")
+    def _rebuild_scores(self, sentiment_indices: dict[str, int], sentiment_matrix: np.ndarray, neighbour_index: NeighbourIndex):
+        """Rebuilds the score of every game from all of the ratings
+
+        Arguments:
+            sentiment_indices {dict[str, int]} -- Lookup dictionary from game ID
+                to sentiment matrix row indice
+            sentiment_matrix {np.ndarray} -- Row-normalized sentiment matrix
+            neighbour_index {NeighbourIndex} -- Index to find similar games
+                with, or None to compare against the whole catalog
+        """
+        self._reset_scores()
+        num_games = sentiment_matrix.shape[0]
+        self._scores = np.zeros(num_games)
+        self._score_counts = np.zeros(num_games, dtype=np.int64)
+        self._scored_indices = sentiment_indices
+        self._scored_matrix = sentiment_matrix
+        self._neighbour_index = neighbour_index if neighbour_index is not None else BruteForceIndex(sentiment_matrix)
+
+        rated_ids = [rated_id for rated_id in self._game_ratings.keys() if rated_id in sentiment_indices]
+        if num_games < 2 or len(rated_ids) == 0:
+            return
+
+        rated_rows = np.fromiter((sentiment_indices[rated_id] for rated_id in rated_ids), dtype=np.intp, count=len(rated_ids))
+        rating_weights = np.array([self._get_rating_weight(self._game_ratings[rated_id]) for rated_id in rated_ids], dtype=np.float64)
+
+        # Scores the rated games in blocks so the (rated x catalog) similarity
+        # matrix stays a bounded size for large profiles
+        for block_start in range(0, len(rated_rows), self.scoring_block_size):
+            block_end = block_start + self.scoring_block_size
+            top_rows, top_similarities = self._neighbour_index.query(rated_rows[block_start:block_end], self.num_similar_games)
+
+            # Padding from a search that came up short isn't a similar game
+            is_found = np.isfinite(top_similarities)
+            for rated_id, similar_rows, similarities, row_is_found in zip(rated_ids[block_start:block_end], top_rows, top_similarities, is_found):
+                self._similar_rows[rated_id] = (similar_rows[row_is_found], similarities[row_is_found])
+
+            # Sets a score for the game based on how similar it it, how much
+            # the user liked it, and if they played it or not
+            block_weights = np.broadcast_to(rating_weights[block_start:block_end, np.newaxis], top_similarities.shape)
+            np.add.at(self._scores, top_rows[is_found], top_similarities[is_found] * block_weights[is_found])
+            np.add.at(self._score_counts, top_rows[is_found], 1)
+
+    @instrumentation.timed("profile.update_scores")
+    def _update_scores(self, id: str, previous_rating: list[GameRecommendationStatus, int], rating: list[GameRecommendationStatus, int]):
+        """Updates the scores with the change of a single rating. Does nothing
+        until the scores have been built
+
+        Arguments:
+            id {str} -- ID of the rated game
+            previous_rating {list[GameRecommendationStatus, int]} -- Rating the
+                game had before or None if it is new
+            rating {list[GameRecommendationStatus, int]} -- New rating
+        """
+        if self._scored_matrix is None or id not in self._scored_indices:
+            return
+
+        if id not in self._similar_rows:
+            if self._scored_matrix.shape[0] < 2:
+                return
+            row = np.array([self._scored_indices[id]], dtype=np.intp)
+            top_rows, top_similarities = self._neighbour_index.query(row, self.num_similar_games)
+            is_found = np.isfinite(top_similarities[0])
+            self._similar_rows[id] = (top_rows[0][is_found], top_similarities[0][is_found])
+            self._score_counts[top_rows[0][is_found]] += 1
+            previous_weight = 0
+        else:
+            previous_weight = self._get_rating_weight(previous_rating)
+
+        # Only the difference in weight needs to be applied to the similar games
+        similar_rows, similarities = self._similar_rows[id]
+        self._scores[similar_rows] += similarities * (self._get_rating_weight(rating) - previous_weight)
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+        self.default_filename = self._get_default_filename()